@@ -0,0 +1,190 @@
+"""Fighter abilities.
+
+Each ability is an Ability subclass registered by name with
+@register_ability; fighters pick one (and set its parameters) in the roster
+file, see roster.py. When balls are created bind_ability() resolves the
+ball's ability once into per-ball handler slots, so the simulation calls
+handlers directly instead of comparing type strings on every collision.
+Fighters without an ability get the plain Ability behaviour.
+"""
+import math
+
+from config import BALL_MAX_SPEED, BLAZE_COOLDOWN, BLAZEBALL_SPEED
+
+ABILITIES = {}  # ability name -> Ability subclass
+
+
+def register_ability(name):
+    """Class decorator registering an Ability subclass under a name roster entries can use"""
+    def decorator(cls):
+        ABILITIES[name] = cls
+        return cls
+    return decorator
+
+
+class Ability:
+    # In a collision only the ball(s) with the highest priority run on_collide,
+    # if both are 0 the regular collision damage applies instead
+    collide_priority = 0
+    # Stop after the first ball of the pair has handled the collision
+    exclusive = False
+    # Tunable numbers: name -> default, a roster entry's "params" override them
+    # per fighter. An int default only takes whole numbers.
+    params = {}
+
+    def __init__(self, **params):
+        for name, default in self.params.items():
+            setattr(self, name, params.get(name, default))
+
+    def on_collide(self, sim, ball, other):
+        pass
+
+    def on_tick(self, sim, ball):
+        pass
+
+    def next_tick(self, sim, ball):
+        """Earliest simulated time at which on_tick could do something, None if never.
+
+        Asked again after every on_tick and whenever sim.wake(ball) is
+        called; abilities that override on_tick should override this too,
+        the default has it polled every step. Compare times with
+        sim.due(time) so on_tick agrees with the step the timer fired on.
+        """
+        if type(self).on_tick is Ability.on_tick:
+            return None
+        return sim.time + sim.dt
+
+    def on_hit_by_projectile(self, sim, ball, projectile):
+        # Damage and burn time are the shooter's
+        shooter = projectile.owner.ability
+        ball.take_damage(shooter.damage, 'blazeball', projectile.owner)
+        # Set on fire, reset timer if already on fire
+        sim.ignite(ball, shooter.burn_time, projectile.owner)
+
+
+def bind_ability(ball, ability=None):
+    """Fill the ball's dispatch slots, handlers left at the no-op default become None"""
+    if ability is None:
+        ability = Ability()
+    cls = type(ability)
+    ball.ability = ability
+    ball.collide_priority = ability.collide_priority
+    ball.on_collide = ability.on_collide if cls.on_collide is not Ability.on_collide else None
+    ball.on_tick = ability.on_tick if cls.on_tick is not Ability.on_tick else None
+    ball.next_tick = ability.next_tick
+    ball.on_hit_by_projectile = ability.on_hit_by_projectile
+
+
+def push_away(sim, ball, x, y, force):
+    """Accelerate ball directly away from (x, y)"""
+    dx = ball.x - x
+    dy = ball.y - y
+    dist = math.hypot(dx, dy)
+    if dist == 0:
+        dx, dy = sim.rng.uniform(-1, 1), sim.rng.uniform(-1, 1)
+        dist = math.hypot(dx, dy)
+    ball.vx += force * dx / dist
+    ball.vy += force * dy / dist
+
+
+@register_ability('creeper')
+class CreeperAbility(Ability):
+    # Explosion happens regardless of the other fighter's abilities
+    collide_priority = 3
+    exclusive = True
+    params = {'damage': 4, 'self_damage': 2, 'push': 4.0}
+
+    def on_collide(self, sim, ball, other):
+        ex, ey = (ball.x + other.x) / 2, (ball.y + other.y) / 2
+
+        # Apply explosion damage
+        other.take_damage(self.damage, 'explosion', ball)
+        ball.take_damage(self.self_damage, 'explosion', ball)
+
+        # Accelerate both away from explosion
+        push_away(sim, ball, ex, ey, self.push)
+        push_away(sim, other, ex, ey, self.push)
+
+        sim.spawn_explosion(ex, ey)
+
+
+@register_ability('herobrine')
+class HerobrineAbility(Ability):
+    collide_priority = 2
+    params = {'visible_time': 3.0, 'self_damage': 2, 'counter_damage': 4}
+
+    def on_collide(self, sim, ball, other):
+        # Become visible for a while
+        ball.visible = True
+        ball.visible_until = sim.time + self.visible_time
+        sim.wake(ball)
+
+        # If visible, take double damage from all hits
+        ball.take_damage(self.self_damage, 'collision', other)
+
+        # Determine hit direction for counter-attack
+        dy = other.y - ball.y
+        dx = other.x - ball.x
+        if abs(dy) > abs(dx):
+            # Top or bottom hit - deal damage to enemy
+            other.take_damage(self.counter_damage, 'counter', ball)
+
+    def on_tick(self, sim, ball):
+        # Fade out again once the visibility window is over
+        if ball.visible and sim.due(ball.visible_until):
+            ball.visible = False
+
+    def next_tick(self, sim, ball):
+        return ball.visible_until if ball.visible else None
+
+
+@register_ability('steve')
+class SteveAbility(Ability):
+    collide_priority = 1
+    exclusive = True
+    params = {'knockback': 5.0, 'self_damage': 1}
+
+    def on_collide(self, sim, ball, other):
+        # Calculate enemy's speed
+        enemy_speed = math.hypot(other.vx, other.vy)
+        damage_multiplier = (enemy_speed - BALL_MAX_SPEED) * 2  # Higher multiplier
+
+        # Apply knockback to enemy
+        push_away(sim, other, ball.x, ball.y, self.knockback)
+
+        # Steve always takes damage from the collision
+        ball.take_damage(self.self_damage, 'collision', other)
+
+        # Deal damage to enemy if they're moving fast enough
+        if enemy_speed > BALL_MAX_SPEED:
+            other.take_damage(int(damage_multiplier / 8), 'knockback', ball)
+
+
+@register_ability('blaze')
+class BlazeAbility(Ability):
+    # damage and burn_time (seconds on fire) are applied to whoever a blazeball hits
+    params = {'cooldown': float(BLAZE_COOLDOWN), 'speed': float(BLAZEBALL_SPEED), 'damage': 1, 'burn_time': 5}
+
+    def on_tick(self, sim, ball):
+        # Shoot a blazeball every cooldown seconds
+        if not sim.due(ball.last_blazeball_time + self.cooldown):
+            return
+        enemy = sim.nearest_enemy(ball)
+        if enemy is not None:
+            # Shoot toward the nearest enemy
+            dx = enemy.x - ball.x
+            dy = enemy.y - ball.y
+            dist = math.hypot(dx, dy)
+            if dist == 0:
+                dist = 1
+            vx = self.speed * dx / dist
+            vy = self.speed * dy / dist
+        else:
+            angle = sim.rng.uniform(0, 2 * math.pi)
+            vx = self.speed * math.cos(angle)
+            vy = self.speed * math.sin(angle)
+        sim.spawn_blazeball(ball, vx, vy)
+        ball.last_blazeball_time = sim.time
+
+    def next_tick(self, sim, ball):
+        return ball.last_blazeball_time + self.cooldown
@@ -0,0 +1,116 @@
+"""Image cache: every file is decoded once and every scaled variant is made once.
+
+Scaled surfaces are kept in an LRU bounded by total pixel count, so the
+winner zoom (one size per animation frame) cannot grow the cache without
+limit while the small sprites used every frame stay resident.
+
+preload_async() decodes files on worker threads so the game can draw its
+first screen before every sprite is in. Converting to the display format
+and scaling stay on the main thread: poll() takes over finished files,
+and image() waits for a file that is still loading instead of reading it
+a second time.
+"""
+import os
+from collections import OrderedDict
+
+import pygame
+
+from config import IMAGES_DIR
+
+MAX_SCALED_PIXELS = 16 * 1024 * 1024  # about 64 MB of 32-bit surfaces
+
+
+class AssetManager:
+    def __init__(self, base_dir=IMAGES_DIR, max_scaled_pixels=MAX_SCALED_PIXELS):
+        self.base_dir = base_dir
+        self.max_scaled_pixels = max_scaled_pixels
+        self.images = {}  # file name -> decoded surface
+        self.scaled_images = OrderedDict()  # (file name, (w, h)) -> surface, oldest first
+        self.scaled_pixels = 0
+        self.disk_loads = 0  # files read and decoded
+        self.hits = 0  # scaled lookups served from the cache
+        self.misses = 0  # scaled lookups that had to smoothscale
+        self.loading = {}  # file name -> (future of the decoded surface, sizes to make once it's in)
+
+    def image(self, name):
+        """Decoded, display-converted image, read from disk on first use only"""
+        img = self.images.get(name)
+        if img is None:
+            if name in self.loading:
+                return self._adopt(name)
+            img = pygame.image.load(os.path.join(self.base_dir, name)).convert_alpha()
+            self.images[name] = img
+            self.disk_loads += 1
+        return img
+
+    def scaled(self, name, size):
+        """Image scaled to size (w, h), memoized per (name, size)"""
+        key = (name, (int(size[0]), int(size[1])))
+        img = self.scaled_images.get(key)
+        if img is not None:
+            self.scaled_images.move_to_end(key)
+            self.hits += 1
+            return img
+        self.misses += 1
+        img = pygame.transform.smoothscale(self.image(name), key[1])
+        self.scaled_images[key] = img
+        self.scaled_pixels += key[1][0] * key[1][1]
+        # Drop least recently used variants, never the one just made
+        while self.scaled_pixels > self.max_scaled_pixels and len(self.scaled_images) > 1:
+            (_, (w, h)), _ = self.scaled_images.popitem(last=False)
+            self.scaled_pixels -= w * h
+        return img
+
+    def preload(self, names, sizes=()):
+        """Decode names (and make each of the given scaled sizes) ahead of time"""
+        for name in names:
+            self.image(name)
+            for size in sizes:
+                self.scaled(name, size)
+
+    def preload_async(self, executor, names, sizes=()):
+        """Like preload(), but the files are decoded by executor's threads; see poll()"""
+        path = self.base_dir
+        for name in names:
+            if name in self.images:
+                for size in sizes:
+                    self.scaled(name, size)
+            elif name in self.loading:
+                self.loading[name][1].extend(sizes)
+            else:
+                self.loading[name] = (executor.submit(pygame.image.load, os.path.join(path, name)), list(sizes))
+
+    def poll(self):
+        """Take over the files preload_async() finished decoding, returns how many are still loading"""
+        for name, (future, _) in list(self.loading.items()):
+            if future.done():
+                self._adopt(name)
+        return len(self.loading)
+
+    def ready(self, name):
+        return name in self.images
+
+    def wait(self):
+        """Block until everything preload_async() was given is in"""
+        for name in list(self.loading):
+            self._adopt(name)
+
+    def _adopt(self, name):
+        future, sizes = self.loading.pop(name)
+        img = future.result().convert_alpha()
+        self.images[name] = img
+        self.disk_loads += 1
+        for size in sizes:
+            self.scaled(name, size)
+        return img
+
+    def stats(self):
+        return {
+            'disk_loads': self.disk_loads,
+            'hits': self.hits,
+            'misses': self.misses,
+            'images': len(self.images),
+            'loading': len(self.loading),
+            'scaled': len(self.scaled_images),
+            'scaled_pixels': self.scaled_pixels,
+        }
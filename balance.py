@@ -0,0 +1,405 @@
+"""Balance search: tune ability parameters until every matchup is close to 50%.
+
+The search space is the fighters' ability parameters (Steve's knockback,
+Creeper's damage and push, blazeball speed, ...), each between its roster
+value divided and multiplied by --spread unless given a range. A candidate
+is a full set of values; it is judged by seeded headless fights of every
+matchup it can change, played in rounds on a process pool. Its score is
+the root mean square of how far each matchup's win rate (draws count as
+half a win) is from 0.5, lower is better.
+
+Candidates are drawn Monte Carlo style: mostly a few parameters of the
+best set so far nudged by a random factor, which shrinks as the budget is
+spent, sometimes a fresh point anywhere in the space. Every candidate
+plays the same seeds (fight i of a matchup has the same seed for all of
+them), so scores differ by the parameters, not by luck of the draw, and
+a candidate can be compared with the best one over the fights both have
+played. After each round one that is more than Z standard errors less
+even than the best is dropped.
+
+Fight results are cached by a hash of the parameters and fight settings in
+--cache, so an interrupted or repeated search replays nothing it already
+played. The budget counts fights actually played.
+
+Usage:
+    python balance.py --budget 20000 --out results/balanced.json
+    python balance.py --params steve.knockback creeper.push=2:8 --budget 5000
+
+Writes the best parameters as a roster file (fighters.json with the params
+replaced) and prints every matchup's win rate before and after.
+"""
+import argparse
+import copy
+import hashlib
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+
+from abilities import ABILITIES
+from config import FRAME_RATE, ROSTER_FILE, SWEPT_COLLISIONS
+from roster import Roster
+from tournament import MAX_FIGHT_TIME, fight_seed, new_simulation, step_options_set
+
+SPREAD = 2.0  # default range: roster value / SPREAD .. roster value * SPREAD
+ROUND_FIGHTS = 8  # fights per matchup per round
+MAX_FIGHTS = 64  # fights per matchup for a candidate that is never dropped
+BUDGET = 20000  # fights played, cached ones are free
+Z = 2.0  # standard errors of slack before a candidate is dropped
+STEP = 0.5  # spread (log scale) of a nudge at the start of the search...
+MIN_STEP = 0.1  # ...shrinking to this at the end
+EXPLORE = 0.2  # chance of drawing a fresh point instead of nudging the best one
+STALL = 200  # fully cached candidates in a row before the search gives up
+CACHE_FILE = 'balance_cache.json'
+
+_rosters = {}  # per worker: candidate key -> Roster
+
+
+class Param:
+    """One searched ability parameter, values in [lo, hi]"""
+
+    def __init__(self, fighter, name, kind, lo, hi):
+        self.fighter = fighter
+        self.name = name
+        self.kind = kind
+        self.lo = kind(lo)
+        self.hi = kind(hi)
+
+    @property
+    def key(self):
+        return f"{self.fighter}.{self.name}"
+
+    def clip(self, value):
+        value = min(max(value, self.lo), self.hi)
+        return int(round(value)) if self.kind is int else round(float(value), 3)
+
+
+def search_space(data, selected=None, spread=SPREAD):
+    """Params of every fighter with an ability, or only the `selected` ones.
+
+    selected maps 'fighter.param' to a (lo, hi) range or None for the
+    default range around the roster value.
+    """
+    roster = Roster(data)
+    space = []
+    for fighter, name in enumerate(roster.names):
+        cls = ABILITIES.get(roster.abilities[fighter])
+        if cls is None:
+            continue
+        for param, default in sorted(cls.params.items()):
+            key = f"{name}.{param}"
+            if selected is not None and key not in selected:
+                continue
+            kind = type(default)
+            value = roster.params[fighter][param]
+            bounds = selected.get(key) if selected is not None else None
+            if bounds is None:
+                lo, hi = value / spread, value * spread
+                if kind is int:
+                    lo, hi = math.floor(lo), math.ceil(hi)
+            else:
+                lo, hi = bounds
+            space.append(Param(name, param, kind, lo, hi))
+    if selected is not None:
+        unknown = set(selected) - {p.key for p in space}
+        if unknown:
+            raise ValueError(f"unknown ability params {sorted(unknown)}, expected some of "
+                             f"{[p.key for p in search_space(data, spread=spread)]}")
+    return space
+
+
+def current_values(data, space):
+    roster = Roster(data)
+    return {p.key: roster.params[roster.id_of(p.fighter)][p.name] for p in space}
+
+
+def apply_values(data, values):
+    """Copy of the roster data with the candidate's values as fighter params"""
+    data = copy.deepcopy(data)
+    for key, value in values.items():
+        fighter, param = key.split('.')
+        data['fighters'][fighter].setdefault('params', {})[param] = value
+    return data
+
+
+def candidate_key(data, settings):
+    """Hash of a candidate's roster data and everything else that decides the fights' outcomes"""
+    text = json.dumps({'roster': data, 'settings': settings}, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+def matchups_of(names, space):
+    """Pairs of fighters where at least one has a searched parameter"""
+    tuned = {p.fighter for p in space}
+    return [(a, b) for a, b in itertools.combinations(names, 2) if a in tuned or b in tuned]
+
+
+def run_fight(job):
+    """One headless fight with the candidate's roster, returns (a, b, fight number, outcome)"""
+    key, data, type_a, type_b, fight, seed, max_time, dt, swept, engine = job
+    roster = _rosters.get(key)
+    if roster is None:
+        if len(_rosters) > 16:
+            _rosters.clear()
+        roster = _rosters[key] = Roster(data)
+    sim = new_simulation([type_a, type_b], seed, dt, swept, engine, roster)
+    winner = sim.run(max_time=max_time)
+    outcome = '-' if winner is None else 'a' if winner.type == type_a else 'b'
+    return type_a, type_b, fight, outcome
+
+
+def win_rate(outcomes):
+    """a's share of a matchup's outcomes, draws count half"""
+    if not outcomes:
+        return 0.5
+    return (outcomes.count('a') + outcomes.count('-') / 2) / len(outcomes)
+
+
+def imbalance(results, fights=None):
+    """Root mean square distance of the matchups' win rates from 0.5, over the first `fights` fights"""
+    return math.sqrt(sum((win_rate(r[:fights]) - 0.5) ** 2 for r in results.values()) / len(results))
+
+
+class BalanceSearch:
+    """Monte Carlo search over `space`, see the module docstring"""
+
+    def __init__(self, data, space, pool, cache, processes=None, seed=0, max_time=MAX_FIGHT_TIME,
+                 tick_rate=FRAME_RATE, swept=SWEPT_COLLISIONS, engine='event', round_fights=ROUND_FIGHTS,
+                 max_fights=MAX_FIGHTS):
+        self.data = data
+        self.space = space
+        self.pool = pool
+        self.workers = processes or os.cpu_count() or 1
+        # candidate key -> {'values', 'settings', 'fights', 'results': {'a|b': outcome of every fight}},
+        # outcomes 'a' (a won), 'b' or '-' (draw)
+        self.cache = cache
+        self.seed = seed
+        self.max_time = max_time
+        self.dt = 1.0 / tick_rate
+        self.swept = swept
+        self.engine = engine
+        self.settings = {'seed': seed, 'max_time': max_time, 'tick_rate': tick_rate, 'swept': swept,
+                         'engine': engine}
+        self.round_fights = round_fights
+        self.max_fights = max_fights
+        self.matchups = matchups_of(Roster(data).names, space)
+        self.rng = random.Random(seed)
+        self.played = 0
+        self.best = None  # (score, values, results) of the best candidate that played every round
+
+    def evaluate(self, values, budget):
+        """Play the candidate's rounds until it finishes, is dropped or the budget runs out.
+
+        A candidate is dropped when, over the fights both have played, it
+        is more than Z standard errors of the score less even than the
+        best candidate. Returns (score, results, finished); played fights
+        are added to self.played and cached.
+        """
+        data = apply_values(self.data, values)
+        key = candidate_key(data, self.settings)
+        entry = self.cache.setdefault(key, {'values': values, 'settings': self.settings, 'fights': 0,
+                                            'results': {f"{a}|{b}": '' for a, b in self.matchups}})
+        results = entry['results']
+        while True:
+            fights = entry['fights']
+            if fights >= self.max_fights:
+                return imbalance(results, self.max_fights), results, True
+            if fights and self.best is not None:
+                slack = Z * 0.5 / math.sqrt(fights * len(results))
+                if imbalance(results) > imbalance(self.best[2], fights) + slack:
+                    return imbalance(results), results, False
+            count = min(self.round_fights, self.max_fights - fights)
+            if self.played + count * len(self.matchups) > budget:
+                return None, results, False
+            jobs = [(key, data, a, b, i, fight_seed(self.seed, a, b, i), self.max_time, self.dt, self.swept,
+                     self.engine)
+                    for a, b in self.matchups for i in range(fights, fights + count)]
+            chunksize = max(1, len(jobs) // (self.workers * 4))
+            played = {name: [None] * count for name in results}
+            for type_a, type_b, fight, outcome in self.pool.imap_unordered(run_fight, jobs, chunksize=chunksize):
+                played[f"{type_a}|{type_b}"][fight - fights] = outcome
+            for name, outcomes in played.items():
+                results[name] += ''.join(outcomes)
+            entry['fights'] = fights + count
+            self.played += len(jobs)
+
+    def propose(self):
+        """A nudge of the best values, or now and then a fresh point"""
+        best = self.best[1]
+        if self.rng.random() < EXPLORE:
+            return {p.key: p.clip(self.rng.uniform(p.lo, p.hi)) for p in self.space}
+        step = self.step
+        values = dict(best)
+        for p in self.rng.sample(self.space, self.rng.randint(1, min(3, len(self.space)))):
+            value = best[p.key] * math.exp(self.rng.gauss(0, step))
+            if p.kind is int and round(value) == best[p.key]:
+                value += self.rng.choice((-1, 1))  # whole numbers need at least a step of one
+            values[p.key] = p.clip(value)
+        return values
+
+    def cached_best(self):
+        """(score, values, results) of the best finished candidate in the cache, from earlier searches"""
+        keys = {p.key for p in self.space}
+        best = None
+        for key, entry in self.cache.items():
+            if set(entry['values']) != keys or entry['fights'] < self.max_fights:
+                continue
+            # Entries of another starting roster or other settings hash differently
+            if candidate_key(apply_values(self.data, entry['values']), self.settings) == key:
+                score = imbalance(entry['results'], self.max_fights)
+                if best is None or score < best[0]:
+                    best = (score, entry['values'], entry['results'])
+        return best
+
+    def run(self, start, budget=BUDGET, on_candidate=None):
+        """Search from the `start` values until `budget` fights are played; returns self.best"""
+        self.budget = budget
+        self.step = STEP
+        score, results, finished = self.evaluate(start, budget)
+        if not finished:
+            raise ValueError(f"a budget of {budget} fights doesn't cover the starting values "
+                             f"({self.max_fights * len(self.matchups)} fights)")
+        self.best = (score, start, results)
+        if on_candidate:
+            on_candidate(start, score, True, True)
+        resumed = self.cached_best()
+        if resumed is not None and resumed[0] < score:
+            self.best = resumed
+            if on_candidate:
+                on_candidate(resumed[1], resumed[0], True, True)
+        stalled = 0
+        while stalled < STALL:
+            self.step = MIN_STEP + (STEP - MIN_STEP) * max(0.0, 1 - self.played / budget)
+            before = self.played
+            values = self.propose()
+            score, results, finished = self.evaluate(values, budget)
+            if score is None:
+                break  # out of budget
+            improved = finished and score < self.best[0]
+            if improved:
+                self.best = (score, values, results)
+            if on_candidate:
+                on_candidate(values, score, finished, improved)
+            stalled = stalled + 1 if self.played == before else 0
+        return self.best
+
+
+def load_cache(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_cache(path, cache):
+    if not path:
+        return
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(cache, f)
+    os.replace(temporary, path)
+
+
+def parse_params(names):
+    """'fighter.param' or 'fighter.param=lo:hi' -> {key: (lo, hi) or None}"""
+    selected = {}
+    for name in names:
+        key, _, bounds = name.partition('=')
+        if bounds:
+            try:
+                lo, hi = (float(v) for v in bounds.split(':'))
+            except ValueError:
+                raise ValueError(f"expected fighter.param=lo:hi, got {name!r}") from None
+            if not 0 <= lo <= hi:
+                raise ValueError(f"{name!r}: range must satisfy 0 <= lo <= hi")
+            selected[key] = (lo, hi)
+        else:
+            selected[key] = None
+    return selected
+
+
+def print_rates(matchups, before, after):
+    print(f"{'matchup':>22} {'before':>7} {'after':>7}")
+    for a, b in matchups:
+        name = f"{a}|{b}"
+        print(f"{a + ' vs ' + b:>22} {win_rate(before[name]):>7.3f} {win_rate(after[name]):>7.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search ability parameters for even matchups")
+    parser.add_argument('--roster', default=ROSTER_FILE, help="roster file to start from")
+    parser.add_argument('--params', nargs='+', metavar='FIGHTER.PARAM[=LO:HI]',
+                        help="only search these parameters (default: every ability parameter)")
+    parser.add_argument('--spread', type=float, default=SPREAD,
+                        help="default range: roster value divided and multiplied by this")
+    parser.add_argument('--budget', type=int, default=BUDGET, help="fights to play at most")
+    parser.add_argument('--round-fights', type=int, default=ROUND_FIGHTS,
+                        help="fights per matchup before a candidate may be dropped")
+    parser.add_argument('--max-fights', type=int, default=MAX_FIGHTS,
+                        help="fights per matchup for a candidate that is never dropped")
+    parser.add_argument('--seed', type=int, default=0, help="base seed of the fights and of the search")
+    parser.add_argument('--processes', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--max-time', type=float, default=MAX_FIGHT_TIME,
+                        help="simulated seconds before a fight counts as a draw")
+    parser.add_argument('--tick-rate', type=float, default=FRAME_RATE,
+                        help="simulation steps per simulated second (step engine)")
+    parser.add_argument('--swept', action='store_true', default=SWEPT_COLLISIONS,
+                        help="swept collision detection (step engine)")
+    parser.add_argument('--engine', choices=('step', 'event'), default='event',
+                        help="event-driven engine (default, fastest) or the fixed-step simulation")
+    parser.add_argument('--cache', default=CACHE_FILE, help="JSON file of cached fight results, '' for none")
+    parser.add_argument('--out', default='balanced.json', help="roster file to write the best parameters to")
+    args = parser.parse_args()
+    if args.engine == 'event' and step_options_set(1.0 / args.tick_rate, args.swept):
+        parser.error("--tick-rate and --swept only apply to --engine step")
+
+    with open(args.roster) as f:
+        data = json.load(f)
+    try:
+        space = search_space(data, parse_params(args.params) if args.params else None, args.spread)
+    except ValueError as e:
+        parser.error(str(e))
+    if not space:
+        parser.error("no ability parameters to search")
+    start = current_values(data, space)
+    cache = load_cache(args.cache)
+
+    def on_candidate(values, score, finished, improved):
+        state = 'best' if improved else 'done' if finished else 'dropped'
+        changed = ', '.join(f"{k}={v}" for k, v in values.items() if v != start[k]) or 'roster values'
+        print(f"{search.played:>7} fights  {score:.4f} {state:>7}  {changed}")
+
+    began = time.perf_counter()
+    with multiprocessing.Pool(args.processes) as pool:
+        search = BalanceSearch(data, space, pool, cache, args.processes, args.seed, args.max_time,
+                               args.tick_rate, args.swept, args.engine, args.round_fights, args.max_fights)
+        try:
+            best_score, best, results = search.run(start, args.budget, on_candidate)
+        except ValueError as e:
+            parser.error(str(e))
+        finally:
+            save_cache(args.cache, cache)
+    elapsed = time.perf_counter() - began
+
+    out_dir = os.path.dirname(args.out)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    with open(args.out, 'w') as f:
+        json.dump(apply_values(data, best), f, indent=2)
+        f.write('\n')
+    before = cache[candidate_key(apply_values(data, start), search.settings)]['results']
+    print()
+    print_rates(search.matchups, before, results)
+    print()
+    for p in space:
+        if best[p.key] != start[p.key]:
+            print(f"{p.key:>26} {start[p.key]} -> {best[p.key]}")
+    print(f"imbalance {imbalance(before):.4f} -> {best_score:.4f}, {search.played} fights in {elapsed:.1f}s, "
+          f"best parameters in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Structure-of-arrays storage for ball state.
+
+Every per-ball number lives in one contiguous NumPy array per field, so
+whole-arena passes such as movement and wall bounces run as a handful of
+vectorized operations instead of a Python loop over ball objects. Ball
+objects in simulation.py are thin views holding (store, index).
+"""
+import numpy as np
+
+# Scalar fields: name -> dtype. Positions and velocities are kept as (n, 2)
+# arrays (pos, vel) so a step touches two arrays instead of four; x, y, vx
+# and vy are column views into them.
+FIELDS = {
+    'radius': np.int32,
+    'mass': np.float64,
+    'health': np.int64,
+    'max_health': np.int64,
+    'poisoned': np.bool_,
+    'poison_time': np.int64,
+    'last_poison_tick': np.float64,
+    'poison_source': np.int64,  # index of the ball that poisoned this one
+    'on_fire': np.bool_,
+    'fire_time': np.int64,
+    'last_fire_tick': np.float64,
+    'fire_source': np.int64,  # index of the ball that set this one on fire
+    'last_blazeball_time': np.float64,
+    'visible': np.bool_,
+    'visible_until': np.float64,
+    'alive': np.bool_,
+}
+
+
+VECTOR_FIELDS = ('x', 'y', 'vx', 'vy')
+
+
+class BallStore:
+    def __init__(self, capacity=8):
+        self.count = 0
+        self.capacity = max(1, capacity)
+        self.events = None  # Simulation event list, set while events are recorded
+        self.pos = np.zeros((self.capacity, 2))
+        self.vel = np.zeros((self.capacity, 2))
+        for name, dtype in FIELDS.items():
+            setattr(self, name, np.zeros(self.capacity, dtype=dtype))
+        self._bind_views()
+
+    def _bind_views(self):
+        self.x, self.y = self.pos[:, 0], self.pos[:, 1]
+        self.vx, self.vy = self.vel[:, 0], self.vel[:, 1]
+
+    def _grow(self):
+        self.capacity *= 2
+        for name in ('pos', 'vel') + tuple(FIELDS):
+            old = getattr(self, name)
+            new = np.zeros((self.capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+        self._bind_views()
+
+    def add(self, x, y, vx, vy, radius, health, mass=1.0):
+        """Append a ball and return its index"""
+        if self.count == self.capacity:
+            self._grow()
+        i = self.count
+        self.x[i] = x
+        self.y[i] = y
+        self.vx[i] = vx
+        self.vy[i] = vy
+        self.radius[i] = radius
+        self.mass[i] = mass
+        self.health[i] = health
+        self.max_health[i] = health
+        self.visible[i] = True
+        self.alive[i] = True
+        self.count += 1
+        return i
+
+    def move(self, frames, left, top, right, bottom):
+        """Move every ball and reflect the ones that left the given box"""
+        n = self.count
+        pos, vel = self.pos[:n], self.vel[:n]
+        pos += vel * frames
+
+        # Bounce off arena walls, x and y columns in one pass
+        r = self.radius[:n, None]
+        lo = r + (left, top)
+        hi = (right, bottom) - r
+        out = (pos < lo) | (pos > hi)
+        if out.any():
+            np.maximum(pos, lo, out=pos)
+            np.minimum(pos, hi, out=pos)
+            vel[out] *= -1
+
+        self.shake_off_hidden()
+
+    def separate(self, pairs, iterations, left, top, right, bottom, slop):
+        """Push apart every pair of balls that still overlaps, heavier balls moving less.
+
+        pairs is an (m, 2) integer array of candidate pairs, e.g. from the
+        broadphase. Each iteration handles all overlapping pairs at once:
+        every ball moves by the mean of the corrections its contacts ask
+        for (so a ball squeezed from several sides doesn't overshoot) and is
+        then put back inside the box. A ball pinned on a wall thereby hands
+        the rest of its correction to its neighbours on the next iteration.
+        Stops once no pair overlaps by more than slop, returns the number
+        of iterations that moved anything.
+        """
+        n = self.count
+        pos = self.pos[:n]
+        a, b = pairs[:, 0], pairs[:, 1]
+        radius = self.radius[:n].astype(np.float64)
+        reach = radius[a] + radius[b]
+        inverse = 1.0 / self.mass[:n]
+        share_a = inverse[a] / (inverse[a] + inverse[b])
+        r = radius[:, None]
+        lo = r + (left, top)
+        hi = (right, bottom) - r
+        for iteration in range(iterations):
+            d = pos[a] - pos[b]
+            dist = np.sqrt((d * d).sum(axis=1))
+            overlap = reach - dist
+            hit = overlap > slop
+            if not hit.any():
+                return iteration
+            ia, ib = a[hit], b[hit]
+            d, dist, overlap, sa = d[hit], dist[hit], overlap[hit], share_a[hit]
+            # Coincident centers have no normal, pick one
+            same = dist == 0
+            if same.any():
+                d[same] = (1.0, 0.0)
+                dist[same] = 1.0
+            push = d * (overlap / dist)[:, None]
+            contacts = np.bincount(ia, minlength=n) + np.bincount(ib, minlength=n)
+            scale = 1.0 / np.maximum(contacts, 1)
+            for axis in (0, 1):
+                moved = np.bincount(ia, push[:, axis] * sa, minlength=n) - \
+                    np.bincount(ib, push[:, axis] * (1 - sa), minlength=n)
+                pos[:, axis] += moved * scale
+            np.maximum(pos, lo, out=pos)
+            np.minimum(pos, hi, out=pos)
+        return iterations
+
+    def shake_off_hidden(self):
+        """Hidden balls (invisible Herobrine) shake off all status effects"""
+        n = self.count
+        hidden = ~self.visible[:n]
+        if hidden.any():
+            self.poisoned[:n][hidden] = False
+            self.on_fire[:n][hidden] = False
+
+    def kill_dead(self):
+        """Clear the alive flag of every ball that ran out of health"""
+        n = self.count
+        self.alive[:n] &= self.health[:n] > 0
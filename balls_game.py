@@ -1,215 +1,148 @@
-import pygame
-import random
+import argparse
 import math
 import os
+import random
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-# --- Config ---
-SIDEBAR_WIDTH = 150
-ARENA_SIZE = 675
-WIDTH = ARENA_SIZE + (SIDEBAR_WIDTH * 2)  # 975 total width
-HEIGHT = 700  # Shorter arena
-ARENA_X = SIDEBAR_WIDTH  # Arena starts after left sidebar
-ARENA_Y = 0
-BALL_COUNT = 2
-BALL_RADIUS = 48  # 30 * 1.6
-BALL_MIN_SPEED = 5  # 7 * 0.75
-BALL_MAX_SPEED = 14  # 18 * 0.75
-
-
-def create_gradient_surface(width, height, color1, color2, vertical=True):
-    """Create a gradient surface from color1 to color2"""
+import numpy as np
+import pygame
+
+from assets import AssetManager
+from profiler import PHASES, FrameProfiler, StartupTimer
+from config import WIDTH, HEIGHT, BALL_COUNT, BLAZEBALL_RADIUS, FRAME_RATE
+from layout import Layout
+from replay import ReplayReader, ReplayWriter
+from roster import default_roster
+from simulation import Simulation
+from sprites import EffectSprites
+
+BLAZEBALL_FILE = 'blazeball.png'
+# Sizes below are pixels of the reference layout, a Layout scales them
+PORTRAIT_SIZE = 80
+# Start screen fighter grid
+THUMB_SIZE = 100
+PICK_MARGIN = 30
+# Threads decoding sprites and baking gradients while the start screen is up
+LOADER_THREADS = 2
+# Row height limits of the free-for-all roster list
+ROSTER_ROW_MIN = 14
+ROSTER_ROW_MAX = 40
+
+# Longest frame the simulation will catch up on, so a stall doesn't cause a burst of steps
+MAX_FRAME_TIME = 0.25
+# Seconds between re-renders of the profiler overlay's text
+OVERLAY_REFRESH = 0.25
+# Frames of the winner growing to fill the arena, then of holding it there
+WINNER_GROW_FRAMES = 60
+WINNER_HOLD_FRAMES = 3 * FRAME_RATE
+
+
+def create_gradient_surface(width, height, color1, color2, vertical=True, angle=None):
+    """Create a gradient surface from color1 to color2.
+
+    The gradient runs top to bottom (vertical) or left to right, or along
+    `angle` degrees (0 = left to right, 90 = top to bottom) when given.
+    Colors are computed with NumPy; an axis-aligned gradient is a one pixel
+    wide strip stretched over the surface, any other angle is filled per pixel.
+    """
+    if angle is None:
+        angle = 90 if vertical else 0
+    c1 = np.array(color1[:3], dtype=np.float64)
+    c2 = np.array(color2[:3], dtype=np.float64)
+
+    if angle in (0, 90):
+        length = height if angle == 90 else width
+        ratio = (np.arange(length) / length)[:, None]
+        ramp = (c1 * (1 - ratio) + c2 * ratio).astype(np.uint8)
+        # surfarray arrays are indexed [x, y]
+        strip = ramp[None, :, :] if angle == 90 else ramp[:, None, :]
+        return pygame.transform.scale(pygame.surfarray.make_surface(strip), (width, height))
+
+    # Project every pixel on the direction and spread the colors over the projected span
+    dx, dy = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+    xs = np.arange(width)[:, None]
+    ys = np.arange(height)[None, :]
+    low = min(0, (width - 1) * dx) + min(0, (height - 1) * dy)
+    span = abs(width * dx) + abs(height * dy)
+    ratio = ((xs * dx + ys * dy - low) / span)[:, :, None]
+    pixels = (c1 * (1 - ratio) + c2 * ratio).astype(np.uint8)
     gradient = pygame.Surface((width, height))
+    pygame.surfarray.blit_array(gradient, pixels)
+    return gradient
 
-    if vertical:
-        for y in range(height):
-            # Interpolate between colors
-            ratio = y / height
-            r = int(color1[0] * (1 - ratio) + color2[0] * ratio)
-            g = int(color1[1] * (1 - ratio) + color2[1] * ratio)
-            b = int(color1[2] * (1 - ratio) + color2[2] * ratio)
-            pygame.draw.line(gradient, (r, g, b), (0, y), (width, y))
-    else:
-        for x in range(width):
-            # Interpolate between colors
-            ratio = x / width
-            r = int(color1[0] * (1 - ratio) + color2[0] * ratio)
-            g = int(color1[1] * (1 - ratio) + color2[1] * ratio)
-            b = int(color1[2] * (1 - ratio) + color2[2] * ratio)
-            pygame.draw.line(gradient, (r, g, b), (x, 0), (x, height))
 
-    return gradient
+def build_arena(layout, arena_gradient):
+    """Arena gradient with its colored borders, composited once and reused by every screen"""
+    arena = arena_gradient.copy()
+    width, height = arena.get_size()
+    border_width = layout.px(3)
+    # Blue borders - top and sides
+    pygame.draw.rect(arena, (0, 100, 255), (0, 0, width, border_width))  # Top
+    pygame.draw.rect(arena, (0, 100, 255), (0, 0, border_width, height))  # Left
+    pygame.draw.rect(arena, (0, 100, 255), (width - border_width, 0, border_width, height))  # Right
+    # Green border - bottom
+    pygame.draw.rect(arena, (0, 200, 0), (0, height - border_width, width, border_width))  # Bottom
+    return arena
 
 
-# --- Ball Class ---
-class Ball:
-    def __init__(self, x, y, vx, vy, radius, color, health=20, type=None):
-        self.x = x
-        self.y = y
-        self.vx = vx
-        self.vy = vy
-        self.radius = radius
-        self.color = color
-        self.health = health
-        self.max_health = health
-        self.type = type  # e.g. 'blaze', 'zombie', etc.
-        self.face_img = None
-        self.poisoned = False
-        self.poison_time = 0
-        self.last_poison_tick = 0
-        self.on_fire = False
-        self.fire_time = 0
-        self.last_fire_tick = 0
-        self.last_blazeball_time = 0  # For Blaze only
-        self.visible = True  # For Herobrine
-        self.visible_until = 0  # For Herobrine
-
-    def move(self):
-        self.x += self.vx
-        self.y += self.vy
-
-        # Bounce off arena walls (white square)
-        if self.x - self.radius < ARENA_X:
-            self.x = ARENA_X + self.radius
-            self.vx *= -1
-        if self.x + self.radius > ARENA_X + ARENA_SIZE:
-            self.x = ARENA_X + ARENA_SIZE - self.radius
-            self.vx *= -1
-        if self.y - self.radius < ARENA_Y:
-            self.y = ARENA_Y + self.radius
-            self.vy *= -1
-        if self.y + self.radius > ARENA_Y + HEIGHT:
-            self.y = ARENA_Y + HEIGHT - self.radius
-            self.vy *= -1
-
-        # Herobrine: if not visible, remove all effects
-        if self.type == 'herobrine' and not self.visible:
-            self.poisoned = False
-            self.on_fire = False
-
-    def update_poison(self, current_time):
-        if self.poisoned:
-            # Poison ticks every 0.5 second
-            if current_time - self.last_poison_tick >= 1:
-                self.health -= 1
-                self.last_poison_tick = current_time
-                self.poison_time -= 1
-                if self.poison_time <= 0:
-                    self.poisoned = False
-
-    def update_fire(self, current_time):
-        if self.on_fire:
-            if current_time - self.last_fire_tick >= 1:
-                self.health -= 1
-                self.last_fire_tick = current_time
-                self.fire_time -= 1
-                if self.fire_time <= 0:
-                    self.on_fire = False
-
-    def update_visibility(self, current_time):
-        if self.type == 'herobrine' and not self.visible and current_time >= self.visible_until:
-            self.visible = False
-        if self.type == 'herobrine' and self.visible and current_time >= self.visible_until:
-            self.visible = False
-
-    def draw(self, screen, font):
-        # Herobrine: 80% transparent when invisible
-        if self.type == 'herobrine' and not self.visible:
-            # Draw transparent ball and face
-            surf = pygame.Surface((self.radius * 2, self.radius * 2), pygame.SRCALPHA)
-            pygame.draw.circle(surf, self.color + (51,), (self.radius, self.radius), self.radius)
-            if self.face_img:
-                img = pygame.transform.smoothscale(self.face_img, (self.radius * 2, self.radius * 2))
-                surf.blit(img, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
-            screen.blit(surf, (int(self.x - self.radius), int(self.y - self.radius)))
-            return
-        pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), self.radius)
-        # Draw fire outline if on fire - simplified fiery effect
-        if self.on_fire:
-            pygame.draw.circle(screen, (255, 69, 0), (int(self.x), int(self.y)), self.radius + 5, 4)
-        # Draw poison outline if poisoned
-        if self.poisoned:
-            pygame.draw.circle(screen, (0, 255, 0), (int(self.x), int(self.y)), self.radius + 8, 4)
-        # Draw face image if available
-        if self.face_img:
-            img_rect = self.face_img.get_rect(center=(int(self.x), int(self.y)))
-            screen.blit(self.face_img, img_rect)
-
-
-class Blazeball:
-    def __init__(self, x, y, vx, vy, owner_idx):
-        self.x = x
-        self.y = y
-        self.vx = vx
-        self.vy = vy
-        self.radius = int(16 * 1.3)  # 30% bigger
-        self.owner_idx = owner_idx  # index of the ball that shot it
-        self.active = True
-        self.img = pygame.image.load(os.path.join('images', 'blazeball.png')).convert_alpha()
-        self.img = pygame.transform.smoothscale(self.img, (self.radius * 2, self.radius * 2))
-
-    def move(self):
-        self.x += self.vx
-        self.y += self.vy
-        # Deactivate if out of arena bounds
-        if not (ARENA_X <= self.x <= ARENA_X + ARENA_SIZE and ARENA_Y <= self.y <= ARENA_Y + HEIGHT):
-            self.active = False
+def face_size(layout, radius):
+    """Pixel size of the face sprite of a ball of `radius` world units"""
+    diameter = layout.px(radius) * 2
+    return diameter, diameter
+
+
+def blazeball_size(layout):
+    return face_size(layout, BLAZEBALL_RADIUS)
+
+
+def portrait_size(layout):
+    return layout.px(PORTRAIT_SIZE), layout.px(PORTRAIT_SIZE)
+
+
+# --- Drawing ---
+def draw_ball(screen, layout, ball, face_img, sprites):
+    x, y = layout.to_screen(ball.x, ball.y)
+    r = layout.px(ball.radius)
+    # Herobrine: 80% transparent when invisible
+    if not ball.visible:
+        # Draw the pre-baked transparent ball and face
+        surf = sprites.ghost(ball.type, ball.color, face_img, r)
+        return screen.blit(surf, (int(x - r), int(y - r)))
+    center = (int(x), int(y))
+    pygame.draw.circle(screen, ball.color, center, r)
+    # Draw fire outline if on fire - simplified fiery effect
+    if ball.on_fire:
+        pygame.draw.circle(screen, (255, 69, 0), center, r + layout.px(5), layout.px(4))
+    # Draw poison outline if poisoned
+    if ball.poisoned:
+        pygame.draw.circle(screen, (0, 255, 0), center, r + layout.px(8), layout.px(4))
+    # Draw face image if available
+    if face_img:
+        img_rect = face_img.get_rect(center=center)
+        screen.blit(face_img, img_rect)
+    # Area covered by the ball and its widest (poison) outline
+    reach = r + layout.px(8)
+    return pygame.Rect(center[0] - reach, center[1] - reach, reach * 2 + 1, reach * 2 + 1)
+
+
+def draw_blazeball(screen, layout, blazeball, img):
+    if blazeball.active:
+        rect = img.get_rect(center=layout.point(blazeball.x, blazeball.y))
+        return screen.blit(img, rect)
 
-    def draw(self, screen):
-        if self.active:
-            rect = self.img.get_rect(center=(int(self.x), int(self.y)))
-            screen.blit(self.img, rect)
-
-
-class Explosion:
-    def __init__(self, x, y, start_time):
-        self.x = x
-        self.y = y
-        self.start_time = start_time
-        self.duration = 0.5  # seconds
-        self.max_radius = 120
-        self.active = True
-
-    def draw(self, screen, current_time):
-        elapsed = current_time - self.start_time
-        if elapsed > self.duration:
-            self.active = False
-            return
-        progress = elapsed / self.duration
-        radius = int(self.max_radius * progress)
-        alpha = int(255 * (1 - progress))
-        if radius > 0:
-            surf = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
-            # Simplified red explosion for creeper
-            pygame.draw.circle(surf, (255, 80, 80, alpha), (radius, radius), radius)
-            pygame.draw.circle(surf, (255, 150, 100, alpha), (radius, radius), int(radius * 0.6))
-            screen.blit(surf, (self.x - radius, self.y - radius))
-
-
-class HitEffect:
-    def __init__(self, x, y, start_time):
-        self.x = x
-        self.y = y
-        self.start_time = start_time
-        self.duration = 0.15  # seconds
-        self.max_radius = 32
-        self.active = True
-
-    def draw(self, screen, current_time):
-        elapsed = current_time - self.start_time
-        if elapsed > self.duration:
-            self.active = False
-            return
-        progress = elapsed / self.duration
-        radius = int(self.max_radius * progress)
-        alpha = int(180 * (1 - progress))
-        if radius > 0:
-            surf = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
-            pygame.draw.circle(surf, (255, 255, 255, alpha), (radius, radius), radius)
-            screen.blit(surf, (self.x - radius, self.y - radius))
 
+def draw_explosion(screen, layout, explosion, current_time, sprites):
+    x, y = layout.to_screen(explosion.x, explosion.y)
+    return sprites.explosion.draw(screen, x, y, current_time - explosion.start_time)
 
-def draw_health_bar(screen, x, y, width, height, current_health, max_health, color):
+
+def draw_hit_effect(screen, layout, effect, current_time, sprites):
+    x, y = layout.to_screen(effect.x, effect.y)
+    return sprites.hit_effect.draw(screen, x, y, current_time - effect.start_time)
+
+
+def draw_health_bar(screen, x, y, width, height, current_health, max_health, color, border=2):
     """Draw a health bar at the specified position"""
     # Background (empty health)
     pygame.draw.rect(screen, (100, 100, 100), (x, y, width, height))
@@ -218,35 +151,30 @@ def draw_health_bar(screen, x, y, width, height, current_health, max_health, col
         fill_width = int(width * (current_health / max_health))
         pygame.draw.rect(screen, color, (x, y, fill_width, height))
     # Border
-    pygame.draw.rect(screen, (0, 0, 0), (x, y, width, height), 2)
+    pygame.draw.rect(screen, (0, 0, 0), (x, y, width, height), border)
 
 
-def draw_sidebar(screen, font, ball, side, fighter_img, sidebar_gradient):
+def draw_sidebar(screen, layout, font, ball, side, portrait, sidebar_gradient):
     """Draw sidebar with fighter portrait and health bar"""
-    if side == 'left':
-        sidebar_x = 10
-        # Draw left sidebar gradient
-        screen.blit(sidebar_gradient, (0, 0))
-    else:  # right
-        sidebar_x = ARENA_X + ARENA_SIZE + 10
-        # Draw right sidebar gradient
-        screen.blit(sidebar_gradient, (ARENA_X + ARENA_SIZE, 0))
-
-    # Fighter portrait
-    portrait_size = 80
-    portrait_y = HEIGHT // 2 - portrait_size // 2
+    px = layout.px
+    sidebar = layout.sidebars[0 if side == 'left' else 1]
+    sidebar_x = sidebar.x + px(10)
+    sidebar_rect = screen.blit(sidebar_gradient, sidebar, pygame.Rect((0, 0), sidebar.size))
+
+    # Fighter portrait, passed in already scaled to PORTRAIT_SIZE
+    portrait_size = px(PORTRAIT_SIZE)
+    portrait_y = sidebar.centery - portrait_size // 2
     portrait_rect = pygame.Rect(sidebar_x, portrait_y, portrait_size, portrait_size)
 
-    if fighter_img:
-        img = pygame.transform.smoothscale(fighter_img, (portrait_size, portrait_size))
-        screen.blit(img, portrait_rect)
-    pygame.draw.rect(screen, (0, 0, 0), portrait_rect, 2)
+    if portrait:
+        screen.blit(portrait, portrait_rect)
+    pygame.draw.rect(screen, (0, 0, 0), portrait_rect, px(2))
 
     # Health bar
-    bar_width = SIDEBAR_WIDTH - 20
-    bar_height = 20
+    bar_width = sidebar.width - px(20)
+    bar_height = px(20)
     bar_x = sidebar_x
-    bar_y = portrait_y + portrait_size + 20
+    bar_y = portrait_y + portrait_size + px(20)
 
     # Determine health bar color based on health percentage
     health_percent = ball.health / ball.max_health if ball.max_health > 0 else 0
@@ -258,507 +186,775 @@ def draw_sidebar(screen, font, ball, side, fighter_img, sidebar_gradient):
         bar_color = (255, 0, 0)  # Red
 
     draw_health_bar(screen, bar_x, bar_y, bar_width, bar_height,
-                    ball.health, ball.max_health, bar_color)
+                    ball.health, ball.max_health, bar_color, px(2))
 
     # Health text
     health_text = f"{ball.health}/{ball.max_health}"
     health_surf = font.render(health_text, True, (255, 255, 255))
-    health_rect = health_surf.get_rect(center=(sidebar_x + bar_width // 2, bar_y + bar_height + 15))
+    health_rect = health_surf.get_rect(center=(sidebar_x + bar_width // 2, bar_y + bar_height + px(15)))
     screen.blit(health_surf, health_rect)
 
     # Character name
     name_surf = font.render(ball.type.capitalize(), True, (255, 255, 255))
-    name_rect = name_surf.get_rect(center=(sidebar_x + bar_width // 2, portrait_y - 20))
+    name_rect = name_surf.get_rect(center=(sidebar_x + bar_width // 2, portrait_y - px(20)))
     screen.blit(name_surf, name_rect)
 
     # Status effects
-    status_y = bar_y + bar_height + 40
+    status_y = bar_y + bar_height + px(40)
     if ball.on_fire:
         fire_surf = font.render("🔥 Fire", True, (255, 140, 0))
         fire_rect = fire_surf.get_rect(center=(sidebar_x + bar_width // 2, status_y))
         screen.blit(fire_surf, fire_rect)
-        status_y += 25
+        status_y += px(25)
     if ball.poisoned:
         poison_surf = font.render("☠ Poison", True, (0, 255, 0))
         poison_rect = poison_surf.get_rect(center=(sidebar_x + bar_width // 2, status_y))
         screen.blit(poison_surf, poison_rect)
+    return sidebar_rect
+
+
+def draw_arena(screen, layout, arena):
+    screen.blit(arena, layout.arena)
+
+
+def draw_fight_objects(screen, layout, state, assets, sprites, fighter_files):
+    """Draw balls, blazeballs and effects, returns the rects that were drawn"""
+    rects = []
+    current_time = state.time
+    for ball in state.balls:
+        face_img = assets.scaled(fighter_files[ball.type], face_size(layout, ball.radius))
+        rects.append(draw_ball(screen, layout, ball, face_img, sprites))
+    if state.blazeballs:
+        blazeball_img = assets.scaled(BLAZEBALL_FILE, blazeball_size(layout))
+        for b in state.blazeballs:
+            rects.append(draw_blazeball(screen, layout, b, blazeball_img))
+    for e in state.explosions:
+        rects.append(draw_explosion(screen, layout, e, current_time, sprites))
+    for h in state.hit_effects:
+        rects.append(draw_hit_effect(screen, layout, h, current_time, sprites))
+    return [rect for rect in rects if rect]
+
+
+def draw_fight(screen, layout, state, assets, sprites, fighter_files, arena, hud):
+    """Draw one full frame of a fight from a Simulation (or a replay frame)"""
+    screen.fill((0, 0, 0))  # Black background
+    draw_arena(screen, layout, arena)
+    # Nothing spills out of the arena, not even into the bars of a letterboxed layout
+    screen.set_clip(layout.arena)
+    draw_fight_objects(screen, layout, state, assets, sprites, fighter_files)
+    screen.set_clip(None)
+    hud.draw(screen, state.balls, full=True)
+
+
+class DuelHud:
+    """The two sidebar panels of a regular fight, one per fighter"""
+
+    def __init__(self, layout, font, assets, fighter_files, sidebar_gradient):
+        self.layout = layout
+        self.font = font
+        self.assets = assets
+        self.fighter_files = fighter_files
+        self.sidebar_gradient = sidebar_gradient
+        self.reset()
+
+    def reset(self):
+        self.keys = {}  # side -> what its panel shows
+
+    def draw(self, screen, balls, full=False):
+        """Draw the panels whose fighter changed (every panel if full), returns their rects"""
+        rects = []
+        for ball, side in zip(balls, ('left', 'right')):
+            key = (ball.type, ball.health, ball.max_health, ball.on_fire, ball.poisoned)
+            if full or self.keys.get(side) != key:
+                self.keys[side] = key
+                portrait = self.assets.scaled(self.fighter_files[ball.type], portrait_size(self.layout))
+                rects.append(draw_sidebar(screen, self.layout, self.font, ball, side, portrait,
+                                          self.sidebar_gradient))
+        return rects
+
+
+class RosterHud:
+    """Compact fighter list for free-for-alls, one row per fighter over both sidebars.
+
+    Rows keep their place for the whole fight (knocked out fighters are
+    greyed out) and each row is redrawn only when what it shows changed.
+    Rows shrink with the roster down to ROSTER_ROW_MIN (reference) pixels;
+    fighters that still don't fit are summed up in a "+N more" line.
+    """
+
+    def __init__(self, layout, assets, fighter_files, sidebar_gradient, fighters):
+        self.layout = layout
+        self.assets = assets
+        self.fighter_files = fighter_files
+        self.sidebar_gradient = sidebar_gradient
+        height = layout.sidebars[0].height
+        per_side = max(1, math.ceil(len(fighters) / 2))
+        self.row_height = max(layout.px(ROSTER_ROW_MIN), min(layout.px(ROSTER_ROW_MAX), height // per_side))
+        rows_per_side = height // self.row_height
+        capacity = 2 * rows_per_side
+        if len(fighters) > capacity:
+            capacity -= 1  # last row says how many are left out
+        self.hidden = max(0, len(fighters) - capacity)
+        self.font = pygame.font.SysFont(None, max(layout.px(14), self.row_height - layout.px(6)))
+        self.rows = {}  # ball index -> (row rect, fighter type, max health)
+        for slot, ball in enumerate(fighters[:capacity]):
+            self.rows[ball.index] = (self._row_rect(slot, rows_per_side), ball.type, ball.max_health)
+        self.more_rect = self._row_rect(capacity, rows_per_side)
+        self.reset()
+
+    def _row_rect(self, slot, rows_per_side):
+        side, row = divmod(slot, rows_per_side)
+        sidebar = self.layout.sidebars[min(side, 1)]
+        return pygame.Rect(sidebar.x, sidebar.y + row * self.row_height, sidebar.width, self.row_height)
+
+    def reset(self):
+        self.keys = {}  # ball index -> what its row shows
+
+    def draw(self, screen, balls, full=False):
+        """Draw the rows whose fighter changed (every row if full), returns their rects"""
+        alive = {ball.index: ball for ball in balls}
+        rects = []
+        if full:
+            # The rows needn't fill the sidebars at every size, show the gradient below them too
+            for sidebar in self.layout.sidebars:
+                rects.append(screen.blit(self.sidebar_gradient, sidebar, pygame.Rect((0, 0), sidebar.size)))
+        for index, (rect, fighter_type, max_health) in self.rows.items():
+            ball = alive.get(index)
+            key = (ball.health, ball.on_fire, ball.poisoned) if ball else None
+            if full or index not in self.keys or self.keys[index] != key:
+                self.keys[index] = key
+                self._draw_row(screen, rect, fighter_type, max_health, ball)
+                rects.append(rect)
+        if full and self.hidden:
+            self._clear(screen, self.more_rect)
+            text = self.font.render(f"+{self.hidden} more", True, (40, 40, 40))
+            screen.blit(text, text.get_rect(center=self.more_rect.center))
+            rects.append(self.more_rect)
+        return rects
+
+    def _clear(self, screen, rect):
+        # Sidebar gradient rows are the same on both sides
+        top = self.layout.sidebars[0].y
+        screen.blit(self.sidebar_gradient, rect, pygame.Rect(0, rect.y - top, rect.width, rect.height))
+
+    def _draw_row(self, screen, rect, fighter_type, max_health, ball):
+        px = self.layout.px
+        self._clear(screen, rect)
+        pad = px(2)
+        size = rect.height - 2 * pad
+        portrait_rect = pygame.Rect(rect.x + px(6), rect.y + pad, size, size)
+        portrait = self.assets.scaled(self.fighter_files[fighter_type], (size, size))
+        screen.blit(portrait, portrait_rect)
+        bar_x = portrait_rect.right + px(4)
+        bar_width = rect.right - px(6) - bar_x
+        if ball is None:
+            # Knocked out
+            shade = pygame.Surface(portrait_rect.size, pygame.SRCALPHA)
+            shade.fill((0, 0, 0, 150))
+            screen.blit(shade, portrait_rect)
+            text = self.font.render("KO", True, (90, 90, 90))
+            screen.blit(text, text.get_rect(midleft=(bar_x, rect.centery)))
+            return
+        # Fire and poison show as a colored frame around the portrait
+        if ball.poisoned:
+            pygame.draw.rect(screen, (0, 255, 0), portrait_rect, px(2))
+        elif ball.on_fire:
+            pygame.draw.rect(screen, (255, 69, 0), portrait_rect, px(2))
+        health_percent = ball.health / max_health if max_health > 0 else 0
+        if health_percent > 0.6:
+            bar_color = (0, 255, 0)
+        elif health_percent > 0.3:
+            bar_color = (255, 255, 0)
+        else:
+            bar_color = (255, 0, 0)
+        draw_health_bar(screen, bar_x, rect.y + pad, bar_width, size, ball.health, max_health, bar_color, px(2))
+        text = self.font.render(str(ball.health), True, (0, 0, 0))
+        screen.blit(text, text.get_rect(center=(bar_x + bar_width // 2, rect.centery)))
+
+
+def make_hud(layout, font, assets, fighter_files, sidebar_gradient, fighters):
+    """Sidebar panels for a regular fight, a roster list for a free-for-all"""
+    if len(fighters) <= 2:
+        return DuelHud(layout, font, assets, fighter_files, sidebar_gradient)
+    return RosterHud(layout, assets, fighter_files, sidebar_gradient, fighters)
+
+
+def build_background(layout, arena, sidebar_gradient=None):
+    """Everything in a fight frame that never moves, composited once.
+
+    Without a sidebar gradient the sidebars are left black, as on the winner screen.
+    """
+    background = pygame.Surface(layout.size).convert()
+    background.fill((0, 0, 0))
+    draw_arena(background, layout, arena)
+    if sidebar_gradient is not None:
+        for sidebar in layout.sidebars:
+            background.blit(sidebar_gradient, sidebar, pygame.Rect((0, 0), sidebar.size))
+    return background
+
+
+class Display:
+    """The window, and the surface frames are drawn on.
+
+    At render scale 1 frames are drawn straight into the window, laid out
+    for its full size. Below 1 they are drawn on an offscreen surface that
+    much smaller, laid out (fonts and sprites included) for that size, and
+    stretched over the window when presented: far fewer pixels to fill per
+    frame on a large window, for a softer picture.
+    """
+
+    def __init__(self, window, render_scale=1.0):
+        self.window = window
+        self.render_scale = render_scale
+        width, height = window.get_size()
+        if render_scale == 1:
+            self.surface = window
+        else:
+            self.surface = pygame.Surface((max(1, round(width * render_scale)),
+                                           max(1, round(height * render_scale)))).convert()
+        self.layout = Layout(self.surface.get_size())
+        self.stretch = (width / self.surface.get_width(), height / self.surface.get_height())
+
+    def to_surface(self, pos):
+        """Surface position of a window position, e.g. of a mouse click"""
+        return int(pos[0] / self.stretch[0]), int(pos[1] / self.stretch[1])
+
+    def _upscale(self):
+        pygame.transform.scale(self.surface, self.window.get_size(), self.window)
+
+    def flip(self):
+        if self.surface is not self.window:
+            self._upscale()
+        pygame.display.flip()
+
+    def update(self, rects):
+        """Show only the given surface rects"""
+        if self.surface is not self.window:
+            # The whole frame is stretched so neighbouring rects line up, only the changed parts are sent
+            self._upscale()
+            sx, sy = self.stretch
+            rects = [pygame.Rect(int(r.x * sx) - 1, int(r.y * sy) - 1, math.ceil(r.width * sx) + 2,
+                                 math.ceil(r.height * sy) + 2) for r in rects]
+        pygame.display.update(rects)
+
+
+class DirtyRectRenderer:
+    """Draws fight frames by repainting only the regions that changed.
+
+    The static background is composited once. Each frame the areas drawn
+    over last frame are restored from it, the moving objects are drawn
+    again, the HUD redraws only the panels or rows whose fighter changed,
+    and only those rects are presented by display.update().
+
+    With a profiler the drawing and the display update are lapped as the
+    'draw' and 'present' phases, and a visible overlay is drawn (and
+    cleaned up) like the moving objects.
+    """
+
+    def __init__(self, display, background, hud, profiler=None, overlay=None):
+        self.display = display
+        self.screen = display.surface
+        self.layout = display.layout
+        self.background = background
+        self.hud = hud
+        self.profiler = profiler
+        self.overlay = overlay
+        self.arena_rect = display.layout.arena
+        self.reset()
+
+    def reset(self):
+        """Repaint the whole screen on the next frame, e.g. after something else drew on it"""
+        self.sprite_rects = None
+        self.hud.reset()
+
+    def draw(self, state, assets, sprites, fighter_files):
+        screen = self.screen
+        full = self.sprite_rects is None
+        dirty = []
+        if full:
+            screen.blit(self.background, (0, 0))
+        else:
+            for rect in self.sprite_rects:
+                screen.blit(self.background, rect, rect)
+            dirty.extend(self.sprite_rects)
+
+        # In a full frame the sidebars are drawn over anything that spilled out
+        # of the arena, here they may not be redrawn so clip to the arena instead
+        screen.set_clip(self.arena_rect)
+        rects = [rect.clip(self.arena_rect) for rect in
+                 draw_fight_objects(screen, self.layout, state, assets, sprites, fighter_files)]
+        screen.set_clip(None)
+        self.sprite_rects = rects
+        dirty.extend(rects)
+
+        dirty.extend(self.hud.draw(screen, state.balls, full))
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.lap('draw')
+
+        overlay = self.overlay
+        if overlay is not None and overlay.visible:
+            rect = overlay.draw(screen)
+            self.sprite_rects.append(rect)
+            dirty.append(rect)
+            if profiler is not None:
+                profiler.lap('overlay')
+
+        if full:
+            self.display.flip()
+        else:
+            self.display.update(dirty)
+        if profiler is not None:
+            profiler.lap('present')
+
+
+class ProfilerOverlay:
+    """Frame-time readout in the arena's top-left corner: rolling FPS,
+    mean milliseconds of every phase and the number of live objects.
+
+    The text is re-rendered every OVERLAY_REFRESH seconds, in between the
+    same surface is blitted again.
+    """
+
+    def __init__(self, layout, profiler, visible=False):
+        self.layout = layout
+        self.profiler = profiler
+        self.visible = visible
+        self.font = layout.font(14, 'monospace')
+        self.surface = None
+        self.rendered_at = -math.inf
+
+    def toggle(self):
+        self.visible = not self.visible
+
+    def draw(self, screen):
+        now = time.perf_counter()
+        if now - self.rendered_at >= OVERLAY_REFRESH:
+            self.surface = self._render()
+            self.rendered_at = now
+        arena = self.layout.arena
+        return screen.blit(self.surface, (arena.x + self.layout.px(6), arena.y + self.layout.px(6)))
+
+    def _render(self):
+        profiler = self.profiler
+        fps = profiler.fps()
+        averages = profiler.averages()
+        counts = profiler.counts
+        lines = [f"{fps:5.1f} fps {1000 / fps if fps else 0:6.2f} ms"]
+        lines += [f"{phase:<12}{max(averages[phase], 0.0):6.2f} ms" for phase in PHASES]
+        lines.append(f"steps {counts['steps']}  balls {counts['balls']}")
+        lines.append(f"blazeballs {counts['blazeballs']}")
+        lines.append(f"effects {counts['explosions']} + {counts['hit_effects']}")
+        rendered = [self.font.render(line, True, (255, 255, 255)) for line in lines]
+        line_height = self.font.get_linesize()
+        px = self.layout.px
+        width = max(text.get_width() for text in rendered) + px(12)
+        surface = pygame.Surface((width, line_height * len(rendered) + px(8)), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 170))
+        for i, text in enumerate(rendered):
+            surface.blit(text, (px(6), px(4) + i * line_height))
+        return surface
+
+
+def window_size(text):
+    """'WxH' -> (W, H), for --window"""
+    try:
+        width, height = (int(v) for v in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {text!r}") from None
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"window size must be positive, got {text!r}")
+    return width, height
+
+
+def fighter_count(text):
+    """Number of fighters of a free-for-all, for --ffa"""
+    try:
+        count = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a whole number, got {text!r}") from None
+    if count < 2:
+        raise argparse.ArgumentTypeError(f"a free-for-all needs at least 2 fighters, got {count}")
+    return count
+
+
+def round_path(path, fight):
+    """Replay path of the fight-th fight (from 1) of a session: path itself, then name-2.ext, name-3.ext..."""
+    if fight == 1:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}-{fight}{ext}"
+
+
+def report_asset_stats(assets, before):
+    """Print the image cache counters, and how many disk loads happened since `before`"""
+    stats = assets.stats()
+    during = {key: stats[key] - before[key] for key in ('disk_loads', 'hits', 'misses')}
+    print(f"assets: {stats} | this fight: {during}")
 
 
 def random_color():
     return (random.randint(50, 255), random.randint(50, 255), random.randint(50, 255))
 
 
-def balls_collide(ball1, ball2):
-    dx = ball1.x - ball2.x
-    dy = ball1.y - ball2.y
-    distance = math.hypot(dx, dy)
-    return distance < ball1.radius + ball2.radius
-
-
-def resolve_collision(ball1, ball2):
-    # Calculate the normal vector
-    dx = ball1.x - ball2.x
-    dy = ball1.y - ball2.y
-    distance = math.hypot(dx, dy)
-    if distance == 0:
-        # Prevent division by zero
-        distance = 0.1
-    nx = dx / distance
-    ny = dy / distance
-
-    # Relative velocity
-    dvx = ball1.vx - ball2.vx
-    dvy = ball1.vy - ball2.vy
-    # Velocity along the normal
-    vn = dvx * nx + dvy * ny
-    if vn > 0:
-        return  # Balls are moving away
-
-    # Simple elastic collision (equal mass)
-    ball1.vx -= vn * nx
-    ball1.vy -= vn * ny
-    ball2.vx += vn * nx
-    ball2.vy += vn * ny
-
-    # Separate balls so they don't stick
-    overlap = (ball1.radius + ball2.radius) - distance
-    ball1.x += nx * (overlap / 2)
-    ball1.y += ny * (overlap / 2)
-    ball2.x -= nx * (overlap / 2)
-    ball2.y -= ny * (overlap / 2)
-
-
-def get_image_files():
-    # Only allow common image extensions, and exclude blazeball.png
-    allowed_exts = {'.jpg', '.jpeg', '.png'}
-    files = []
-    for f in os.listdir('images'):
-        ext = os.path.splitext(f)[1].lower()
-        if ext in allowed_exts and f != 'blazeball.png':
-            files.append(f)
-    return files
-
-
-def main():
-    def create_balls(selected_imgs):
-        balls = []
-        types = [os.path.splitext(os.path.basename(f))[0] for f in selected_imgs]
-        colors = [(100, 200, 100), (60, 120, 60)]  # Placeholder colors
-        face_imgs = []
-        for img_file in selected_imgs:
-            img = pygame.image.load(os.path.join('images', img_file)).convert_alpha()
-            img = pygame.transform.smoothscale(img, (BALL_RADIUS * 2, BALL_RADIUS * 2))
-            face_imgs.append(img)
-        for i in range(BALL_COUNT):
-            while True:
-                x = random.randint(ARENA_X + BALL_RADIUS, ARENA_X + ARENA_SIZE - BALL_RADIUS)
-                y = random.randint(ARENA_Y + BALL_RADIUS, ARENA_Y + HEIGHT - BALL_RADIUS)
-                vx = random.choice([-1, 1]) * random.uniform(BALL_MIN_SPEED, BALL_MAX_SPEED)
-                vy = random.choice([-1, 1]) * random.uniform(BALL_MIN_SPEED, BALL_MAX_SPEED)
-                ball_type = types[i % 2]
-                color = colors[i % 2]
-                face_img = face_imgs[i % 2]
-                new_ball = Ball(x, y, vx, vy, BALL_RADIUS, color, health=100, type=ball_type)
-                new_ball.face_img = face_img
-                if all(not balls_collide(new_ball, b) for b in balls):
-                    balls.append(new_ball)
-                    break
-        return balls
+def init_display(caption, size=(WIDTH, HEIGHT), render_scale=1.0, fullscreen=False):
+    """Start only the pygame subsystems the game uses (no audio or joysticks) and open the window.
+
+    Returns a Display; fullscreen takes the desktop's size instead of `size`.
+    """
+    pygame.display.init()
+    pygame.font.init()
+    if fullscreen:
+        window = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+    else:
+        window = pygame.display.set_mode(size)
+    pygame.display.set_caption(caption)
+    return Display(window, render_scale)
+
+
+def bake_gradients(layout):
+    """The arena and sidebar gradients. Touches no display state, so it can run on a worker thread."""
+    arena = layout.arena
+    sidebar = max(layout.sidebars, key=lambda rect: rect.width)
+    return (create_gradient_surface(arena.width, arena.height, (60, 60, 60), (30, 30, 30), vertical=True),
+            create_gradient_surface(sidebar.width, sidebar.height, (180, 180, 180), (220, 220, 220),
+                                    vertical=True))
+
+
+def start_loading(loader, assets, fighter_files, layout):
+    """Queue every sprite and the gradients on the loader threads, returns the gradients' future"""
+    assets.preload_async(loader, fighter_files.values(), sizes=[thumb_size(layout), portrait_size(layout)])
+    assets.preload_async(loader, [BLAZEBALL_FILE], sizes=[blazeball_size(layout)])
+    return loader.submit(bake_gradients, layout)
+
+
+def thumb_size(layout):
+    return layout.px(THUMB_SIZE), layout.px(THUMB_SIZE)
+
+
+def thumb_rect(layout, idx):
+    col = idx % 4
+    row = idx // 4
+    x = layout.rect.x + layout.px(PICK_MARGIN + col * (THUMB_SIZE + PICK_MARGIN))
+    y = layout.rect.y + layout.px(PICK_MARGIN + row * (THUMB_SIZE + PICK_MARGIN))
+    return pygame.Rect((x, y), thumb_size(layout))
 
-    pygame.init()
-    screen = pygame.display.set_mode((WIDTH, HEIGHT))
-    pygame.display.set_caption("Bouncing Balls Arena")
-    clock = pygame.time.Clock()
-    font = pygame.font.SysFont(None, 24)
-    big_font = pygame.font.SysFont(None, 96)
 
-    # Create gradient surfaces
-    arena_gradient = create_gradient_surface(ARENA_SIZE, HEIGHT, (60, 60, 60), (30, 30, 30), vertical=True)
-    sidebar_gradient = create_gradient_surface(SIDEBAR_WIDTH, HEIGHT, (180, 180, 180), (220, 220, 220), vertical=True)
+def draw_picker(display, font, title, assets, fighter_files, selected):
+    """One frame of the start screen. Fighters whose sprite is still loading show their name."""
+    screen, layout = display.surface, display.layout
+    screen.fill((30, 30, 30))
+    screen.blit(font.render(title, True, (255, 255, 255)),
+                (layout.rect.x + layout.px(PICK_MARGIN), layout.rect.y + layout.px(5)))
+    for idx, (name, file) in enumerate(fighter_files.items()):
+        rect = thumb_rect(layout, idx)
+        if assets.ready(file):
+            screen.blit(assets.scaled(file, thumb_size(layout)), rect)
+        else:
+            pygame.draw.rect(screen, (60, 60, 60), rect)
+            label = font.render(name.capitalize(), True, (200, 200, 200))
+            screen.blit(label, label.get_rect(center=rect.center))
+        if name in selected:
+            pygame.draw.rect(screen, (0, 255, 0), rect, layout.px(4))
+    display.flip()
+
+
+def pick_fighters(display, clock, font, assets, fighter_files, ffa, startup):
+    """Start screen: returns the picked fighter names, None if the window was closed.
 
-    # --- Start Screen ---
-    image_files = get_image_files()
+    With ffa picking ends with Enter, otherwise after BALL_COUNT picks.
+    """
+    if ffa:
+        title = f"Pick fighters for a {ffa} fighter free-for-all, then press Enter"
+    else:
+        title = f"Pick {BALL_COUNT} Fighters"
     selected = []
-    thumb_size = 100
-    margin = 30
-    running = True
-    while running and len(selected) < 2:
+    while ffa or len(selected) < BALL_COUNT:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit()
-                return
+                return None
+            if ffa and event.type == pygame.KEYDOWN and event.key == pygame.K_RETURN and selected:
+                return selected
             if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                mx, my = event.pos
-                for idx, img_file in enumerate(image_files):
-                    col = idx % 4
-                    row = idx // 4
-                    x = margin + col * (thumb_size + margin)
-                    y = margin + row * (thumb_size + margin)
-                    rect = pygame.Rect(x, y, thumb_size, thumb_size)
-                    if rect.collidepoint(mx, my):
-                        if img_file not in selected:
-                            selected.append(img_file)
-        screen.fill((30, 30, 30))
-        title = font.render("Pick 2 Fighters", True, (255, 255, 255))
-        screen.blit(title, (margin, 5))
-        for idx, img_file in enumerate(image_files):
-            col = idx % 4
-            row = idx // 4
-            x = margin + col * (thumb_size + margin)
-            y = margin + row * (thumb_size + margin)
-            img = pygame.image.load(os.path.join('images', img_file)).convert_alpha()
-            img = pygame.transform.smoothscale(img, (thumb_size, thumb_size))
-            rect = pygame.Rect(x, y, thumb_size, thumb_size)
-            screen.blit(img, rect)
-            if img_file in selected:
-                pygame.draw.rect(screen, (0, 255, 0), rect, 4)
-        pygame.display.flip()
+                pos = display.to_surface(event.pos)
+                for idx, name in enumerate(fighter_files):
+                    if thumb_rect(display.layout, idx).collidepoint(pos) and name not in selected:
+                        selected.append(name)
+        if not assets.poll():
+            startup.mark('sprites')
+        draw_picker(display, font, title, assets, fighter_files, selected)
+        startup.mark('first_frame')
         clock.tick(30)
-    if len(selected) < 2:
-        return
-
+    return selected
+
+
+def winner_radius(layout, ball, frame):
+    """Pixel radius of the winner in frame `frame` of the grow animation, full size from the last one on"""
+    frame = min(frame, WINNER_GROW_FRAMES - 1)
+    radius = layout.px(ball.radius)
+    return int(radius + (layout.arena.width // 2 - radius) * (frame / (WINNER_GROW_FRAMES - 1)))
+
+
+def draw_winner(screen, layout, background, big_font, assets, ball, fighter_file, r):
+    """One frame of the winner screen, the winner drawn with radius r"""
+    screen.blit(background, (0, 0))
+    center = layout.arena.center
+    pygame.draw.circle(screen, ball.color, center, r)
+    img = assets.scaled(fighter_file, (r * 2, r * 2))
+    screen.blit(img, img.get_rect(center=center))
+    text_surf = big_font.render(f"{ball.type.capitalize()} Wins!", True, (255, 255, 0))
+    screen.blit(text_surf, text_surf.get_rect(center=center))
+
+
+def show_winner(display, clock, background, big_font, assets, ball, fighter_file):
+    """Grow the winner to fill the arena and hold it there, returns False if the window was closed"""
+    screen, layout = display.surface, display.layout
+    for frame in range(WINNER_GROW_FRAMES):
+        draw_winner(screen, layout, background, big_font, assets, ball, fighter_file,
+                    winner_radius(layout, ball, frame))
+        display.flip()
+        clock.tick(FRAME_RATE)
+    # Hold the winner face for about 3 seconds
+    for _ in range(WINNER_HOLD_FRAMES):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+        draw_winner(screen, layout, background, big_font, assets, ball, fighter_file, layout.arena.width // 2)
+        display.flip()
+        clock.tick(FRAME_RATE)
+    return True
+
+
+def show_draw(display, clock, big_font, arena_gradient):
+    """Draw screen with a restart button, returns False if the window was closed instead"""
+    screen, layout = display.surface, display.layout
+    px = layout.px
+    button_font = layout.font(48)
+    button_text = button_font.render("Restart", True, (0, 0, 0))
+    button_rect = pygame.Rect(0, 0, px(220), px(80))
+    button_rect.midtop = (layout.rect.centerx, layout.rect.centery + px(100))
+    text_surf = big_font.render("Draw!", True, (255, 255, 0))
     while True:
-        balls = create_balls(selected)
-        # Store original fighter images for sidebars
-        fighter_imgs = []
-        for img_file in selected:
-            img = pygame.image.load(os.path.join('images', img_file)).convert_alpha()
-            fighter_imgs.append(img)
-
-        running = True
-        winner = None
-        blazeballs = []
-        explosions = []
-        hit_effects = []
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    return
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+            if (event.type == pygame.MOUSEBUTTONDOWN and event.button == 1
+                    and button_rect.collidepoint(display.to_surface(event.pos))):
+                return True
+        screen.fill((60, 60, 60))
+        screen.blit(arena_gradient, layout.arena)
+        pygame.draw.rect(screen, (0, 0, 0), layout.arena, px(3))
+        screen.blit(text_surf, text_surf.get_rect(center=(layout.arena.centerx, layout.arena.centery - px(50))))
+        pygame.draw.rect(screen, (200, 200, 200), button_rect)
+        pygame.draw.rect(screen, (0, 0, 0), button_rect, px(4))
+        screen.blit(button_text, button_text.get_rect(center=button_rect.center))
+        display.flip()
+        clock.tick(30)
+
+
+def main(seed=None, record=None, asset_stats=False, full_redraw=False, ffa=0, profiler=None, profile=False,
+         startup=None, startup_time=False, window=(WIDTH, HEIGHT), render_scale=1.0, fullscreen=False):
+    """Pick fighters and fight, then back to picking until the window is closed.
+
+    With ffa=N the picked fighters fill a roster of N for a free-for-all,
+    picking ends with Enter. F3 toggles the frame time overlay during a
+    fight (shown from the start with profile=True). seed only applies to
+    the first fight. With record every fight is recorded, the first to that
+    path and later ones numbered (see round_path). window is the window size in pixels, frames are drawn
+    at render_scale times that and stretched to fit (see Display).
+
+    The start screen comes up before the sprites and gradients are loaded,
+    they are decoded on background threads meanwhile. Startup milestones go
+    to `startup` (a StartupTimer) and are printed with startup_time.
+    """
+    if profiler is None:
+        profiler = FrameProfiler()
+    if startup is None:
+        startup = StartupTimer()
+    loader = ThreadPoolExecutor(max_workers=LOADER_THREADS, thread_name_prefix='assets')
+    try:
+        display = init_display("Bouncing Balls Arena", window, render_scale, fullscreen)
+        screen, layout = display.surface, display.layout
+        startup.mark('window')
+        clock = pygame.time.Clock()
+        font = layout.font(24)
+        big_font = layout.font(96)
+        fighter_files = default_roster().sprite_files()
+        assets = AssetManager()
+        gradients = start_loading(loader, assets, fighter_files, layout)
+        sprites = EffectSprites(layout.scale)
+        background = None
+        fights = 0
 
-            # Move balls
-            for ball in balls:
-                ball.move()
-
-            # Blaze: shoot blazeball every second
-            current_time = pygame.time.get_ticks() / 1000.0
-            for idx, ball in enumerate(balls):
-                if ball.type == 'blaze':
-                    if current_time - ball.last_blazeball_time >= 1:
-                        # Shoot toward the other ball
-                        if len(balls) == 2:
-                            enemy_idx = 1 - idx
-                            enemy = balls[enemy_idx]
-                            dx = enemy.x - ball.x
-                            dy = enemy.y - ball.y
-                            dist = math.hypot(dx, dy)
-                            if dist == 0:
-                                dist = 1
-                            speed = 12 * 1.5  # 1.5x as fast
-                            vx = speed * dx / dist
-                            vy = speed * dy / dist
-                        else:
-                            angle = random.uniform(0, 2 * math.pi)
-                            speed = 12 * 1.5
-                            vx = speed * math.cos(angle)
-                            vy = speed * math.sin(angle)
-                        blazeballs.append(Blazeball(ball.x, ball.y, vx, vy, idx))
-                        ball.last_blazeball_time = current_time
-
-            # Move blazeballs
-            for b in blazeballs:
-                b.move()
-            blazeballs = [b for b in blazeballs if b.active]
-
-            # Handle blazeball collisions
-            for b in blazeballs:
-                for idx, ball in enumerate(balls):
-                    if idx != b.owner_idx and b.active:
-                        dx = ball.x - b.x
-                        dy = ball.y - b.y
-                        dist = math.hypot(dx, dy)
-                        if dist < ball.radius + b.radius:
-                            ball.health -= 1
-                            # Set on fire for 5s, reset timer if already on fire
-                            ball.on_fire = True
-                            ball.fire_time = 5
-                            ball.last_fire_tick = current_time
-                            b.active = False
-
-            # Handle collisions and effects
-            collided_pairs = set()
-            for i in range(len(balls)):
-                for j in range(i + 1, len(balls)):
-                    if balls_collide(balls[i], balls[j]):
-                        pair = tuple(sorted((i, j)))
-                        if pair not in collided_pairs:
-                            resolve_collision(balls[i], balls[j])
-                            # Add a small hit effect at the collision point
-                            hx, hy = (balls[i].x + balls[j].x) / 2, (balls[i].y + balls[j].y) / 2
-                            hit_effects.append(HitEffect(hx, hy, current_time))
-
-                            # Special character logic - Check for Creeper first!
-                            creeper_exploded = False
-
-                            # Creeper explosion effect - happens regardless of other abilities
-                            if balls[i].type == 'creeper' or balls[j].type == 'creeper':
-                                creeper_exploded = True
-                                # Find which is creeper and which is enemy
-                                if balls[i].type == 'creeper':
-                                    creeper_ball = balls[i]
-                                    enemy_ball = balls[j]
-                                    creeper_idx = i
-                                    enemy_idx = j
-                                else:
-                                    creeper_ball = balls[j]
-                                    enemy_ball = balls[i]
-                                    creeper_idx = j
-                                    enemy_idx = i
-
-                                ex, ey = (creeper_ball.x + enemy_ball.x) / 2, (creeper_ball.y + enemy_ball.y) / 2
-
-                                # Apply explosion damage
-                                enemy_ball.health -= 4
-                                creeper_ball.health -= 2
-
-                                # Accelerate both away from explosion
-                                for b in [creeper_ball, enemy_ball]:
-                                    dx = b.x - ex
-                                    dy = b.y - ey
-                                    dist = math.hypot(dx, dy)
-                                    if dist == 0:
-                                        dx, dy = random.uniform(-1, 1), random.uniform(-1, 1)
-                                        dist = math.hypot(dx, dy)
-                                    push = 4  # reduced explosion force
-                                    b.vx += push * dx / dist
-                                    b.vy += push * dy / dist
-
-                                explosions.append(Explosion(ex, ey, current_time))
-
-                            # Now handle other special character abilities (if no creeper explosion)
-                            if not creeper_exploded:
-                                special_handled = False
-
-                                # Herobrine special logic
-                                for idx, (a, b) in enumerate([(i, j), (j, i)]):
-                                    if balls[a].type == 'herobrine':
-                                        # Become visible for 3 seconds
-                                        balls[a].visible = True
-                                        balls[a].visible_until = current_time + 3
-
-                                        # If invisible, immune to damage
-                                        if not balls[a].visible:
-                                            special_handled = True
-                                            continue
-
-                                        # If visible, take double damage from all hits
-                                        balls[a].health -= 2
-
-                                        # Determine hit direction for counter-attack
-                                        dy = balls[b].y - balls[a].y
-                                        dx = balls[b].x - balls[a].x
-                                        if abs(dy) > abs(dx):
-                                            # Top or bottom hit - deal damage to enemy
-                                            balls[b].health -= 4
-                                        special_handled = True
-
-                                # Steve special logic (if Herobrine didn't handle it)
-                                if not special_handled:
-                                    for idx, (a, b) in enumerate([(i, j), (j, i)]):
-                                        if balls[a].type == 'steve':
-                                            # Calculate enemy's speed
-                                            enemy_speed = math.hypot(balls[b].vx, balls[b].vy)
-                                            damage_multiplier = (enemy_speed - BALL_MAX_SPEED) * 2  # Higher multiplier
-
-                                            # Apply knockback to enemy
-                                            dx = balls[b].x - balls[a].x
-                                            dy = balls[b].y - balls[a].y
-                                            dist = math.hypot(dx, dy)
-                                            if dist == 0:
-                                                dx, dy = random.uniform(-1, 1), random.uniform(-1, 1)
-                                                dist = math.hypot(dx, dy)
-                                            knockback_force = 5  # Reduced from 8
-                                            balls[b].vx += knockback_force * dx / dist
-                                            balls[b].vy += knockback_force * dy / dist
-
-                                            # Steve always takes 1 damage from collision
-                                            balls[a].health -= 1
-
-                                            # Deal damage to enemy if they're moving fast enough
-                                            if enemy_speed > BALL_MAX_SPEED:
-                                                balls[b].health -= int(damage_multiplier / 8)
-                                            else:
-                                                # Enemy still takes 1 damage from regular collision
-                                                balls[b].health -= 0
-
-                                            special_handled = True
-                                            break
-
-                                # Regular collision damage if no special abilities triggered
-                                if not special_handled:
-                                    balls[i].health -= 1
-                                    balls[j].health -= 1
-
-                            collided_pairs.add(pair)
-
-            # Update poison/fire effects
-            for ball in balls:
-                ball.update_poison(current_time)
-                ball.update_fire(current_time)
-                ball.update_visibility(current_time)
-            # Remove dead balls
-            balls = [ball for ball in balls if ball.health > 0]
-            # Remove finished explosions
-            explosions = [e for e in explosions if e.active]
-            hit_effects = [e for e in hit_effects if e.active]
-
-            # Check for winner
-            if len(balls) == 1:
-                winner_ball = balls[0]
-                # Animate winner growing to fill the arena
-                grow_radius = winner_ball.radius
-                grow_center = (winner_ball.x, winner_ball.y)
-                grow_img = winner_ball.face_img
-                grow_color = winner_ball.color
-                grow_type = winner_ball.type
-                grow_health = winner_ball.health
-                for frame in range(60):
-                    screen.fill((0, 0, 0))  # Black background
-                    # Draw arena gradient background
-                    screen.blit(arena_gradient, (ARENA_X, ARENA_Y))
-                    # Draw colored borders
-                    border_width = 3
-                    pygame.draw.rect(screen, (0, 100, 255), (ARENA_X, ARENA_Y, ARENA_SIZE, border_width))  # Top
-                    pygame.draw.rect(screen, (0, 100, 255), (ARENA_X, ARENA_Y, border_width, HEIGHT))  # Left
-                    pygame.draw.rect(screen, (0, 100, 255),
-                                     (ARENA_X + ARENA_SIZE - border_width, ARENA_Y, border_width, HEIGHT))  # Right
-                    pygame.draw.rect(screen, (0, 200, 0),
-                                     (ARENA_X, ARENA_Y + HEIGHT - border_width, ARENA_SIZE, border_width))  # Bottom
-                    # Grow the ball
-                    r = int(grow_radius + (ARENA_SIZE // 2 - grow_radius) * (frame / 59))
-                    pygame.draw.circle(screen, grow_color, (int(ARENA_X + ARENA_SIZE // 2), int(HEIGHT // 2)), r)
-                    if grow_img:
-                        img = pygame.transform.smoothscale(grow_img, (r * 2, r * 2))
-                        img_rect = img.get_rect(center=(ARENA_X + ARENA_SIZE // 2, HEIGHT // 2))
-                        screen.blit(img, img_rect)
-                    # Draw winner text
-                    winner_text = f"{grow_type.capitalize()} Wins!"
-                    text_surf = big_font.render(winner_text, True, (255, 255, 0))
-                    text_rect = text_surf.get_rect(center=(ARENA_X + ARENA_SIZE // 2, HEIGHT // 2))
-                    screen.blit(text_surf, text_rect)
-                    pygame.display.flip()
-                    clock.tick(60)
-                # Hold the winner face for about 3 seconds
-                hold_frames = 3 * 60
-                for _ in range(hold_frames):
-                    for event in pygame.event.get():
-                        if event.type == pygame.QUIT:
-                            pygame.quit()
-                            return
-                    screen.fill((0, 0, 0))  # Black background
-                    screen.blit(arena_gradient, (ARENA_X, ARENA_Y))
-                    # Draw colored borders
-                    border_width = 3
-                    pygame.draw.rect(screen, (0, 100, 255), (ARENA_X, ARENA_Y, ARENA_SIZE, border_width))  # Top
-                    pygame.draw.rect(screen, (0, 100, 255), (ARENA_X, ARENA_Y, border_width, HEIGHT))  # Left
-                    pygame.draw.rect(screen, (0, 100, 255),
-                                     (ARENA_X + ARENA_SIZE - border_width, ARENA_Y, border_width, HEIGHT))  # Right
-                    pygame.draw.rect(screen, (0, 200, 0),
-                                     (ARENA_X, ARENA_Y + HEIGHT - border_width, ARENA_SIZE, border_width))  # Bottom
-                    r = ARENA_SIZE // 2
-                    pygame.draw.circle(screen, grow_color, (int(ARENA_X + ARENA_SIZE // 2), int(HEIGHT // 2)), r)
-                    if grow_img:
-                        img = pygame.transform.smoothscale(grow_img, (r * 2, r * 2))
-                        img_rect = img.get_rect(center=(ARENA_X + ARENA_SIZE // 2, HEIGHT // 2))
-                        screen.blit(img, img_rect)
-                    winner_text = f"{grow_type.capitalize()} Wins!"
-                    text_surf = big_font.render(winner_text, True, (255, 255, 0))
-                    text_rect = text_surf.get_rect(center=(ARENA_X + ARENA_SIZE // 2, HEIGHT // 2))
-                    screen.blit(text_surf, text_rect)
-                    pygame.display.flip()
-                    clock.tick(60)
-                # Immediately return to start screen after animation
-                main()
-                return
-            elif len(balls) == 0:
-                # No draw screen, just return to start
-                break
-
-            # Draw everything
-            screen.fill((0, 0, 0))  # Black background
-
-            # Draw arena gradient background
-            screen.blit(arena_gradient, (ARENA_X, ARENA_Y))
-
-            # Draw colored borders
-            border_width = 3
-            # Blue borders - top and sides
-            pygame.draw.rect(screen, (0, 100, 255), (ARENA_X, ARENA_Y, ARENA_SIZE, border_width))  # Top
-            pygame.draw.rect(screen, (0, 100, 255), (ARENA_X, ARENA_Y, border_width, HEIGHT))  # Left
-            pygame.draw.rect(screen, (0, 100, 255),
-                             (ARENA_X + ARENA_SIZE - border_width, ARENA_Y, border_width, HEIGHT))  # Right
-            # Green border - bottom
-            pygame.draw.rect(screen, (0, 200, 0),
-                             (ARENA_X, ARENA_Y + HEIGHT - border_width, ARENA_SIZE, border_width))  # Bottom
-
-            # Draw balls in arena
-            for ball in balls:
-                ball.draw(screen, font)
-            for b in blazeballs:
-                b.draw(screen)
-            for e in explosions:
-                e.draw(screen, current_time)
-            for h in hit_effects:
-                h.draw(screen, current_time)
-
-            # Draw sidebars
-            if len(balls) >= 1:
-                draw_sidebar(screen, font, balls[0], 'left', fighter_imgs[0], sidebar_gradient)
-            if len(balls) >= 2:
-                draw_sidebar(screen, font, balls[1], 'right', fighter_imgs[1], sidebar_gradient)
-
-            pygame.display.flip()
-            clock.tick(60)
-
-        # Winner screen with restart button
-        if winner:
-            winner_text = f"{winner.capitalize()} Wins!"
-        else:
-            winner_text = "Draw!"
-        button_font = pygame.font.SysFont(None, 48)
-        button_text = button_font.render("Restart", True, (0, 0, 0))
-        button_w, button_h = 220, 80
-        button_x = WIDTH // 2 - button_w // 2
-        button_y = HEIGHT // 2 + 100
-        button_rect = pygame.Rect(button_x, button_y, button_w, button_h)
         while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    return
-                if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                    if button_rect.collidepoint(event.pos):
-                        # Restart the fight (go back to start screen)
-                        return main()
+            selected = pick_fighters(display, clock, font, assets, fighter_files, ffa, startup)
+            if selected is None:
+                return
+            if background is None:
+                # Built once, every later round reuses them
+                arena_gradient, sidebar_gradient = gradients.result()
+                arena = build_arena(layout, arena_gradient)
+                background = build_background(layout, arena, sidebar_gradient)
+                # The winner animation shows the arena with black sidebars
+                winner_background = build_background(layout, arena)
+
+            if ffa:
+                # Fill the roster by cycling through the picked fighters
+                types = [selected[i % len(selected)] for i in range(ffa)]
             else:
-                screen.fill((60, 60, 60))
-                # Draw arena gradient background
-                screen.blit(arena_gradient, (ARENA_X, ARENA_Y))
-                pygame.draw.rect(screen, (0, 0, 0), (ARENA_X, ARENA_Y, ARENA_SIZE, HEIGHT), 3)
-
-                text_surf = big_font.render(winner_text, True, (255, 255, 0))
-                text_rect = text_surf.get_rect(center=(ARENA_X + ARENA_SIZE // 2, HEIGHT // 2 - 50))
-                screen.blit(text_surf, text_rect)
-                # Draw button
-                pygame.draw.rect(screen, (200, 200, 200), button_rect)
-                pygame.draw.rect(screen, (0, 0, 0), button_rect, 4)
-                btn_text_rect = button_text.get_rect(center=button_rect.center)
-                screen.blit(button_text, btn_text_rect)
-                pygame.display.flip()
-                clock.tick(30)
-                continue
-            break
+                types = list(selected)
+            sim = Simulation(types, seed=seed)
+            seed = None
+            fights += 1
+            recorder = ReplayWriter(round_path(record, fights), sim) if record else None
+            # Faces and sidebar portraits are scaled once here, not per frame
+            face_sizes = {face_size(layout, ball.radius) for ball in sim.balls}
+            assets.preload({fighter_files[name] for name in selected},
+                           sizes=sorted(face_sizes) + [portrait_size(layout)])
+            fight_stats = assets.stats()
+            hud = make_hud(layout, font, assets, fighter_files, sidebar_gradient, sim.balls)
+            overlay = ProfilerOverlay(layout, profiler, visible=profile)
+            renderer = DirtyRectRenderer(display, background, hud, profiler, overlay)
+            sim.profiler = profiler
+
+            dt = 0.0
+            profiler.begin_frame()
+            while True:
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        if recorder:
+                            recorder.close()
+                        return
+                    if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                        overlay.toggle()
+                        profile = overlay.visible
+                profiler.lap('input')
+
+                # Advance the fight by the real time that passed since the last frame
+                steps = sim.step(min(dt, MAX_FRAME_TIME))
+                if sim.finished:
+                    break
+
+                if full_redraw:
+                    draw_fight(screen, layout, sim, assets, sprites, fighter_files, arena, hud)
+                    profiler.lap('draw')
+                    if overlay.visible:
+                        overlay.draw(screen)
+                        profiler.lap('overlay')
+                    display.flip()
+                    profiler.lap('present')
+                else:
+                    renderer.draw(sim, assets, sprites, fighter_files)
+                if 'first_fight_frame' not in startup.marks:
+                    startup.mark('first_fight_frame')
+                    if startup_time:
+                        print(f"startup: {startup.report()}")
+                dt = clock.tick(FRAME_RATE) / 1000.0
+                profiler.lap('idle')
+                profiler.end_frame(steps=steps, balls=len(sim.balls), blazeballs=len(sim.blazeballs),
+                                   explosions=len(sim.explosions), hit_effects=len(sim.hit_effects))
+
+            if recorder:
+                recorder.close()
+            if asset_stats:
+                report_asset_stats(assets, fight_stats)
+            if sim.winner is not None:
+                if not show_winner(display, clock, winner_background, big_font, assets, sim.winner,
+                                   fighter_files[sim.winner.type]):
+                    return
+            elif not show_draw(display, clock, big_font, arena_gradient):
+                return
+            # Back to the start screen
+    finally:
+        # Drop the queued loads but let running ones finish, they still use pygame
+        loader.shutdown(wait=True, cancel_futures=True)
+        pygame.quit()
+
+
+def play_replay(path, full_redraw=False, window=(WIDTH, HEIGHT), render_scale=1.0, fullscreen=False):
+    """Play back a recorded fight. Left/Right skip 5 seconds, Space pauses."""
+    replay = ReplayReader(path)
+    display = init_display(f"Replay: {os.path.basename(path)}", window, render_scale, fullscreen)
+    screen, layout = display.surface, display.layout
+    clock = pygame.time.Clock()
+    font = layout.font(24)
+
+    arena_gradient, sidebar_gradient = bake_gradients(layout)
+    files = default_roster().sprite_files()
+    fighter_files = {t: files[t] for t in replay.types}
+    fighters = replay.frame(0).balls
+    assets = AssetManager()
+    face_sizes = {face_size(layout, ball.radius) for ball in fighters}
+    assets.preload(fighter_files.values(), sizes=sorted(face_sizes) + [portrait_size(layout)])
+    assets.preload([BLAZEBALL_FILE], sizes=[blazeball_size(layout)])
+    sprites = EffectSprites(layout.scale)
+    arena = build_arena(layout, arena_gradient)
+    hud = make_hud(layout, font, assets, fighter_files, sidebar_gradient, fighters)
+    renderer = DirtyRectRenderer(display, build_background(layout, arena, sidebar_gradient), hud)
+
+    # One recorded step per displayed frame, so playback is frame-exact
+    frame_rate = round(1 / replay.dt)
+    index = 0
+    paused = False
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                return
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    paused = not paused
+                elif event.key == pygame.K_RIGHT:
+                    index = replay.index_at(index * replay.dt + 5)
+                elif event.key == pygame.K_LEFT:
+                    index = replay.index_at(index * replay.dt - 5)
+        frame = replay.frame(index)
+        if full_redraw:
+            draw_fight(screen, layout, frame, assets, sprites, fighter_files, arena, hud)
+            display.flip()
+        else:
+            renderer.draw(frame, assets, sprites, fighter_files)
+        if not paused and index < len(replay) - 1:
+            index += 1
+        clock.tick(frame_rate)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    startup = StartupTimer()
+    parser = argparse.ArgumentParser(description="Bouncing balls arena")
+    parser.add_argument('--seed', type=int, default=None, help="seed for the first fight")
+    parser.add_argument('--record', metavar='PATH',
+                        help="record each fight to a replay file, the second and later ones to PATH with "
+                             "-2, -3... before the extension")
+    parser.add_argument('--replay', metavar='PATH', help="play back a recorded fight")
+    parser.add_argument('--asset-stats', action='store_true', help="print image cache counters after each fight")
+    parser.add_argument('--full-redraw', action='store_true',
+                        help="repaint the whole window every frame instead of only what changed")
+    parser.add_argument('--ffa', type=fighter_count, default=0, metavar='N',
+                        help="free-for-all with N fighters, filled from the fighters you pick")
+    parser.add_argument('--profile', action='store_true', help="show the frame time overlay (F3 toggles it)")
+    parser.add_argument('--profile-trace', metavar='PATH',
+                        help="write every fight frame's per-phase times and object counts to a CSV file")
+    parser.add_argument('--startup-time', action='store_true',
+                        help="print how long the window, start screen, sprites and first fight frame took")
+    parser.add_argument('--window', type=window_size, default=(WIDTH, HEIGHT), metavar='WxH',
+                        help=f"window size in pixels (default {WIDTH}x{HEIGHT}), the arena scales to fit")
+    parser.add_argument('--fullscreen', action='store_true', help="fill the whole display instead")
+    parser.add_argument('--render-scale', type=float, default=1.0,
+                        help="draw frames at this fraction of the window size and stretch them, "
+                             "e.g. 0.5 for speed on a large window (default 1: native size)")
+    args = parser.parse_args()
+    if not 0 < args.render_scale <= 1:
+        parser.error("--render-scale must be in (0, 1]")
+    if args.replay:
+        play_replay(args.replay, full_redraw=args.full_redraw, window=args.window, render_scale=args.render_scale,
+                    fullscreen=args.fullscreen)
+    else:
+        profiler = FrameProfiler(trace_path=args.profile_trace)
+        try:
+            main(seed=args.seed, record=args.record, asset_stats=args.asset_stats, full_redraw=args.full_redraw,
+                 ffa=args.ffa, profiler=profiler, profile=args.profile, startup=startup,
+                 startup_time=args.startup_time, window=args.window, render_scale=args.render_scale,
+                 fullscreen=args.fullscreen)
+        finally:
+            profiler.close()
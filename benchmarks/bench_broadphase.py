@@ -0,0 +1,86 @@
+"""Broadphase scaling: all-pairs checks vs the spatial hash.
+
+Bodies are BALL_RADIUS circles in a square world whose size grows with the
+body count, so the crowd density (and the number of real contacts per body)
+stays the same at every size.
+
+    python benchmarks/bench_broadphase.py
+"""
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from ball_store import BallStore  # noqa: E402
+from broadphase import SpatialHash  # noqa: E402
+from config import BALL_RADIUS  # noqa: E402
+from simulation import Ball, balls_collide  # noqa: E402
+
+SIZES = (2, 10, 100, 500, 1000, 5000)
+COVERAGE = 0.2  # fraction of the world covered by bodies
+BRUTE_FORCE_LIMIT = 1000  # all-pairs gets too slow to time past this
+
+
+def make_bodies(n, rng):
+    side = math.sqrt(n * math.pi * BALL_RADIUS ** 2 / COVERAGE)
+    store = BallStore(capacity=n)
+    balls = [Ball(rng.uniform(0, side), rng.uniform(0, side), rng.uniform(-9, 9), rng.uniform(-9, 9),
+                  BALL_RADIUS, (0, 0, 0), store=store) for _ in range(n)]
+    return store, balls, side
+
+
+def brute_force(balls):
+    hits = 0
+    for i in range(len(balls)):
+        for j in range(i + 1, len(balls)):
+            if balls_collide(balls[i], balls[j]):
+                hits += 1
+    return hits
+
+
+def grid_pass(grid, store, balls):
+    keys = np.arange(store.count)
+    grid.sync(keys.tolist(), store.x[:store.count], store.y[:store.count])
+    hits = 0
+    for i, j in grid.pairs():
+        if balls_collide(balls[i], balls[j]):
+            hits += 1
+    return hits
+
+
+def timed(fn, *args, repeat=5):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'bodies':>7} {'all-pairs ms':>13} {'grid ms':>9} {'speedup':>8} {'contacts':>9}")
+    for n in SIZES:
+        store, balls, side = make_bodies(n, rng)
+        grid = SpatialHash(2 * BALL_RADIUS)
+        # Move once so later passes measure the incremental re-file, like a real step
+        grid_pass(grid, store, balls)
+        store.move(1.0, 0, 0, side, side)
+        grid_time, grid_hits = timed(grid_pass, grid, store, balls)
+        if n <= BRUTE_FORCE_LIMIT:
+            brute_time, brute_hits = timed(brute_force, balls, repeat=3 if n > 100 else 5)
+            assert brute_hits == grid_hits, (brute_hits, grid_hits)
+            print(f"{n:>7} {brute_time * 1000:>13.3f} {grid_time * 1000:>9.3f} "
+                  f"{brute_time / grid_time:>7.1f}x {grid_hits:>9}")
+        else:
+            print(f"{n:>7} {'-':>13} {grid_time * 1000:>9.3f} {'-':>8} {grid_hits:>9}")
+
+
+if __name__ == "__main__":
+    main()
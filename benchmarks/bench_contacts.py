@@ -0,0 +1,89 @@
+"""Iterative contact solver against repeated pairwise collision resolution.
+
+A crowd of balls is dropped at random into a corner of the arena, far too
+close together, so most of them overlap several neighbours and the ones
+along the walls are pinned. Both methods get the same crowd and the same
+candidate pairs: sweeps of resolve_collision() over every overlapping pair,
+one ball pair at a time in Python, and BallStore.separate(). Reported are
+the time and how much overlap is left afterwards.
+
+    python benchmarks/bench_contacts.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from config import ARENA_HEIGHT, ARENA_SIZE, CONTACT_SLOP  # noqa: E402
+from simulation import Simulation, balls_collide, resolve_collision  # noqa: E402
+
+POPULATIONS = (200, 1000)
+ITERATIONS = (1, 4, 8, 16)
+BOUNDS = (0, 0, ARENA_SIZE, ARENA_HEIGHT)
+
+
+def crowd(n):
+    """A seeded simulation whose balls are dropped into a square only about twice their total area"""
+    sim = Simulation(['steve'] * n, seed=1)
+    rng = np.random.default_rng(1)
+    radius = float(sim.store.radius[0])
+    side = min(radius * 2.4 * np.sqrt(n), ARENA_SIZE)
+    store = sim.store
+    store.pos[:n, 0] = radius + rng.uniform(0, side - 2 * radius, n)
+    store.pos[:n, 1] = radius + rng.uniform(0, side - 2 * radius, n)
+    # Heavier and lighter balls mixed in
+    store.mass[:n] = rng.choice([0.5, 1.0, 4.0], n)
+    sim._sync_grid()
+    return sim, np.array(list(sim.grid.pairs()))
+
+
+def overlap(sim, pairs):
+    """Largest and summed overlap in px over the candidate pairs"""
+    pos = sim.store.pos
+    radius = sim.store.radius.astype(np.float64)
+    a, b = pairs[:, 0], pairs[:, 1]
+    left = radius[a] + radius[b] - np.hypot(*(pos[a] - pos[b]).T)
+    left = left[left > CONTACT_SLOP]
+    return (left.max() if len(left) else 0.0), left.sum()
+
+
+def pairwise(sim, pairs, sweeps):
+    """The per-pair resolution, repeated sweeps over the pair list"""
+    by_index = sim.by_index
+    left, top, right, bottom = BOUNDS
+    for _ in range(sweeps):
+        for i, j in pairs.tolist():
+            if balls_collide(by_index[i], by_index[j]):
+                resolve_collision(by_index[i], by_index[j])
+        # Same wall clamp the solver does
+        store = sim.store
+        r = store.radius[:store.count, None]
+        np.clip(store.pos[:store.count], r + (left, top), (right, bottom) - r, out=store.pos[:store.count])
+
+
+def solver(sim, pairs, iterations):
+    sim.store.separate(pairs, iterations, *BOUNDS, CONTACT_SLOP)
+
+
+def main():
+    print(f"{'balls':>6} {'pairs':>6} {'method':>9} {'passes':>6} {'ms':>9} {'max px':>8} {'total px':>10}")
+    for n in POPULATIONS:
+        sim, pairs = crowd(n)
+        worst, total = overlap(sim, pairs)
+        print(f"{n:>6} {len(pairs):>6} {'start':>9} {'':>6} {'':>9} {worst:>8.2f} {total:>10.1f}")
+        for name, method in (('pairwise', pairwise), ('solver', solver)):
+            for passes in ITERATIONS:
+                sim, pairs = crowd(n)
+                start = time.perf_counter()
+                method(sim, pairs, passes)
+                elapsed = time.perf_counter() - start
+                worst, total = overlap(sim, pairs)
+                print(f"{n:>6} {len(pairs):>6} {name:>9} {passes:>6} {elapsed * 1000:>9.2f} "
+                      f"{worst:>8.2f} {total:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Effect drawing cost: per-frame SRCALPHA surfaces vs the baked atlases.
+
+Draws N concurrent explosions and hit effects (half each, at random
+positions and ages) onto an offscreen display with the SDL dummy driver.
+
+    python benchmarks/bench_effects.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame  # noqa: E402
+
+from config import ARENA_SIZE, HEIGHT, SIDEBAR_WIDTH, WIDTH  # noqa: E402
+from simulation import Explosion, HitEffect  # noqa: E402
+from sprites import EffectSprites  # noqa: E402
+
+COUNTS = (1, 100, 1000)
+FRAMES = 30
+
+
+# The drawing code as it was before the atlases, kept here as the baseline
+def draw_explosion_unbaked(screen, explosion, current_time):
+    elapsed = current_time - explosion.start_time
+    if elapsed > explosion.duration:
+        return
+    progress = elapsed / explosion.duration
+    radius = int(explosion.max_radius * progress)
+    alpha = int(255 * (1 - progress))
+    if radius > 0:
+        surf = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(surf, (255, 80, 80, alpha), (radius, radius), radius)
+        pygame.draw.circle(surf, (255, 150, 100, alpha), (radius, radius), int(radius * 0.6))
+        screen.blit(surf, (explosion.x - radius, explosion.y - radius))
+
+
+def draw_hit_effect_unbaked(screen, effect, current_time):
+    elapsed = current_time - effect.start_time
+    if elapsed > effect.duration:
+        return
+    progress = elapsed / effect.duration
+    radius = int(effect.max_radius * progress)
+    alpha = int(180 * (1 - progress))
+    if radius > 0:
+        surf = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(surf, (255, 255, 255, alpha), (radius, radius), radius)
+        screen.blit(surf, (effect.x - radius, effect.y - radius))
+
+
+def make_effects(n, rng, now):
+    effects = []
+    for i in range(n):
+        x = rng.uniform(SIDEBAR_WIDTH, SIDEBAR_WIDTH + ARENA_SIZE)
+        y = rng.uniform(0, HEIGHT)
+        cls = Explosion if i % 2 == 0 else HitEffect
+        effect = cls(x, y, 0)
+        effect.start_time = now - rng.uniform(0, effect.duration)
+        effects.append(effect)
+    return effects
+
+
+def time_frames(screen, effects, now, draw_explosion, draw_hit):
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        screen.fill((0, 0, 0))
+        for e in effects:
+            if isinstance(e, Explosion):
+                draw_explosion(screen, e, now)
+            else:
+                draw_hit(screen, e, now)
+    return (time.perf_counter() - start) / FRAMES
+
+
+def main():
+    pygame.display.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    bake_start = time.perf_counter()
+    sprites = EffectSprites()
+    print(f"baking atlases: {(time.perf_counter() - bake_start) * 1000:.1f} ms")
+
+    def draw_explosion_baked(screen, e, now):
+        sprites.explosion.draw(screen, e.x, e.y, now - e.start_time)
+
+    def draw_hit_baked(screen, e, now):
+        sprites.hit_effect.draw(screen, e.x, e.y, now - e.start_time)
+
+    rng = random.Random(0)
+    now = 10.0
+    print(f"{'effects':>8} {'unbaked ms/frame':>17} {'atlas ms/frame':>15} {'speedup':>8}")
+    for n in COUNTS:
+        effects = make_effects(n, rng, now)
+        before = time_frames(screen, effects, now, draw_explosion_unbaked, draw_hit_effect_unbaked)
+        after = time_frames(screen, effects, now, draw_explosion_baked, draw_hit_baked)
+        print(f"{n:>8} {before * 1000:>17.3f} {after * 1000:>15.3f} {before / after:>7.1f}x")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
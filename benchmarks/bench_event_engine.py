@@ -0,0 +1,78 @@
+"""Fixed-step vs event-driven engine: speed and agreement of outcomes.
+
+Runs the same seeded fights of every matchup on the fixed-step engine
+(discrete and swept collisions) and the event engine, and compares win
+rates, mean fight length and time. Seeded fights don't follow the same
+course on the engines (contacts happen at the exact moment on the event
+engine), so outcomes are compared as rates; the length columns give the
+event engine's difference in standard errors. tests/test_event_engine.py
+checks the same with a fixed tolerance (pytest --slow).
+
+    python benchmarks/bench_event_engine.py [fights per matchup]
+"""
+import itertools
+import math
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_engine import EventSimulation  # noqa: E402
+from simulation import Simulation  # noqa: E402
+from tournament import MAX_FIGHT_TIME, fighter_types  # noqa: E402
+
+FIGHTS = 20
+
+
+def swept(types, seed):
+    return Simulation(types, seed=seed, swept=True)
+
+
+def play(make, type_a, type_b, fights):
+    wins = 0
+    lengths = []
+    start = time.perf_counter()
+    for seed in range(fights):
+        sim = make([type_a, type_b], seed=f"bench:{seed}")
+        winner = sim.run(max_time=MAX_FIGHT_TIME)
+        # Mirror matches are scored by slot, ball 0 counts as a
+        if winner is not None and winner is sim.by_index[0]:
+            wins += 1
+        lengths.append(sim.time)
+    return wins / fights, lengths, time.perf_counter() - start
+
+
+def length_gap(lengths, reference):
+    """Difference of the mean lengths in standard errors, signed"""
+    error = math.sqrt((statistics.variance(lengths) + statistics.variance(reference)) / len(lengths))
+    diff = statistics.mean(lengths) - statistics.mean(reference)
+    return diff / error if error else 0.0
+
+
+def main():
+    fights = int(sys.argv[1]) if len(sys.argv) > 1 else FIGHTS
+    print(f"{fights} fights per matchup, win rate of the first fighter, mean fight length (s) and the "
+          f"event engine's length difference in standard errors")
+    print(f"{'matchup':>20} {'step':>5} {'swept':>6} {'event':>6} {'step len':>9} {'swept len':>10} "
+          f"{'event len':>10} {'vs step':>8} {'vs swept':>9} {'speedup':>8}")
+    total_step = total_event = 0.0
+    worst = 0.0
+    for type_a, type_b in itertools.combinations_with_replacement(fighter_types(), 2):
+        step_win, step_lengths, step_time = play(Simulation, type_a, type_b, fights)
+        swept_win, swept_lengths, _ = play(swept, type_a, type_b, fights)
+        event_win, event_lengths, event_time = play(EventSimulation, type_a, type_b, fights)
+        total_step += step_time
+        total_event += event_time
+        worst = max(worst, abs(swept_win - event_win))
+        print(f"{type_a + '-' + type_b:>20} {step_win:>5.0%} {swept_win:>6.0%} {event_win:>6.0%} "
+              f"{statistics.mean(step_lengths):>9.1f} {statistics.mean(swept_lengths):>10.1f} "
+              f"{statistics.mean(event_lengths):>10.1f} {length_gap(event_lengths, step_lengths):>+8.1f} "
+              f"{length_gap(event_lengths, swept_lengths):>+9.1f} {step_time / event_time:>7.1f}x")
+    print(f"total: fixed-step {total_step:.1f}s, event {total_event:.1f}s ({total_step / total_event:.1f}x), "
+          f"largest win rate difference to swept {worst:.0%}")
+
+
+if __name__ == "__main__":
+    main()
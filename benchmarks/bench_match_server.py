@@ -0,0 +1,77 @@
+"""Match server throughput: matches/sec and step latency under load.
+
+Starts a MatchServer on a free local port, submits a batch of seeded
+matches over one connection (without deltas, then with a delta every step)
+and reports what the stats endpoint saw, next to the same matches run one
+after another in this process.
+
+    python benchmarks/bench_match_server.py [workers]
+"""
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from match_server import MatchServer  # noqa: E402
+from tournament import MAX_FIGHT_TIME, fighter_types, new_simulation  # noqa: E402
+
+MATCHES = 84  # every pairing of the fighters, 4 times over
+
+
+def requests(deltas):
+    pairs = itertools.cycle(itertools.combinations(fighter_types(), 2))
+    for i in range(MATCHES):
+        yield {'op': 'match', 'id': i, 'fighters': list(next(pairs)), 'seed': f"bench:{i}", 'deltas': deltas}
+
+
+def sequential():
+    start = time.perf_counter()
+    for request in requests(0):
+        new_simulation(request['fighters'], request['seed'], 1 / 60, False, 'step').run(max_time=MAX_FIGHT_TIME)
+    return MATCHES / (time.perf_counter() - start)
+
+
+async def load(server, deltas):
+    reader, writer = await asyncio.open_connection(*server.address)
+    start = time.perf_counter()
+    for request in requests(deltas):
+        writer.write(json.dumps(request).encode() + b'\n')
+    await writer.drain()
+    results = lines = 0
+    while results < MATCHES:
+        message = json.loads(await reader.readline())
+        lines += 1
+        if message['type'] == 'result':
+            results += 1
+        elif message['type'] == 'error':
+            raise RuntimeError(message['error'])
+    elapsed = time.perf_counter() - start
+    writer.write(b'{"op": "stats"}\n')
+    stats = json.loads(await reader.readline())
+    writer.close()
+    return MATCHES / elapsed, lines, stats
+
+
+async def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    print(f"{MATCHES} matches")
+    print(f"{'':>25} {'matches/s':>10} {'lines':>8} {'p50 ms':>7} {'p99 ms':>7}")
+    print(f"{'in-process, one by one':>25} {sequential():>10.1f}")
+    for deltas in (0, 1):
+        # A fresh server per run so the latency samples only cover that run
+        server = MatchServer(workers)
+        await server.start(port=0)
+        try:
+            rate, lines, stats = await load(server, deltas)
+        finally:
+            await server.close()
+        name = f"server, {stats['workers']} workers" + (", deltas" if deltas else "")
+        print(f"{name:>25} {rate:>10.1f} {lines:>8} {stats['step_p50_ms']:>7.3f} {stats['step_p99_ms']:>7.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
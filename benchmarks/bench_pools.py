@@ -0,0 +1,117 @@
+"""Allocation behaviour of pooled blazeballs and effects in a long, busy fight.
+
+Every matchup of the four fighters runs side by side with health topped
+up every step, so shots, hits and explosions never stop. After a warm-up
+the steps are timed, and in a separate run tracemalloc measures how much
+memory the simulations keep allocating, once with the pools and once with
+the old allocate-and-filter lists. tests/test_pools.py asserts the bounds.
+
+    python benchmarks/bench_pools.py
+"""
+import itertools
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import simulation  # noqa: E402
+from simulation import Simulation  # noqa: E402
+
+FIGHTERS = ('blaze', 'creeper', 'herobrine', 'steve')
+WARMUP_STEPS = 600
+STEPS = 3000
+REPEAT = 3
+
+
+# The behaviour before the pools, kept here as the baseline: a new object per
+# spawn and a freshly built list (rebound to the same name) on every compaction
+class UnpooledList:
+    def __init__(self, cls, capacity):
+        self.cls = cls
+        self.live = []
+        self.allocated = 0
+
+    def acquire(self, *args):
+        obj = self.cls(*args)
+        self.allocated += 1
+        self.live.append(obj)
+        return obj
+
+    def compact(self):
+        self.live[:] = [obj for obj in self.live if obj.active]
+
+    def expire(self, count):
+        self.live[:] = self.live[count:]
+
+
+def busy_step(sims):
+    for sim in sims:
+        for ball in sim.balls:
+            ball.health = ball.max_health
+        sim.step(sim.dt)
+
+
+def build(pool_cls):
+    original = simulation.Pool
+    simulation.Pool = pool_cls
+    try:
+        sims = [Simulation(list(types), seed=1)
+                for types in itertools.combinations_with_replacement(FIGHTERS, 2)]
+    finally:
+        simulation.Pool = original
+    for _ in range(WARMUP_STEPS):
+        busy_step(sims)
+    return sims
+
+
+def pools_of(sims):
+    return [p for sim in sims for p in (sim.blazeball_pool, sim.explosion_pool, sim.hit_effect_pool)]
+
+
+def time_steps(pool_cls):
+    sims = build(pool_cls)
+    start = time.perf_counter()
+    for _ in range(STEPS):
+        busy_step(sims)
+    return (time.perf_counter() - start) / STEPS / len(sims) * 1e6
+
+
+def measure_memory(pool_cls):
+    sims = build(pool_cls)
+    pools = pools_of(sims)
+    allocated_before = sum(p.allocated for p in pools)
+    tracemalloc.start()
+    start_mem, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for _ in range(STEPS):
+        busy_step(sims)
+    end_mem, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'objects': sum(p.allocated for p in pools) - allocated_before,
+        'net': end_mem - start_mem,
+        'peak': peak - start_mem,
+        'sims': len(sims),
+    }
+
+
+def main():
+    variants = (('unpooled', UnpooledList), ('pooled', simulation.Pool))
+    # Timed without tracemalloc, which slows every allocation; runs alternate so drift hits both alike
+    times = {name: [] for name, _ in variants}
+    for _ in range(REPEAT):
+        for name, pool_cls in variants:
+            times[name].append(time_steps(pool_cls))
+    print(f"{STEPS} steps after {WARMUP_STEPS} warm-up steps, us/step is the median of {REPEAT} untraced runs")
+    print(f"{'':>10} {'new objects':>12} {'net bytes':>10} {'peak bytes':>11} {'us/step':>8}")
+    for name, pool_cls in variants:
+        r = measure_memory(pool_cls)
+        print(f"{name:>10} {r['objects']:>12} {r['net']:>10} {r['peak']:>11} {statistics.median(times[name]):>8.1f}")
+    print(f"(totals over {r['sims']} concurrent fights, us/step is per fight)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Time to the first start screen frame: eager startup against the lazy one.
+
+Eager is the old path: pygame.init() (every subsystem), both gradients,
+then every sprite decoded and scaled before the start screen is drawn.
+Lazy is the game's path now: only the display and font subsystems, the
+sprites and gradients handed to loader threads, and the start screen
+drawn right away with names for whatever isn't in yet. For lazy the time
+until everything has loaded is reported as well.
+
+Runs on the SDL dummy video driver unless SDL_VIDEODRIVER is set; audio
+and joystick startup cost more on a real desktop than here.
+
+    python benchmarks/bench_startup.py
+"""
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame  # noqa: E402
+
+import balls_game  # noqa: E402
+from assets import AssetManager  # noqa: E402
+from config import HEIGHT, WIDTH  # noqa: E402
+from roster import default_roster  # noqa: E402
+
+REPEAT = 20
+TITLE = "Pick 2 Fighters"
+
+
+def eager(fighter_files):
+    start = time.perf_counter()
+    pygame.init()
+    display = balls_game.Display(pygame.display.set_mode((WIDTH, HEIGHT)))
+    layout = display.layout
+    font = layout.font(24)
+    arena_gradient, sidebar_gradient = balls_game.bake_gradients(layout)
+    arena = balls_game.build_arena(layout, arena_gradient)
+    balls_game.build_background(layout, arena, sidebar_gradient)
+    assets = AssetManager()
+    assets.preload(set(fighter_files.values()), sizes=[balls_game.thumb_size(layout)])
+    assets.preload([balls_game.BLAZEBALL_FILE], sizes=[balls_game.blazeball_size(layout)])
+    balls_game.draw_picker(display, font, TITLE, assets, fighter_files, [])
+    first_frame = time.perf_counter() - start
+    pygame.quit()
+    return first_frame, first_frame
+
+
+def lazy(fighter_files):
+    start = time.perf_counter()
+    loader = ThreadPoolExecutor(max_workers=balls_game.LOADER_THREADS)
+    display = balls_game.init_display("startup")
+    layout = display.layout
+    font = layout.font(24)
+    assets = AssetManager()
+    gradients = balls_game.start_loading(loader, assets, fighter_files, layout)
+    assets.poll()
+    balls_game.draw_picker(display, font, TITLE, assets, fighter_files, [])
+    first_frame = time.perf_counter() - start
+    assets.wait()
+    arena_gradient, sidebar_gradient = gradients.result()
+    arena = balls_game.build_arena(layout, arena_gradient)
+    balls_game.build_background(layout, arena, sidebar_gradient)
+    loaded = time.perf_counter() - start
+    loader.shutdown()
+    pygame.quit()
+    return first_frame, loaded
+
+
+def main():
+    fighter_files = default_roster().sprite_files()
+    print(f"{'startup':>8} {'first frame ms':>15} {'all loaded ms':>14}  (median of {REPEAT})")
+    for name, run in (('eager', eager), ('lazy', lazy)):
+        run(fighter_files)  # warm-up: file cache, font lookup
+        times = [run(fighter_files) for _ in range(REPEAT)]
+        first = statistics.median(t[0] for t in times)
+        loaded = statistics.median(t[1] for t in times)
+        print(f"{name:>8} {first * 1000:>15.2f} {loaded * 1000:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
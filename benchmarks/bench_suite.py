@@ -0,0 +1,273 @@
+"""Benchmark suite: physics, collisions, whole fight steps, gradients and rendering.
+
+Every case runs a fixed amount of seeded work; after a warm-up it is timed
+`--repeat` times with the garbage collector off. The median and the best
+run are kept; --compare goes by the best run, which other load on the
+machine can only make slower, never faster.
+
+Rendering goes to an offscreen display through the SDL dummy driver, so
+the suite runs the same way on a headless box.
+
+    python benchmarks/bench_suite.py --out results/bench.json
+    python benchmarks/bench_suite.py --compare results/bench.json   # exits 1 on a regression
+    python benchmarks/bench_suite.py --filter render
+
+The JSON holds the machine and commit the numbers came from and, per case,
+the median and best seconds per operation (a step, frame or call).
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import numpy as np  # noqa: E402
+import pygame  # noqa: E402
+
+import balls_game  # noqa: E402
+from assets import AssetManager  # noqa: E402
+from config import ARENA_HEIGHT, ARENA_SIZE, HEIGHT, WIDTH  # noqa: E402
+from roster import default_roster  # noqa: E402
+from simulation import Simulation, balls_collide, resolve_collision  # noqa: E402
+from sprites import EffectSprites  # noqa: E402
+from tournament import fighter_types  # noqa: E402
+
+POPULATIONS = (2, 50, 200)
+REPEAT = 7
+THRESHOLD = 0.10  # slowdown of the best run that --compare reports as a regression
+SEED = 1
+
+
+def topped_up(sim):
+    """Keep every ball alive so a fight never ends while it is being timed"""
+    for ball in sim.balls:
+        ball.health = ball.max_health
+
+
+# --- Cases ---
+# Each case builds its seeded state and returns (unit, iterations, run), run(n) doing n operations.
+
+def case_ball_move(n):
+    sim = Simulation(['steve'] * n, seed=SEED)
+    balls = sim.balls
+
+    def run(iterations):
+        for _ in range(iterations):
+            for ball in balls:
+                ball.move()
+    return 'step', max(100, 20000 // n), run
+
+
+def case_store_move(n):
+    store = Simulation(['steve'] * n, seed=SEED).store
+
+    def run(iterations):
+        for _ in range(iterations):
+            store.move(1.0, 0, 0, ARENA_SIZE, ARENA_HEIGHT)
+    return 'step', 5000, run
+
+
+def case_collisions(n):
+    """Movement plus balls_collide/resolve_collision over the broadphase pairs"""
+    sim = Simulation(['steve'] * n, seed=SEED)
+    store = sim.store
+    by_index = sim.by_index
+
+    def run(iterations):
+        for _ in range(iterations):
+            store.move(1.0, 0, 0, ARENA_SIZE, ARENA_HEIGHT)
+            sim._sync_grid()
+            for i, j in sim.grid.pairs():
+                if balls_collide(by_index[i], by_index[j]):
+                    resolve_collision(by_index[i], by_index[j])
+    return 'step', max(50, 10000 // n), run
+
+
+def case_fight_step(types, swept=False):
+    """Whole fixed steps of a fight that never ends, so every ability keeps firing"""
+    sim = Simulation(types, seed=SEED, swept=swept)
+
+    def run(iterations):
+        for _ in range(iterations):
+            topped_up(sim)
+            sim.step(sim.dt)
+    return 'step', 2000 if len(types) <= 10 else 300, run
+
+
+def case_gradient(**kwargs):
+    def run(iterations):
+        for _ in range(iterations):
+            balls_game.create_gradient_surface(ARENA_SIZE, ARENA_HEIGHT, (60, 60, 60), (30, 30, 30), **kwargs)
+    return 'call', 50 if 'angle' in kwargs else 500, run
+
+
+def case_render(fighters, full_redraw, render_scale=1.0):
+    """Drawing only: the fight is stepped between frames, outside the timed part"""
+    display = balls_game.Display(pygame.display.get_surface(), render_scale)
+    screen, layout = display.surface, display.layout
+    font = layout.font(24)
+    files = default_roster().sprite_files()
+    types = [sorted(files)[i % len(files)] for i in range(fighters)]
+    sim = Simulation(types, seed=SEED)
+    assets = AssetManager()
+    sizes = {balls_game.face_size(layout, ball.radius) for ball in sim.balls}
+    assets.preload(files.values(), sizes=sorted(sizes) + [balls_game.portrait_size(layout)])
+    assets.preload([balls_game.BLAZEBALL_FILE], sizes=[balls_game.blazeball_size(layout)])
+    sprites = EffectSprites(layout.scale)
+    arena_gradient, sidebar_gradient = balls_game.bake_gradients(layout)
+    arena = balls_game.build_arena(layout, arena_gradient)
+    hud = balls_game.make_hud(layout, font, assets, files, sidebar_gradient, sim.balls)
+    renderer = balls_game.DirtyRectRenderer(display, balls_game.build_background(layout, arena, sidebar_gradient),
+                                            hud)
+
+    def run(iterations):
+        drawing = 0.0
+        for _ in range(iterations):
+            topped_up(sim)
+            sim.step(sim.dt)
+            start = time.perf_counter()
+            if full_redraw:
+                balls_game.draw_fight(screen, layout, sim, assets, sprites, files, arena, hud)
+                display.flip()
+            else:
+                renderer.draw(sim, assets, sprites, files)
+            drawing += time.perf_counter() - start
+        return drawing
+    return 'frame', 300, run
+
+
+def cases():
+    """name -> zero-argument factory of (unit, iterations, run)"""
+    all_types = fighter_types()
+    table = {}
+    for n in POPULATIONS:
+        table[f'ball_move/{n}'] = lambda n=n: case_ball_move(n)
+        table[f'store_move/{n}'] = lambda n=n: case_store_move(n)
+        table[f'collisions/{n}'] = lambda n=n: case_collisions(n)
+    table['fight_step/duel'] = lambda: case_fight_step(['blaze', 'creeper'])
+    table['fight_step/all_abilities'] = lambda: case_fight_step(all_types)
+    table['fight_step/all_abilities_swept'] = lambda: case_fight_step(all_types, swept=True)
+    table['fight_step/ffa_50'] = lambda: case_fight_step([all_types[i % len(all_types)] for i in range(50)])
+    table['gradient/vertical'] = lambda: case_gradient(vertical=True)
+    table['gradient/horizontal'] = lambda: case_gradient(vertical=False)
+    table['gradient/angled'] = lambda: case_gradient(angle=30)
+    for fighters in (2, 50):
+        table[f'render/dirty/{fighters}'] = lambda f=fighters: case_render(f, False)
+        table[f'render/full/{fighters}'] = lambda f=fighters: case_render(f, True)
+        table[f'render/half_scale/{fighters}'] = lambda f=fighters: case_render(f, False, 0.5)
+    return table
+
+
+def measure(factory, repeat):
+    """Median and best seconds per operation over `repeat` timed runs"""
+    unit, iterations, run = factory()
+    run(max(1, iterations // 10))  # warm-up: caches, lazily built sprites, grid cells
+    runs = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            timed = run(iterations)
+            elapsed = time.perf_counter() - start
+        finally:
+            gc.enable()
+        # Rendering cases time their drawing themselves
+        runs.append((elapsed if timed is None else timed) / iterations)
+    return {'unit': unit, 'iterations': iterations, 'seconds': statistics.median(runs), 'best': min(runs),
+            'runs': runs}
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pygame': pygame.version.ver,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'video_driver': os.environ.get('SDL_VIDEODRIVER'),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print the change of every case also in the baseline, returns the names that got slower"""
+    regressions = []
+    print()
+    print(f"vs {baseline['environment'].get('commit') or 'baseline'}")
+    print(f"{'case':>32} {'before ms':>10} {'after ms':>9} {'change':>8}  (best runs)")
+    for name, result in results.items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        change = result['best'] / before['best'] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  slower'
+            regressions.append(name)
+        elif change < -threshold:
+            flag = '  faster'
+        print(f"{name:>32} {before['best'] * 1000:>10.4f} {result['best'] * 1000:>9.4f} "
+              f"{change:>+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproducible timings of physics, collisions and rendering")
+    parser.add_argument('--out', help="write the results to this JSON file")
+    parser.add_argument('--compare', metavar='JSON', help="compare with the results of an earlier run")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help="slowdown (fraction) that counts as a regression in --compare")
+    parser.add_argument('--repeat', type=int, default=REPEAT, help="timed runs per case, the median is kept")
+    parser.add_argument('--filter', default='', help="only run cases whose name contains this")
+    args = parser.parse_args()
+
+    pygame.display.init()
+    pygame.font.init()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+
+    results = {}
+    print(f"{'case':>32} {'ms/op':>9} {'ops/s':>10}")
+    for name, factory in cases().items():
+        if args.filter not in name:
+            continue
+        result = measure(factory, args.repeat)
+        results[name] = result
+        print(f"{name:>32} {result['seconds'] * 1000:>9.4f} {1 / result['seconds']:>10.0f} {result['unit']}s/s")
+    pygame.quit()
+
+    report = {'environment': environment(), 'repeat': args.repeat, 'results': results}
+    if args.out:
+        out_dir = os.path.dirname(args.out)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Step size vs accuracy: discrete overlap tests vs swept (time of impact) collisions.
+
+Head-on passes of two fast balls, and blazeballs fired at a resting ball,
+are run at increasing step lengths. A pass counts as caught if the
+simulation reported the hit. The last table shows what a larger dt buys in
+whole seeded fights.
+
+    python benchmarks/bench_swept.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import ARENA_HEIGHT, ARENA_SIZE, BALL_MAX_SPEED, BLAZEBALL_SPEED  # noqa: E402
+from simulation import Simulation  # noqa: E402
+
+TICK_RATES = (60, 30, 15, 10, 6)  # steps per simulated second
+TRIALS = 200
+FIGHT_SEEDS = 30
+
+
+def head_on(tick_rate, swept, rng):
+    """Fraction of head-on passes, at 1-4x the normal top speed, that collided"""
+    caught = 0
+    for _ in range(TRIALS):
+        sim = Simulation(['herobrine', 'herobrine'], dt=1 / tick_rate, seed=rng.random(), swept=swept)
+        sim.enable_events()
+        a, b = sim.balls
+        speed = rng.uniform(1, 4) * BALL_MAX_SPEED
+        offset = rng.uniform(-a.radius, a.radius)
+        a.x, a.y, a.vx, a.vy = 150, ARENA_HEIGHT / 2, speed, 0
+        b.x, b.y, b.vx, b.vy = ARENA_SIZE - 150, ARENA_HEIGHT / 2 + offset, -speed, 0
+        steps = int(ARENA_SIZE / (2 * speed) * tick_rate / 60) + 2
+        for _ in range(steps):
+            sim.step(sim.dt)
+            if any(event[0] == 'hit' for event in sim.events):
+                caught += 1
+                break
+    return caught / TRIALS
+
+
+def blazeball_shot(tick_rate, swept, rng):
+    """Fraction of blazeballs aimed at a resting ball that hit it"""
+    caught = 0
+    for _ in range(TRIALS):
+        sim = Simulation(['steve', 'blaze'], dt=1 / tick_rate, seed=rng.random(), swept=swept)
+        sim.enable_events()
+        # The blaze is only the shooter, its own first shot comes after a trial is over
+        target, other = sim.balls
+        target.x, target.y, target.vx, target.vy = ARENA_SIZE / 2, ARENA_HEIGHT / 2, 0, 0
+        other.x, other.y, other.vx, other.vy = 60, 60, 0, 0
+        offset = rng.uniform(-target.radius, target.radius)
+        sim.blazeball_pool.acquire(30, ARENA_HEIGHT / 2 + offset, BLAZEBALL_SPEED, 0, other)
+        for _ in range(int(ARENA_SIZE / BLAZEBALL_SPEED * tick_rate / 60) + 2):
+            sim.step(sim.dt)
+            if any(event[0] == 'projectile_hit' for event in sim.events):
+                caught += 1
+                break
+    return caught / TRIALS
+
+
+def fights(tick_rate, swept):
+    """Seeded fights per wall-clock second"""
+    start = time.perf_counter()
+    for seed in range(FIGHT_SEEDS):
+        Simulation(['creeper', 'steve'], dt=1 / tick_rate, seed=seed, swept=swept).run(max_time=300)
+    return FIGHT_SEEDS / (time.perf_counter() - start)
+
+
+def main():
+    print(f"{'steps/s':>8} {'head-on discrete':>17} {'swept':>6} {'blazeball discrete':>19} {'swept':>6}")
+    for rate in TICK_RATES:
+        row = [head_on(rate, False, random.Random(rate)), head_on(rate, True, random.Random(rate)),
+               blazeball_shot(rate, False, random.Random(rate)), blazeball_shot(rate, True, random.Random(rate))]
+        print(f"{rate:>8} {row[0]:>17.0%} {row[1]:>6.0%} {row[2]:>19.0%} {row[3]:>6.0%}")
+
+    print()
+    print(f"{'steps/s':>8} {'discrete fights/s':>18} {'swept fights/s':>15}")
+    for rate in TICK_RATES:
+        print(f"{rate:>8} {fights(rate, False):>18.1f} {fights(rate, True):>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
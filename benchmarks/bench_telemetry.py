@@ -0,0 +1,94 @@
+"""Cost of recording fight telemetry.
+
+The same seeded fights run without telemetry, with a FightRecorder
+writing columnar blocks and with one writing JSON lines, each to a
+temporary file through a TelemetryWriter thread. The three variants take
+turns fight by fight, so a slower or faster stretch of the machine hits
+them alike. Reported are the CPU time per fight of the fights' thread and
+its slowdown against no telemetry, the CPU time per fight of the writer
+thread (which encodes the records), the slowdown counting both and the
+records written; timings are the best of REPEAT rounds.
+
+    python benchmarks/bench_telemetry.py [fights]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation import Simulation  # noqa: E402
+from telemetry import FightRecorder, TelemetryRing, TelemetryWriter, aggregate  # noqa: E402
+from tournament import MAX_FIGHT_TIME, fighter_types  # noqa: E402
+
+FIGHTS = 20
+REPEAT = 3
+LAYOUTS = ('columnar', 'jsonl')
+# Duels, plus a crowded free-for-all where events are far more frequent
+SETUPS = (('duels', 2), ('ffa_50', 50))
+
+
+class TimedWriter(TelemetryWriter):
+    """Also measures the CPU time of its thread"""
+
+    def _run(self):
+        start = time.thread_time()
+        try:
+            super()._run()
+        finally:
+            self.cpu = time.thread_time() - start
+
+
+def run(setup, fights, tmp):
+    """CPU seconds per fight of the fights' thread for every variant and of the writer
+    thread per layout, and records written per layout"""
+    types = fighter_types()
+    name, n = setup
+    writers = {layout: TimedWriter(os.path.join(tmp, f"{name}.{layout}"), types) for layout in LAYOUTS}
+    rings = {layout: TelemetryRing(writer.write) for layout, writer in writers.items()}
+    seconds = dict.fromkeys(('off',) + LAYOUTS, 0.0)
+    clock = time.thread_time  # only this thread, the writer threads are timed by themselves
+    for fight in range(fights):
+        for variant in seconds:
+            start = clock()
+            sim = Simulation([types[(fight + i) % len(types)] for i in range(n)], seed=fight)
+            recorder = FightRecorder(sim, rings[variant], fight) if variant in rings else None
+            sim.run(max_time=MAX_FIGHT_TIME)
+            if recorder:
+                recorder.close()
+            seconds[variant] += clock() - start
+    for layout, writer in writers.items():
+        start = clock()
+        rings[layout].flush()
+        writer.close()
+        seconds[layout] += clock() - start
+    return {variant: total / fights for variant, total in seconds.items()}, \
+        {layout: writer.cpu / fights for layout, writer in writers.items()}, \
+        {layout: writer.records for layout, writer in writers.items()}
+
+
+def main():
+    fights = int(sys.argv[1]) if len(sys.argv) > 1 else FIGHTS
+    print(f"{'setup':>8} {'telemetry':>10} {'ms/fight':>9} {'slowdown':>9} {'writer ms':>10} {'total':>8} "
+          f"{'records':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for setup in SETUPS:
+            run(setup, 1, tmp)  # warm-up
+            rounds = [run(setup, fights, tmp) for _ in range(REPEAT)]
+            best = {variant: min(times[variant] for times, _, _ in rounds) for variant in rounds[0][0]}
+            writer = {layout: min(times[layout] for _, times, _ in rounds) for layout in LAYOUTS}
+            records = rounds[-1][2]
+            print(f"{setup[0]:>8} {'off':>10} {best['off'] * 1000:>9.1f}")
+            for layout in LAYOUTS:
+                total = best[layout] + writer[layout]
+                print(f"{setup[0]:>8} {layout:>10} {best[layout] * 1000:>9.1f} "
+                      f"{best[layout] / best['off'] - 1:>+8.1%} {writer[layout] * 1000:>10.1f} "
+                      f"{total / best['off'] - 1:>+7.1%} {records[layout]:>9}")
+            totals = aggregate([os.path.join(tmp, f"{setup[0]}.columnar")])
+            print(f"{'':>8} aggregated {sum(t['fights'] for t in totals.values())} fighter entries, "
+                  f"{sum(t['damage_taken'] for t in totals.values())} damage")
+
+
+if __name__ == "__main__":
+    main()
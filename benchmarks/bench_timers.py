@@ -0,0 +1,67 @@
+"""Timer wheel against polling every ball for ability timers and status ticks.
+
+A crowded free-for-all of every fighter, health topped up every step so
+nobody drops out, runs once with the timer wheels and once with the
+per-step polling they replaced: every ability ticker's on_tick and every
+ball's poison/fire check on every step. Only the 'abilities' and 'status'
+phases are timed (FrameProfiler laps); a step's other work is the same.
+
+    python benchmarks/bench_timers.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from profiler import FrameProfiler  # noqa: E402
+from simulation import Simulation  # noqa: E402
+from tournament import fighter_types  # noqa: E402
+
+POPULATIONS = (50, 200, 1000)
+STEPS = 600
+
+
+class PollingSimulation(Simulation):
+    """The behaviour before the timer wheels, kept here as the baseline"""
+
+    def wake(self, ball):
+        pass
+
+    def _status_changed(self, ball):
+        pass
+
+    def _run_abilities(self):
+        for ball in self.balls:
+            if ball.on_tick:
+                ball.on_tick(self, ball)
+
+    def _run_status(self):
+        for ball in self.balls:
+            ball.update_poison(self)
+            ball.update_fire(self)
+
+
+def measure(cls, n):
+    types = fighter_types()
+    sim = cls([types[i % len(types)] for i in range(n)], seed=1)
+    sim.profiler = profiler = FrameProfiler(window=STEPS)
+    for _ in range(STEPS):
+        for ball in sim.balls:
+            ball.health = ball.max_health
+        profiler.begin_frame()
+        sim.step(sim.dt)
+        profiler.end_frame()
+    averages = profiler.averages()
+    return averages['abilities'], averages['status']
+
+
+def main():
+    print(f"{'balls':>6} {'method':>8} {'abilities ms':>13} {'status ms':>10}  (per step)")
+    for n in POPULATIONS:
+        for name, cls in (('polling', PollingSimulation), ('wheel', Simulation)):
+            abilities, status = measure(cls, n)
+            print(f"{n:>6} {name:>8} {abilities:>13.4f} {status:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Uniform-grid (spatial hash) broadphase.
+
+Each body lives in exactly one cell, picked by its center. With a cell size
+of at least the largest contact distance (the sum of the two biggest radii)
+two touching bodies are always in the same or neighbouring cells, so pairs
+only have to be checked against 4 of the 8 neighbours and no pair is ever
+produced twice.
+"""
+import numpy as np
+
+# Half of the 8-neighbourhood, the other half is covered from the other side
+_FORWARD_NEIGHBOURS = ((1, 0), (1, 1), (0, 1), (-1, 1))
+
+
+class SpatialHash:
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}  # (cx, cy) -> list of keys
+        self.cell_of = {}  # key -> (cx, cy)
+
+    def __len__(self):
+        return len(self.cell_of)
+
+    def cell(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def insert(self, key, x, y):
+        cell = self.cell(x, y)
+        self.cell_of[key] = cell
+        self.cells.setdefault(cell, []).append(key)
+
+    def remove(self, key):
+        cell = self.cell_of.pop(key, None)
+        if cell is None:
+            return
+        members = self.cells[cell]
+        members.remove(key)
+        if not members:
+            del self.cells[cell]
+
+    def move(self, key, x, y):
+        """Re-file a body after it moved, a no-op while it stays in its cell"""
+        cell = self.cell(x, y)
+        old = self.cell_of.get(key)
+        if old == cell:
+            return
+        if old is not None:
+            self.remove(key)
+        self.cell_of[key] = cell
+        self.cells.setdefault(cell, []).append(key)
+
+    def sync(self, keys, xs, ys):
+        """Bring the grid up to date with arrays of keys and positions.
+
+        Cells are computed for every body in one vectorized pass; only bodies
+        whose cell changed since the last call touch the dictionaries.
+        """
+        cxs = np.floor_divide(xs, self.cell_size).astype(np.int64).tolist()
+        cys = np.floor_divide(ys, self.cell_size).astype(np.int64).tolist()
+        cell_of = self.cell_of
+        for key, cx, cy in zip(keys, cxs, cys):
+            old = cell_of.get(key)
+            if old is None or old[0] != cx or old[1] != cy:
+                if old is not None:
+                    self.remove(key)
+                cell_of[key] = (cx, cy)
+                self.cells.setdefault((cx, cy), []).append(key)
+
+    def pairs(self):
+        """Yield every (a, b) pair of keys in the same or adjacent cells, with a < b"""
+        cells = self.cells
+        for (cx, cy), members in cells.items():
+            count = len(members)
+            for i in range(count):
+                a = members[i]
+                for j in range(i + 1, count):
+                    b = members[j]
+                    yield (a, b) if a < b else (b, a)
+            for dx, dy in _FORWARD_NEIGHBOURS:
+                other = cells.get((cx + dx, cy + dy))
+                if other:
+                    for a in members:
+                        for b in other:
+                            yield (a, b) if a < b else (b, a)
+
+    def query(self, x, y, radius):
+        """Keys of every body whose center is in a cell within radius of (x, y)"""
+        cs = self.cell_size
+        x0, x1 = int((x - radius) // cs), int((x + radius) // cs)
+        y0, y1 = int((y - radius) // cs), int((y + radius) // cs)
+        cells = self.cells
+        found = []
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                members = cells.get((cx, cy))
+                if members:
+                    found.extend(members)
+        return found
+
+    def nearest(self, x, y, distance, skip=None):
+        """Key closest to (x, y) by distance(key), searching outward ring by ring.
+
+        Once a ring of cells has been searched every body not seen yet is at
+        least that ring's radius away, so the search stops as soon as the best
+        distance found is within it instead of visiting every body.
+        """
+        cs = self.cell_size
+        cx, cy = self.cell(x, y)
+        cells = self.cells
+        remaining = len(self.cell_of) - (skip in self.cell_of)
+        best_key, best = None, float('inf')
+        ring = 0
+        while remaining > 0:
+            if ring == 0:
+                ring_cells = ((cx, cy),)
+            else:
+                top = [(cx + i, cy - ring) for i in range(-ring, ring + 1)]
+                bottom = [(cx + i, cy + ring) for i in range(-ring, ring + 1)]
+                sides = [(cx + side, cy + j) for j in range(-ring + 1, ring) for side in (-ring, ring)]
+                ring_cells = top + bottom + sides
+            for cell in ring_cells:
+                for key in cells.get(cell, ()):
+                    if key == skip:
+                        continue
+                    remaining -= 1
+                    d = distance(key)
+                    if d < best or (d == best and key < best_key):
+                        best_key, best = key, d
+            if best <= ring * cs:
+                break
+            ring += 1
+        return best_key
@@ -0,0 +1,41 @@
+"""Arena, ball and timing constants shared by the simulation, abilities and renderer."""
+import os
+
+# --- World ---
+# The simulation works in world units, whatever the window size: the arena
+# spans (0, 0) to (ARENA_SIZE, ARENA_HEIGHT)
+ARENA_SIZE = 675
+ARENA_HEIGHT = 700  # Shorter arena
+BALL_COUNT = 2  # fighters in a regular fight, free-for-alls take any number
+BALL_RADIUS = 48  # 30 * 1.6
+BALL_MIN_SPEED = 5  # 7 * 0.75
+BALL_MAX_SPEED = 14  # 18 * 0.75
+
+# --- Window ---
+# Reference layout in pixels, one pixel per world unit: the arena between two
+# sidebars. Other window sizes scale all of it, see layout.py
+SIDEBAR_WIDTH = 150
+WIDTH = ARENA_SIZE + (SIDEBAR_WIDTH * 2)  # 975 total width
+HEIGHT = ARENA_HEIGHT
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Images')
+# Fighter sprites, stats and ability parameters, see roster.py
+ROSTER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fighters.json')
+
+# Velocities are in world units per frame of the original 60 FPS game loop
+FRAME_RATE = 60
+TICK_DT = 1.0 / FRAME_RATE  # Length of one simulation step in seconds
+# Find collisions by time of impact along every body's whole path through a
+# step. Plain steps also collide two balls at their moment of contact, but only
+# look at balls near each other at the end of the step and at blazeballs where
+# they end up. Costs a little per step but keeps fast bodies from passing
+# through each other, so headless runs can use a much larger dt (fewer steps
+# per second)
+SWEPT_COLLISIONS = False
+# After the pairwise collisions of a step, batched passes that push apart any
+# balls still overlapping (crowds, balls pinned on walls), until none overlaps
+# by more than CONTACT_SLOP world units. 0 turns the passes off.
+CONTACT_ITERATIONS = 8
+CONTACT_SLOP = 0.01
+BLAZE_COOLDOWN = 1  # seconds between blazeballs, unless the roster says otherwise
+BLAZEBALL_SPEED = 12 * 1.5  # 1.5x as fast, unless the roster says otherwise
+BLAZEBALL_RADIUS = int(16 * 1.3)  # 30% bigger
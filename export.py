@@ -0,0 +1,361 @@
+"""Export fights as an animated GIF or an image sequence, rendered offscreen.
+
+Usage:
+    python export.py steve blaze --seed 3 --out fight.gif
+    python export.py --replay fight.replay --out frames/ --fps 60 --scale 1
+
+The fight is drawn with the game's own drawing code on the SDL dummy video
+driver, as fast as it can be drawn rather than at 60 frames per second,
+and ends with the winner animation. Frames are laid out and drawn at the
+output size, sprites scaled once for it, rather than drawn at window size
+and shrunk. Output frames go through a FramePipeline: a fixed set of
+surfaces cycles between the drawing loop and an encoder thread, so memory
+stays the same however long the fight runs. The encoder reads each surface
+in place (surfarray views, or pygame.image.save for image files) and hands
+it back.
+
+GIFs use a fixed 252 color palette and store only the part of each frame
+that changed; an out path without the .gif extension is a directory that
+gets one PNG per frame.
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import pygame
+
+import balls_game
+from assets import AssetManager
+from config import FRAME_RATE, HEIGHT, WIDTH
+from layout import Layout
+from replay import ReplayReader
+from roster import default_roster
+from simulation import Simulation
+from sprites import EffectSprites
+
+FPS = 30  # output frames per second, must divide FRAME_RATE
+SCALE = 0.5
+BUFFERS = 8  # surfaces in flight between drawing and encoding
+MAX_FIGHT_TIME = 300  # simulated seconds before a fight is cut off
+
+# GIF palette: 6 red x 7 green x 6 blue levels
+LEVELS = (6, 7, 6)
+MAX_CODE = 4096  # GIF LZW codes are at most 12 bits
+
+
+def gif_palette():
+    r, g, b = (np.round(np.arange(n) * 255 / (n - 1)).astype(np.uint8) for n in LEVELS)
+    colors = np.stack(np.meshgrid(r, g, b, indexing='ij'), axis=-1).reshape(-1, 3)
+    # The color table holds 256 entries, the last ones are unused
+    table = np.zeros((256, 3), dtype=np.uint8)
+    table[:len(colors)] = colors
+    return table.tobytes()
+
+
+def quantize(rgb):
+    """(w, h, 3) RGB array -> (h, w) palette indices, nearest level per channel"""
+    nr, ng, nb = LEVELS
+    rgb = rgb.astype(np.uint16)
+    r = (rgb[:, :, 0] * (nr - 1) + 127) // 255
+    g = (rgb[:, :, 1] * (ng - 1) + 127) // 255
+    b = (rgb[:, :, 2] * (nb - 1) + 127) // 255
+    return (r * (ng * nb) + g * nb + b).astype(np.uint8).T
+
+
+def lzw_encode(pixels, code_size=8):
+    """GIF LZW compression of a bytes object of palette indices"""
+    clear = 1 << code_size
+    end = clear + 1
+    width = code_size + 1
+    table = {}
+    next_code = end + 1
+    out = bytearray()
+    # Bit buffer, codes are packed least significant bit first
+    acc = clear
+    bits = width
+    prefix = pixels[0]
+    for pixel in pixels[1:]:
+        key = (prefix << 8) | pixel
+        code = table.get(key)
+        if code is not None:
+            prefix = code
+            continue
+        acc |= prefix << bits
+        bits += width
+        if next_code < MAX_CODE:
+            table[key] = next_code
+            if next_code == 1 << width:
+                width += 1
+            next_code += 1
+        else:
+            # Table full, start over
+            acc |= clear << bits
+            bits += width
+            table = {}
+            next_code = end + 1
+            width = code_size + 1
+        while bits >= 8:
+            out.append(acc & 0xFF)
+            acc >>= 8
+            bits -= 8
+        prefix = pixel
+    acc |= prefix << bits
+    bits += width
+    acc |= end << bits
+    bits += width
+    while bits > 0:
+        out.append(acc & 0xFF)
+        acc >>= 8
+        bits -= 8
+    return bytes(out)
+
+
+class GifWriter:
+    """Animated GIF written frame by frame, only the changed part of each frame is stored"""
+
+    def __init__(self, path, size, fps):
+        self.file = open(path, 'wb')
+        self.width, self.height = size
+        self.delay = 100 / fps  # GIF delays are in hundredths of a second
+        self.frames = 0
+        self.previous = None  # palette indices of the last frame
+        f = self.file
+        f.write(b'GIF89a')
+        # Logical screen with a global 256 color table
+        f.write(self.width.to_bytes(2, 'little') + self.height.to_bytes(2, 'little') + bytes((0xF7, 0, 0)))
+        f.write(gif_palette())
+        # Loop forever
+        f.write(b'\x21\xFF\x0BNETSCAPE2.0\x03\x01\x00\x00\x00')
+
+    def write(self, surface):
+        view = pygame.surfarray.pixels3d(surface)
+        indices = quantize(view)
+        del view  # unlocks the surface
+        left, top, right, bottom = 0, 0, self.width, self.height
+        if self.previous is not None:
+            changed = indices != self.previous
+            rows = np.flatnonzero(changed.any(axis=1))
+            cols = np.flatnonzero(changed.any(axis=0))
+            if len(rows):
+                top, bottom = rows[0], rows[-1] + 1
+                left, right = cols[0], cols[-1] + 1
+            else:
+                # Nothing changed, a single unchanged pixel keeps the timing
+                right, bottom = 1, 1
+        self.previous = indices
+        # Accumulate the rounding so the average rate stays exact
+        delay = round(self.delay * (self.frames + 1)) - round(self.delay * self.frames)
+        self.frames += 1
+        f = self.file
+        # Graphic control: keep the previous frame underneath, then this frame's delay
+        f.write(b'\x21\xF9\x04\x04' + delay.to_bytes(2, 'little') + b'\x00\x00')
+        f.write(b'\x2C' + b''.join(int(v).to_bytes(2, 'little') for v in
+                                  (left, top, right - left, bottom - top)) + b'\x00')
+        data = lzw_encode(indices[top:bottom, left:right].tobytes())
+        f.write(b'\x08')
+        for start in range(0, len(data), 255):
+            block = data[start:start + 255]
+            f.write(bytes((len(block),)) + block)
+        f.write(b'\x00')
+
+    def close(self):
+        self.file.write(b'\x3B')
+        self.file.close()
+
+
+class ImageSequenceWriter:
+    """One image file per frame in a directory, the format follows the extension"""
+
+    def __init__(self, directory, extension='png'):
+        os.makedirs(directory, exist_ok=True)
+        self.pattern = os.path.join(directory, 'frame_{:06d}.' + extension)
+        self.frames = 0
+
+    def write(self, surface):
+        pygame.image.save(surface, self.pattern.format(self.frames))
+        self.frames += 1
+
+    def close(self):
+        pass
+
+
+class FramePipeline:
+    """Bounded hand-off of frames from the drawing loop to an encoder thread.
+
+    `buffers` surfaces cycle between the two: acquire() blocks while all of
+    them wait to be encoded, so a slow encoder slows the drawing down
+    instead of piling up frames.
+
+        surface = pipeline.acquire()
+        ...draw into surface...
+        pipeline.submit(surface)
+    """
+
+    def __init__(self, writer, size, buffers=BUFFERS):
+        self.writer = writer
+        self.free = queue.Queue()
+        self.full = queue.Queue()
+        for _ in range(buffers):
+            self.free.put(pygame.Surface(size))
+        self.error = None
+        self.thread = threading.Thread(target=self._encode, name='encoder', daemon=True)
+        self.thread.start()
+
+    def acquire(self):
+        surface = self.free.get()
+        if surface is None:
+            raise RuntimeError("encoder failed") from self.error
+        return surface
+
+    def submit(self, surface):
+        self.full.put(surface)
+
+    def _encode(self):
+        try:
+            while True:
+                surface = self.full.get()
+                if surface is None:
+                    break
+                self.writer.write(surface)
+                self.free.put(surface)
+        except BaseException as e:
+            self.error = e
+            self.free.put(None)  # wakes the drawing loop up
+
+    def close(self):
+        """Encode what's left and finish the output"""
+        self.full.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise RuntimeError("encoder failed") from self.error
+        self.writer.close()
+
+
+class FrameSource:
+    """Output frames of a fight: every `steps`-th step of a Simulation or a replay"""
+
+    def __init__(self, steps, sim=None, replay=None):
+        self.steps = steps
+        self.sim = sim
+        self.replay = replay
+
+    def frames(self, max_time):
+        """Yield the drawable state of each output frame, ends with the last step of the fight"""
+        if self.replay is not None:
+            last = len(self.replay) - 1
+            for i in list(range(0, last, self.steps)) + [last]:
+                yield self.replay.frame(i)
+            return
+        sim = self.sim
+        yield sim
+        while not sim.finished and sim.time < max_time:
+            for _ in range(self.steps):
+                sim.step(sim.dt)
+                if sim.finished:
+                    break
+            yield sim
+
+
+def output_size(scale):
+    return round(WIDTH * scale), round(HEIGHT * scale)
+
+
+def export(source, fighter_files, writer, scale=SCALE, buffers=BUFFERS, max_time=MAX_FIGHT_TIME):
+    """Draw the fight and the winner animation into writer, returns the number of frames"""
+    layout = Layout(output_size(scale))
+    font = layout.font(24)
+    big_font = layout.font(96)
+    pipeline = FramePipeline(writer, layout.size, buffers)
+
+    def emit(draw):
+        surface = pipeline.acquire()
+        draw(surface)
+        pipeline.submit(surface)
+
+    arena_gradient, sidebar_gradient = balls_game.bake_gradients(layout)
+    arena = balls_game.build_arena(layout, arena_gradient)
+    winner_background = balls_game.build_background(layout, arena)
+    assets = AssetManager()
+    assets.preload([balls_game.BLAZEBALL_FILE], sizes=[balls_game.blazeball_size(layout)])
+    sprites = EffectSprites(layout.scale)
+    hud = None
+    frames = 0
+    state = None
+    try:
+        for state in source.frames(max_time):
+            if hud is None:
+                hud = balls_game.make_hud(layout, font, assets, fighter_files, sidebar_gradient, state.balls)
+            emit(lambda target: balls_game.draw_fight(target, layout, state, assets, sprites, fighter_files, arena,
+                                                      hud))
+            frames += 1
+        winner = state.winner if state is not None else None
+        if winner is not None:
+            fighter_file = fighter_files[winner.type]
+            steps = source.steps
+            for frame in range(0, balls_game.WINNER_GROW_FRAMES + balls_game.WINNER_HOLD_FRAMES, steps):
+                r = balls_game.winner_radius(layout, winner, frame)
+                emit(lambda target: balls_game.draw_winner(target, layout, winner_background, big_font, assets,
+                                                           winner, fighter_file, r))
+                frames += 1
+    finally:
+        pipeline.close()
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a fight offscreen to a GIF or an image sequence")
+    parser.add_argument('fighters', nargs='*', help="fighters of a new fight, more than two for a free-for-all")
+    parser.add_argument('--replay', metavar='PATH', help="export a recorded fight instead")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--out', required=True, help="a .gif file, or a directory for PNG frames")
+    parser.add_argument('--fps', type=int, default=FPS, help=f"output frame rate, must divide {FRAME_RATE}")
+    parser.add_argument('--scale', type=float, default=SCALE,
+                        help=f"output size relative to the {WIDTH}x{HEIGHT} window, above 1 for larger video")
+    parser.add_argument('--buffers', type=int, default=BUFFERS, help="frames in flight to the encoder")
+    parser.add_argument('--max-time', type=float, default=MAX_FIGHT_TIME,
+                        help="simulated seconds after which a new fight is cut off")
+    args = parser.parse_args()
+    if args.fps <= 0 or FRAME_RATE % args.fps:
+        parser.error(f"--fps must divide {FRAME_RATE}")
+    if args.scale <= 0:
+        parser.error("--scale must be positive")
+    if not args.replay and len(args.fighters) < 2:
+        parser.error("give at least two fighters, or --replay")
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    balls_game.init_display("export")
+    files = default_roster().sprite_files()
+    steps = FRAME_RATE // args.fps
+    if args.replay:
+        replay = ReplayReader(args.replay)
+        if round(1 / replay.dt) != FRAME_RATE:
+            parser.error(f"only replays recorded at {FRAME_RATE} steps per second can be exported")
+        source = FrameSource(steps, replay=replay)
+        fighter_files = {t: files[t] for t in replay.types}
+    else:
+        try:
+            sim = Simulation(args.fighters, seed=args.seed)
+        except ValueError as e:
+            parser.error(str(e))
+        source = FrameSource(steps, sim=sim)
+        fighter_files = files
+
+    if args.out.lower().endswith('.gif'):
+        writer = GifWriter(args.out, output_size(args.scale), args.fps)
+    else:
+        writer = ImageSequenceWriter(args.out)
+    start = time.perf_counter()
+    try:
+        frames = export(source, fighter_files, writer, args.scale, args.buffers, args.max_time)
+    finally:
+        pygame.quit()
+    elapsed = time.perf_counter() - start
+    print(f"{frames} frames ({frames / args.fps:.1f} s of video) in {elapsed:.1f} s "
+          f"({frames / args.fps / elapsed:.2f}x real time) -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Where the arena, sidebars and screens go on a surface of any size.
+
+The simulation works in world units (see config.py) and the game was laid
+out for a WIDTH x HEIGHT window at one pixel per world unit. A Layout
+scales that reference layout uniformly to fit a surface, centred with
+black bars when the aspect ratio differs, and the drawing code takes every
+position, length, font and sprite size from it. The same code therefore
+draws a small low-resolution frame or a full screen one, and sprites are
+scaled once to the layout's sizes instead of per frame.
+"""
+import pygame
+
+from config import ARENA_SIZE, HEIGHT, SIDEBAR_WIDTH, WIDTH
+
+
+class Layout:
+    """The reference layout fitted to a surface of `size` pixels"""
+
+    def __init__(self, size):
+        width, height = size
+        if width <= 0 or height <= 0:
+            raise ValueError(f"layout size must be positive, got {size}")
+        self.size = (width, height)
+        self.scale = min(width / WIDTH, height / HEIGHT)  # pixels per world unit
+        content = (round(WIDTH * self.scale), round(HEIGHT * self.scale))
+        self.rect = pygame.Rect(((width - content[0]) // 2, (height - content[1]) // 2), content)
+        # Edges are rounded from the reference layout, so the three parts tile the content exactly
+        left = self.rect.x + round(SIDEBAR_WIDTH * self.scale)
+        right = self.rect.x + round((SIDEBAR_WIDTH + ARENA_SIZE) * self.scale)
+        self.arena = pygame.Rect(left, self.rect.y, right - left, self.rect.height)
+        self.sidebars = (pygame.Rect(self.rect.x, self.rect.y, left - self.rect.x, self.rect.height),
+                         pygame.Rect(right, self.rect.y, self.rect.right - right, self.rect.height))
+        self.fonts = {}
+
+    def px(self, length):
+        """A length of the reference layout (or in world units) in whole pixels, at least 1 unless 0"""
+        if not length:
+            return 0
+        return max(1, round(length * self.scale))
+
+    def to_screen(self, x, y):
+        """Pixel position of a world position"""
+        return self.arena.x + x * self.scale, self.arena.y + y * self.scale
+
+    def point(self, x, y):
+        """Pixel position of a world position, truncated to whole pixels"""
+        return int(self.arena.x + x * self.scale), int(self.arena.y + y * self.scale)
+
+    def font(self, size, name=None):
+        """pygame's SysFont of `size` reference pixels, made once per layout"""
+        key = (name, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = self.fonts[key] = pygame.font.SysFont(name, self.px(size))
+        return font
@@ -0,0 +1,511 @@
+"""Headless match server: many concurrent fights behind one local socket.
+
+Usage:
+    python match_server.py --workers 4 --port 8765
+    python match_server.py --unix /tmp/balls.sock
+
+Clients send one JSON object per line and get JSON lines back. A match
+request
+
+    {"op": "match", "id": "m1", "fighters": ["blaze", "steve"], "seed": 7,
+     "max_time": 300, "engine": "step", "deltas": 1}
+
+is answered with a "start" line (seed and the fighters' starting state), a
+"delta" line every `deltas` steps (0 for none) and a final "result" line
+with the winner, fight length and damage breakdown, all carrying the
+request's id. Any number of matches can run at once on one connection and
+their lines interleave. {"op": "cancel", "id": "m1"} drops a running
+match, {"op": "stats"} returns throughput and step latency. Ids are
+strings or integers; whatever can't be served gets an "error" line.
+
+Matches are sharded over worker processes that each step all of their
+arenas in turn, so every match progresses at once. Workers encode the reply
+lines themselves; the asyncio front end only validates requests and routes
+finished lines to the right connection.
+"""
+import argparse
+import array
+import asyncio
+import collections
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from config import FRAME_RATE, SWEPT_COLLISIONS
+from replay import ON_FIRE, POISONED, VISIBLE
+from tournament import MAX_FIGHT_TIME, fighter_types, new_simulation, step_options_set
+
+PORT = 8765
+ARENAS_PER_WORKER = 64  # matches stepped side by side per worker, the rest wait their turn
+MAX_FIGHTERS = 200
+# Accepted ranges of a match request's max_time (simulated seconds) and tick_rate (steps per second)
+MAX_TIME_RANGE = (0.01, 3600)
+TICK_RATE_RANGE = (1, 1000)
+STATS_WINDOW = 10.0  # seconds of completed matches behind matches_per_sec
+STEP_SAMPLES = 100000  # most recent step times behind the latency percentiles
+
+
+def _encode(message):
+    return json.dumps(message, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+def _error_line(request_id, error):
+    message = str(error) if isinstance(error, ValueError) else f"{type(error).__name__}: {error}"
+    return _encode({'id': request_id, 'type': 'error', 'error': message})
+
+
+def _flags(ball):
+    return (ON_FIRE if ball.on_fire else 0) | (POISONED if ball.poisoned else 0) | (VISIBLE if ball.visible else 0)
+
+
+# --- Worker side ---
+class Arena:
+    """One match hosted by a worker, builds its own reply messages"""
+
+    def __init__(self, request):
+        self.id = request.get('id')
+        self.max_time = request['max_time']
+        self.delta_every = request['deltas']
+        self.sim = new_simulation(request['fighters'], request.get('seed'), 1.0 / request['tick_rate'],
+                                  request['swept'], request['engine'])
+        self.fighters = list(self.sim.balls)
+        self.since_delta = 0
+        self.events = []  # Events since the last delta
+        self.sent_health = {}
+        self.sent_flags = {}
+        if self.delta_every:
+            self.sim.enable_events()
+            self.sim.step_listeners.append(self._collect)
+
+    def _collect(self, sim):
+        # The event engine calls listeners once per event, the step engine once per step
+        self.events.extend(sim.events)
+
+    @property
+    def done(self):
+        return self.sim.finished or self.sim.time >= self.max_time
+
+    def tick(self):
+        """Step the match once, returns True if a delta is due"""
+        sim = self.sim
+        sim.step(sim.dt)
+        if not self.delta_every:
+            return False
+        self.since_delta += 1
+        if self.since_delta < self.delta_every:
+            return False
+        self.since_delta = 0
+        return True
+
+    def start(self):
+        sim = self.sim
+        for ball in self.fighters:
+            self.sent_health[ball.index] = ball.health
+            self.sent_flags[ball.index] = _flags(ball)
+        return {
+            'id': self.id,
+            'type': 'start',
+            'seed': sim.seed,
+            'dt': sim.dt,
+            'fighters': [{'index': ball.index, 'type': ball.type, 'radius': ball.radius,
+                          'max_health': ball.max_health, 'x': ball.x, 'y': ball.y}
+                         for ball in self.fighters],
+        }
+
+    def delta(self):
+        """Positions of every living ball and blazeball, plus whatever else changed since the last delta"""
+        sim = self.sim
+        health = []
+        status = []
+        for ball in sim.balls:
+            i = ball.index
+            if ball.health != self.sent_health[i]:
+                self.sent_health[i] = ball.health
+                health.append([i, ball.health])
+            flags = _flags(ball)
+            if flags != self.sent_flags[i]:
+                self.sent_flags[i] = flags
+                status.append([i, flags])
+        message = {
+            'id': self.id,
+            'type': 'delta',
+            'step': sim.steps,
+            'time': round(sim.time, 6),
+            'balls': [[ball.index, round(ball.x, 2), round(ball.y, 2)] for ball in sim.balls],
+            'blazeballs': [[round(b.x, 2), round(b.y, 2)] for b in sim.blazeballs],
+            'health': health,
+            'status': status,
+            'events': self.events,
+        }
+        self.events = []
+        return message
+
+    def result(self):
+        sim = self.sim
+        return {
+            'id': self.id,
+            'type': 'result',
+            'winner': sim.winner.index if sim.winner else None,
+            'winner_type': sim.winner.type if sim.winner else None,
+            'time': sim.time,
+            'steps': sim.steps,
+            'damage_taken': [dict(ball.damage_taken) for ball in self.fighters],
+        }
+
+
+def worker_main(inbox, outbox, max_arenas):
+    """Worker process loop: one step of every hosted arena per round.
+
+    inbox brings ('match', match_id, request), ('cancel', match_id) and None
+    (shut down). After every round outbox gets (replies, step_times), where
+    replies are (match_id, finished, encoded lines) and step_times the
+    seconds each arena's step took. finished is None while a match runs and
+    'result' or 'error' with its last line.
+    """
+    arenas = {}
+    waiting = collections.deque()
+    while True:
+        # Block while there is nothing to run, otherwise only pick up what already arrived
+        while (not arenas and not waiting) or inbox.poll():
+            command = inbox.recv()
+            if command is None:
+                return
+            if command[0] == 'match':
+                waiting.append(command[1:])
+            else:
+                arenas.pop(command[1], None)
+                waiting = collections.deque(job for job in waiting if job[0] != command[1])
+
+        replies = []
+        while waiting and len(arenas) < max_arenas:
+            match_id, request = waiting.popleft()
+            try:
+                arena = Arena(request)
+                replies.append((match_id, None, _encode(arena.start())))
+            except Exception as e:
+                replies.append((match_id, 'error', _error_line(request.get('id'), e)))
+                continue
+            arenas[match_id] = arena
+
+        step_times = array.array('d')
+        clock = time.perf_counter
+        for match_id, arena in list(arenas.items()):
+            # A match that fails is ended with an error line, the others keep running
+            try:
+                start = clock()
+                delta_due = arena.tick()
+                step_times.append(clock() - start)
+                if delta_due or (arena.done and arena.delta_every):
+                    replies.append((match_id, None, _encode(arena.delta())))
+                if arena.done:
+                    replies.append((match_id, 'result', _encode(arena.result())))
+                    del arenas[match_id]
+            except Exception as e:
+                replies.append((match_id, 'error', _error_line(arena.id, e)))
+                del arenas[match_id]
+        outbox.send((replies, step_times))
+
+
+# --- Server side ---
+class Worker:
+    def __init__(self, context, max_arenas):
+        inbox_recv, self.inbox = context.Pipe(duplex=False)
+        self.outbox, outbox_send = context.Pipe(duplex=False)
+        self.process = context.Process(target=worker_main, args=(inbox_recv, outbox_send, max_arenas),
+                                       daemon=True)
+        self.process.start()
+        # Only the worker keeps these ends, so its exit shows up here as EOF
+        inbox_recv.close()
+        outbox_send.close()
+        self.load = 0  # matches handed out and not finished yet
+        self.alive = True
+        self.sends = asyncio.Queue()  # messages for the inbox, see MatchServer._send_worker()
+
+
+class Route:
+    """Where a match's reply lines go"""
+    __slots__ = ('writer', 'worker', 'client_id', 'owner')
+
+    def __init__(self, writer, worker, client_id, owner):
+        self.writer = writer
+        self.worker = worker
+        self.client_id = client_id
+        self.owner = owner  # the connection's client id -> match id map
+
+
+class MatchServer:
+    """asyncio front end over a pool of worker processes.
+
+        server = MatchServer(workers=4)
+        await server.start(port=8765)
+        await server.serve_forever()
+    """
+
+    def __init__(self, workers=None, arenas_per_worker=ARENAS_PER_WORKER):
+        self.worker_count = workers or os.cpu_count() or 1
+        self.arenas_per_worker = arenas_per_worker
+        self.fighter_types = set(fighter_types())
+        self.workers = []
+        self.matches = {}  # match id -> Route
+        self._next_id = 0
+        self.server = None
+        self.address = None
+        self.started = None
+        self.completed = 0
+        self.steps = 0
+        self.recent = collections.deque()  # completion times within STATS_WINDOW
+        self.step_times = collections.deque(maxlen=STEP_SAMPLES)
+        self._executor = None
+        self._readers = []
+        self._senders = []
+
+    async def start(self, host='127.0.0.1', port=PORT, unix=None):
+        context = multiprocessing.get_context()
+        self.workers = [Worker(context, self.arenas_per_worker) for _ in range(self.worker_count)]
+        # Pipe reads and writes block, each worker gets a thread to wait on its results and one to send on
+        self._executor = ThreadPoolExecutor(max_workers=2 * self.worker_count)
+        self._readers = [asyncio.create_task(self._read_worker(worker)) for worker in self.workers]
+        self._senders = [asyncio.create_task(self._send_worker(worker)) for worker in self.workers]
+        if unix:
+            self.server = await asyncio.start_unix_server(self._handle_client, path=unix)
+            self.address = unix
+        else:
+            self.server = await asyncio.start_server(self._handle_client, host, port)
+            self.address = self.server.sockets[0].getsockname()[:2]
+        self.started = time.perf_counter()
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for worker in self.workers:
+            worker.sends.put_nowait(None)
+        await asyncio.gather(*self._senders, *self._readers, return_exceptions=True)
+        for worker in self.workers:
+            worker.process.join()
+        self._executor.shutdown()
+
+    # --- Requests ---
+    async def _handle_client(self, reader, writer):
+        mine = {}  # client id -> match id, for cancel and clean-up on disconnect
+        try:
+            async for line in reader:
+                request = None
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("expected a JSON object")
+                    reply = self._handle_request(request, writer, mine)
+                except Exception as e:
+                    # A request that can't be served gets an error line, the connection stays up
+                    reply = {'type': 'error',
+                             'error': str(e) if isinstance(e, ValueError) else f"{type(e).__name__}: {e}"}
+                    if isinstance(request, dict) and 'id' in request:
+                        reply['id'] = request['id']
+                if reply is not None:
+                    writer.write(_encode(reply))
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for match_id in list(mine.values()):
+                self._cancel(match_id)
+            writer.close()
+
+    def _handle_request(self, request, writer, mine):
+        op = request.get('op')
+        request_id = request.get('id')
+        # Ids key this connection's matches, so they have to be hashable (and bool is no id)
+        if request_id is not None and (not isinstance(request_id, (str, int)) or isinstance(request_id, bool)):
+            raise ValueError("id must be a string or an integer")
+        if op == 'stats':
+            return self.stats()
+        if op == 'cancel':
+            match_id = mine.get(request.get('id'))
+            if match_id is None:
+                raise ValueError(f"no running match with id {request.get('id')!r}")
+            self._cancel(match_id)
+            return {'id': request['id'], 'type': 'cancelled'}
+        if op == 'match':
+            job = self._validate(request)
+            if job['id'] in mine:
+                raise ValueError(f"match id {job['id']!r} is already running on this connection")
+            self._dispatch(job, writer, mine)
+            return None
+        raise ValueError(f"unknown op {op!r}, expected match, cancel or stats")
+
+    def _validate(self, request):
+        """The match request with defaults filled in, ValueError if it can't be run"""
+        fighters = request.get('fighters')
+        if not isinstance(fighters, list) or not 2 <= len(fighters) <= MAX_FIGHTERS:
+            raise ValueError(f"fighters must be a list of 2 to {MAX_FIGHTERS} fighter names")
+        unknown = sorted(set(fighters) - self.fighter_types)
+        if unknown:
+            raise ValueError(f"unknown fighters {unknown}, expected some of {sorted(self.fighter_types)}")
+        job = {
+            'id': request.get('id'),
+            'fighters': fighters,
+            'seed': request.get('seed'),
+            'max_time': request.get('max_time', MAX_FIGHT_TIME),
+            'engine': request.get('engine', 'step'),
+            'tick_rate': request.get('tick_rate', FRAME_RATE),
+            'swept': bool(request.get('swept', SWEPT_COLLISIONS)),
+            'deltas': request.get('deltas', 1),
+        }
+        # JSON true and false would pass as the integers 1 and 0
+        if job['seed'] is not None and (not isinstance(job['seed'], (int, str)) or isinstance(job['seed'], bool)):
+            raise ValueError("seed must be an integer or a string")
+        if job['engine'] not in ('step', 'event'):
+            raise ValueError("engine must be 'step' or 'event'")
+        for key, (low, high) in (('max_time', MAX_TIME_RANGE), ('tick_rate', TICK_RATE_RANGE)):
+            value = job[key]
+            if not isinstance(value, (int, float)) or isinstance(value, bool) or not low <= value <= high:
+                raise ValueError(f"{key} must be a number from {low} to {high}")
+        if job['engine'] == 'event' and step_options_set(1.0 / job['tick_rate'], job['swept']):
+            raise ValueError("tick_rate and swept only apply to the step engine")
+        if not isinstance(job['deltas'], int) or isinstance(job['deltas'], bool) or job['deltas'] < 0:
+            raise ValueError("deltas must be a whole number of steps, 0 for none")
+        return job
+
+    def _dispatch(self, job, writer, mine):
+        workers = [worker for worker in self.workers if worker.alive]
+        if not workers:
+            raise ValueError("no match workers are running")
+        worker = min(workers, key=lambda w: w.load)
+        match_id = self._next_id
+        self._next_id += 1
+        # Routed right away, if the send fails _worker_lost() answers it with an error line
+        worker.sends.put_nowait(('match', match_id, job))
+        worker.load += 1
+        mine[job['id']] = match_id
+        self.matches[match_id] = Route(writer, worker, job['id'], mine)
+
+    def _cancel(self, match_id):
+        route = self._finish(match_id)
+        if route is not None and route.worker.alive:
+            route.worker.sends.put_nowait(('cancel', match_id))
+
+    def _finish(self, match_id):
+        route = self.matches.pop(match_id, None)
+        if route is not None:
+            route.worker.load -= 1
+            route.owner.pop(route.client_id, None)
+        return route
+
+    async def _send_worker(self, worker):
+        """Pass the worker's queued messages on from a thread, so a worker that is slow to
+        empty its pipe only holds up its own messages, not the event loop"""
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await worker.sends.get()
+            try:
+                await loop.run_in_executor(self._executor, worker.inbox.send, message)
+            except OSError:
+                self._worker_lost(worker)
+                return
+            if message is None:
+                return
+
+    # --- Replies ---
+    async def _read_worker(self, worker):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                replies, step_times = await loop.run_in_executor(self._executor, worker.outbox.recv)
+            except (EOFError, OSError):
+                self._worker_lost(worker)
+                return
+            self.steps += len(step_times)
+            self.step_times.extend(step_times)
+            writers = set()
+            now = time.perf_counter()
+            for match_id, finished, line in replies:
+                route = self.matches.get(match_id)
+                if route is None:
+                    continue  # Cancelled while the worker was still on it
+                if finished:
+                    self._finish(match_id)
+                if finished == 'result':
+                    self.completed += 1
+                    self.recent.append(now)
+                if not route.writer.is_closing():
+                    route.writer.write(line)
+                    writers.add(route.writer)
+            for writer in writers:
+                try:
+                    await writer.drain()
+                except ConnectionError:
+                    pass
+
+    def _worker_lost(self, worker):
+        """End the matches of a worker that exited with an error line each, and stop using it"""
+        worker.alive = False
+        for match_id, route in list(self.matches.items()):
+            if route.worker is not worker:
+                continue
+            self._finish(match_id)
+            if not route.writer.is_closing():
+                route.writer.write(_encode({'id': route.client_id, 'type': 'error',
+                                            'error': "the match's worker exited"}))
+
+    def stats(self):
+        now = time.perf_counter()
+        recent = self.recent
+        while recent and recent[0] < now - STATS_WINDOW:
+            recent.popleft()
+        uptime = now - self.started
+        stats = {
+            'type': 'stats',
+            'workers': len(self.workers),
+            'active': sum(worker.load for worker in self.workers),
+            'completed': self.completed,
+            'steps': self.steps,
+            'uptime': uptime,
+            'matches_per_sec': len(recent) / min(STATS_WINDOW, uptime) if uptime > 0 else 0.0,
+            'step_p50_ms': None,
+            'step_p99_ms': None,
+            'step_max_ms': None,
+        }
+        if self.step_times:
+            times = np.fromiter(self.step_times, dtype=np.float64, count=len(self.step_times)) * 1000
+            p50, p99 = np.percentile(times, (50, 99))
+            stats.update(step_p50_ms=float(p50), step_p99_ms=float(p99), step_max_ms=float(times.max()))
+        return stats
+
+
+async def serve(args):
+    server = MatchServer(args.workers, args.arenas)
+    await server.start(args.host, args.port, args.unix)
+    print(f"serving matches on {args.unix or '%s:%d' % tuple(server.address)} "
+          f"with {server.worker_count} workers")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many headless fights at once behind a local socket")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--unix', default=None, help="listen on this unix socket path instead of TCP")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--arenas', type=int, default=ARENAS_PER_WORKER,
+                        help="matches each worker steps side by side, further matches wait")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
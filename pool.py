@@ -0,0 +1,72 @@
+"""Fixed-capacity object pools for short-lived simulation records.
+
+Blazeballs and effects come and go many times a second. A Pool keeps the
+live records in one list that is compacted in place, and hands records that
+died back out through reset() instead of allocating new ones, so a long
+fight settles on a fixed set of objects and creates no garbage.
+"""
+
+
+class Pool:
+    """Reusable records of one class, at most `capacity` of them ever exist.
+
+    The class needs an `active` flag and a reset(*args) method that
+    reinitializes every field. `live` holds the records in spawn order and
+    is the same list object for the pool's whole life, so it can be handed
+    out (e.g. as Simulation.blazeballs) and stays current.
+    """
+
+    def __init__(self, cls, capacity):
+        self.cls = cls
+        self.capacity = capacity
+        self.live = []
+        self.free = []
+        self.allocated = 0  # records ever created
+        self.recycled = 0  # live records taken over because the pool was full
+
+    def __len__(self):
+        return len(self.live)
+
+    def acquire(self, *args):
+        """A record reset with args and appended to live"""
+        if self.free:
+            obj = self.free.pop()
+        elif self.allocated < self.capacity:
+            obj = self.cls.__new__(self.cls)
+            self.allocated += 1
+        else:
+            # Full: take over the oldest live record
+            obj = self.live.pop(0)
+            self.recycled += 1
+        obj.reset(*args)
+        self.live.append(obj)
+        return obj
+
+    def compact(self):
+        """Drop inactive records from live in place, keeping the order of the rest"""
+        live = self.live
+        free = self.free
+        kept = 0
+        for obj in live:
+            if obj.active:
+                live[kept] = obj
+                kept += 1
+            else:
+                free.append(obj)
+        del live[kept:]
+
+    def expire(self, count):
+        """Hand the `count` oldest live records back at once, for records that die in spawn order"""
+        live = self.live
+        for obj in live[:count]:
+            obj.active = False
+        self.free.extend(live[:count])
+        del live[:count]
+
+    def stats(self):
+        return {
+            'live': len(self.live),
+            'free': len(self.free),
+            'allocated': self.allocated,
+            'recycled': self.recycled,
+        }
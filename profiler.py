@@ -0,0 +1,121 @@
+"""Per-phase frame timing for the game loop.
+
+A FrameProfiler splits every frame into phases with lap() calls: each lap
+charges the time since the previous one to the named phase, so timing a
+phase costs one perf_counter() call and a dict update. Simulation and
+DirtyRectRenderer lap their own phases when given a profiler; the game loop
+laps the rest (input, overlay, waiting for the next frame).
+
+Rolling averages over the last `window` frames feed the on-screen overlay,
+and an optional CSV trace gets one row per frame for offline analysis.
+StartupTimer covers what happens before the first frame.
+"""
+import collections
+import csv
+import time
+
+# In frame order. The simulation phases repeat once per fixed step run in the frame.
+PHASES = (
+    'input',        # pygame event handling
+    'move',         # ball movement, wall bounces and the broadphase grid
+    'abilities',    # per-tick abilities (blaze timer, herobrine fading)
+    'projectiles',  # blazeball movement and hits
+    'collisions',   # ball contacts and the collision abilities
+    'status',       # poison and fire ticks
+    'cleanup',      # dead balls, finished effects, winner check, step listeners
+    'draw',         # background restore, balls, effects and HUD
+    'present',      # display.update()/flip()
+    'overlay',      # this profiler's own overlay
+    'idle',         # waiting on the frame limiter
+)
+COUNTS = ('steps', 'balls', 'blazeballs', 'explosions', 'hit_effects')
+
+
+class FrameProfiler:
+    """Lap timer over the phases of a frame, with rolling per-phase averages.
+
+        profiler.begin_frame()
+        while running:
+            ...work...; profiler.lap('draw')
+            profiler.end_frame(steps=1, balls=2, ...)  # also starts the next frame
+    """
+
+    def __init__(self, window=120, trace_path=None):
+        self.window = window
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(COUNTS, 0)  # of the last finished frame
+        self.frames = 0
+        self._history = collections.deque()  # (frame seconds, phase seconds) of the last `window` frames
+        self._sums = dict.fromkeys(PHASES, 0.0)
+        self._frame_sum = 0.0
+        self._frame_start = self._last = time.perf_counter()
+        self._trace_file = None
+        self._trace = None
+        if trace_path:
+            self._trace_file = open(trace_path, 'w', newline='')
+            self._trace = csv.writer(self._trace_file)
+            self._trace.writerow(('frame', 'time_s', 'frame_ms') + tuple(f'{p}_ms' for p in PHASES) + COUNTS)
+
+    def begin_frame(self):
+        self._frame_start = self._last = time.perf_counter()
+
+    def lap(self, phase):
+        """Charge the time since the last lap (or the start of the frame) to phase"""
+        now = time.perf_counter()
+        self.current[phase] += now - self._last
+        self._last = now
+
+    def end_frame(self, **counts):
+        now = time.perf_counter()
+        frame_time = now - self._frame_start
+        phases = self.current
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self._frame_start = self._last = now
+        self.counts.update(counts)
+        self.frames += 1
+
+        history = self._history
+        history.append((frame_time, phases))
+        self._frame_sum += frame_time
+        sums = self._sums
+        for phase, seconds in phases.items():
+            sums[phase] += seconds
+        if len(history) > self.window:
+            old_time, old_phases = history.popleft()
+            self._frame_sum -= old_time
+            for phase, seconds in old_phases.items():
+                sums[phase] -= seconds
+
+        if self._trace is not None:
+            self._trace.writerow([self.frames, f'{now:.6f}', f'{frame_time * 1000:.4f}'] +
+                                 [f'{phases[p] * 1000:.4f}' for p in PHASES] +
+                                 [self.counts[c] for c in COUNTS])
+
+    def fps(self):
+        """Frames per second over the rolling window"""
+        return len(self._history) / self._frame_sum if self._frame_sum > 0 else 0.0
+
+    def averages(self):
+        """Mean milliseconds per frame of every phase over the rolling window"""
+        n = max(len(self._history), 1)
+        return {phase: seconds * 1000 / n for phase, seconds in self._sums.items()}
+
+    def close(self):
+        if self._trace_file is not None:
+            self._trace_file.close()
+            self._trace_file = self._trace = None
+
+
+class StartupTimer:
+    """Milliseconds from launch to each startup milestone, recorded the first time it is reached"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = {}  # milestone -> seconds since start, in the order they were reached
+
+    def mark(self, name):
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() - self.start
+
+    def report(self):
+        return ', '.join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in self.marks.items())
@@ -0,0 +1,292 @@
+"""Binary fight replays.
+
+A replay holds the fight's seed and fighter types plus, for every
+simulation step, the state needed to draw it (ball positions, health and
+status flags, blazeball positions) and the step's events (spawns, hits,
+damage, deaths). A frame index at the end of the file lets a player jump
+to any step without re-running the physics; the seed and types are enough
+to re-simulate the whole fight with Simulation(types, seed=seed).
+
+Positions are in world units, with the origin at the arena's corner.
+
+Layout, all little-endian:
+    header   magic, version, dt, seed, fighter types
+    frames   one record per step (frame 0 is the starting position)
+    index    u64 file offset of every frame
+    footer   u64 index offset, u32 frame count, end magic
+"""
+import math
+import struct
+
+from simulation import Explosion, HitEffect
+
+MAGIC = b'BALLRPL1'
+END_MAGIC = b'BALLEND1'
+VERSION = 1
+
+_HEADER = struct.Struct('<8sHd')
+_FRAME = struct.Struct('<IHHH')  # step, balls, blazeballs, events
+_BALL = struct.Struct('<HddiB')  # index, x, y, health, flags
+_BLAZEBALL = struct.Struct('<dd')
+_FOOTER = struct.Struct('<QI8s')
+
+# Ball flag bits
+ON_FIRE = 1
+POISONED = 2
+VISIBLE = 4
+
+# Event kind -> (code, payload layout); damage also carries its cause as a short string
+EVENTS = {
+    'spawn': (0, struct.Struct('<HBHBBBi')),  # index, type id, radius, r, g, b, max health
+    'blazeball': (1, struct.Struct('<H')),  # owner
+    'explosion': (2, struct.Struct('<dd')),  # x, y
+    'hit': (3, struct.Struct('<HHdd')),  # ball a, ball b, x, y
+    'projectile_hit': (4, struct.Struct('<H')),  # target
+    'damage': (5, struct.Struct('<Hi')),  # ball, amount
+    'death': (6, struct.Struct('<H')),  # ball
+}
+EVENT_KINDS = {code: (kind, layout) for kind, (code, layout) in EVENTS.items()}
+
+
+def _pack_str(text):
+    data = text.encode('utf-8')
+    return struct.pack('<B', len(data)) + data
+
+
+def _unpack_str(buf, offset):
+    length = buf[offset]
+    return buf[offset + 1:offset + 1 + length].decode('utf-8'), offset + 1 + length
+
+
+class ReplayWriter:
+    """Records a Simulation to a replay file as it runs.
+
+    Attach before the first step; the starting position is written straight
+    away and every following step is appended by a step listener.
+
+        with ReplayWriter('fight.replay', sim):
+            sim.run()
+    """
+
+    def __init__(self, path, sim):
+        self.sim = sim
+        self.file = open(path, 'wb')
+        self.offsets = []
+        self.types = []
+        for ball in sim.balls:
+            if ball.type not in self.types:
+                self.types.append(ball.type)
+        self._write_header()
+        sim.enable_events()
+        spawns = [('spawn', ball.index) for ball in sim.balls]
+        self._write_frame(sim, spawns)
+        sim.step_listeners.append(self._on_step)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write_header(self):
+        sim = self.sim
+        f = self.file
+        f.write(_HEADER.pack(MAGIC, VERSION, sim.dt))
+        # Tournament seeds are strings, keep the seed's type so it can be reused as is
+        f.write(b'i' if isinstance(sim.seed, int) else b's')
+        f.write(_pack_str(str(sim.seed)))
+        f.write(struct.pack('<B', len(self.types)))
+        for fighter_type in self.types:
+            f.write(_pack_str(fighter_type))
+
+    def _on_step(self, sim):
+        self._write_frame(sim, sim.events)
+
+    def _write_frame(self, sim, events):
+        parts = [_FRAME.pack(sim.steps, len(sim.balls), len(sim.blazeballs), len(events))]
+        for ball in sim.balls:
+            flags = (ON_FIRE if ball.on_fire else 0) | (POISONED if ball.poisoned else 0) | \
+                (VISIBLE if ball.visible else 0)
+            parts.append(_BALL.pack(ball.index, ball.x, ball.y, ball.health, flags))
+        for b in sim.blazeballs:
+            parts.append(_BLAZEBALL.pack(b.x, b.y))
+        for event in events:
+            parts.append(self._pack_event(event))
+        self.offsets.append(self.file.tell())
+        self.file.write(b''.join(parts))
+
+    def _pack_event(self, event):
+        kind = event[0]
+        code, layout = EVENTS[kind]
+        if kind == 'spawn':
+            ball = self.sim.by_index[event[1]]
+            payload = layout.pack(ball.index, self.types.index(ball.type), ball.radius, *ball.color,
+                                  ball.max_health)
+        elif kind == 'damage':
+            payload = layout.pack(event[1], event[2]) + _pack_str(event[3])
+        else:
+            payload = layout.pack(*event[1:])
+        return struct.pack('<B', code) + payload
+
+    def close(self):
+        if self.file.closed:
+            return
+        if self._on_step in self.sim.step_listeners:
+            self.sim.step_listeners.remove(self._on_step)
+        index_offset = self.file.tell()
+        self.file.write(struct.pack(f'<{len(self.offsets)}Q', *self.offsets))
+        self.file.write(_FOOTER.pack(index_offset, len(self.offsets), END_MAGIC))
+        self.file.close()
+
+
+class ReplayBall:
+    __slots__ = ('index', 'type', 'radius', 'color', 'max_health', 'x', 'y', 'health',
+                 'on_fire', 'poisoned', 'visible')
+
+
+class ReplayBlazeball:
+    __slots__ = ('x', 'y', 'active')
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.active = True
+
+
+class ReplayFrame:
+    """Everything the renderer reads from a Simulation, for one recorded step"""
+
+    def __init__(self, step, time, balls, blazeballs, events):
+        self.step = step
+        self.time = time
+        self.balls = balls
+        self.blazeballs = blazeballs
+        self.events = events
+        self.explosions = []
+        self.hit_effects = []
+        self.winner = None
+        self.finished = False
+
+
+class ReplayReader:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = f.read()
+        data = self.data
+        magic, version, self.dt = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} balls replay")
+        offset = _HEADER.size
+        seed_kind = data[offset:offset + 1]
+        seed, offset = _unpack_str(data, offset + 1)
+        self.seed = int(seed) if seed_kind == b'i' else seed
+        self.types = []
+        type_count = data[offset]
+        offset += 1
+        for _ in range(type_count):
+            fighter_type, offset = _unpack_str(data, offset)
+            self.types.append(fighter_type)
+
+        index_offset, count, end_magic = _FOOTER.unpack_from(data, len(data) - _FOOTER.size)
+        if end_magic != END_MAGIC:
+            raise ValueError(f"{path} is truncated (recording was not closed)")
+        self.offsets = struct.unpack_from(f'<{count}Q', data, index_offset)
+
+        # All balls spawn in the starting frame, keep their fixed attributes
+        self.spawns = {}
+        for event in self.events(0):
+            if event[0] == 'spawn':
+                _, index, type_id, radius, r, g, b, max_health = event
+                self.spawns[index] = (self.types[type_id], radius, (r, g, b), max_health)
+        # Effects live for at most this many frames after their event
+        self.effect_frames = math.ceil(Explosion.duration / self.dt) + 1
+        # (frame number, explosions, hit effects) of the last frame built, carried on when playing forward
+        self._effects_at = None
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def duration(self):
+        return (len(self) - 1) * self.dt
+
+    def index_at(self, time):
+        """Frame number shown at the given number of seconds into the fight"""
+        return max(0, min(len(self) - 1, int(round(time / self.dt))))
+
+    def _parse(self, i):
+        data = self.data
+        offset = self.offsets[i]
+        step, n_balls, n_blazeballs, n_events = _FRAME.unpack_from(data, offset)
+        offset += _FRAME.size
+        balls = []
+        for _ in range(n_balls):
+            balls.append(_BALL.unpack_from(data, offset))
+            offset += _BALL.size
+        blazeballs = []
+        for _ in range(n_blazeballs):
+            blazeballs.append(_BLAZEBALL.unpack_from(data, offset))
+            offset += _BLAZEBALL.size
+        events = []
+        for _ in range(n_events):
+            kind, layout = EVENT_KINDS[data[offset]]
+            fields = layout.unpack_from(data, offset + 1)
+            offset += 1 + layout.size
+            if kind == 'damage':
+                cause, offset = _unpack_str(data, offset)
+                fields += (cause,)
+            events.append((kind,) + fields)
+        return step, balls, blazeballs, events
+
+    def events(self, i):
+        return self._parse(i)[3]
+
+    def frame(self, i):
+        """Rebuild the drawable state of frame i, without touching the physics"""
+        step, ball_records, blazeball_records, events = self._parse(i)
+        balls = []
+        for index, x, y, health, flags in ball_records:
+            ball = ReplayBall()
+            ball.index = index
+            ball.type, ball.radius, ball.color, ball.max_health = self.spawns[index]
+            ball.x, ball.y, ball.health = x, y, health
+            ball.on_fire = bool(flags & ON_FIRE)
+            ball.poisoned = bool(flags & POISONED)
+            ball.visible = bool(flags & VISIBLE)
+            balls.append(ball)
+        blazeballs = [ReplayBlazeball(x, y) for x, y in blazeball_records]
+        time = step * self.dt
+        frame = ReplayFrame(step, time, balls, blazeballs, events)
+
+        # Explosions and hit effects started in the last few frames are still on screen. Moving
+        # forward, only the frames since the last one built add effects; otherwise read them all
+        if self._effects_at is not None and 0 <= i - self._effects_at[0] <= self.effect_frames:
+            last, explosions, hit_effects = self._effects_at
+            explosions, hit_effects = list(explosions), list(hit_effects)
+            first = last + 1
+        else:
+            explosions, hit_effects = [], []
+            first = max(0, i - self.effect_frames)
+        for j in range(first, i + 1):
+            if j == i:
+                start_step, started = step, events
+            else:
+                start_step, _, _, started = self._parse(j)
+            start = start_step * self.dt
+            for event in started:
+                if event[0] == 'explosion':
+                    explosions.append(Explosion(event[1], event[2], start))
+                elif event[0] == 'hit':
+                    hit_effects.append(HitEffect(event[3], event[4], start))
+        for effects, shown in ((explosions, frame.explosions), (hit_effects, frame.hit_effects)):
+            for effect in effects:
+                effect.update(time)
+                if effect.active:
+                    shown.append(effect)
+        self._effects_at = (i, frame.explosions, frame.hit_effects)
+
+        if i == len(self) - 1:
+            frame.finished = True
+            if len(balls) == 1:
+                frame.winner = balls[0]
+        return frame
@@ -0,0 +1,150 @@
+"""Fighter definitions, loaded from a roster file.
+
+fighters.json lists every fighter with its sprite (a file in Images/), its
+radius, mass and health, and optionally an ability (a name registered with
+@register_ability) plus values for that ability's parameters:
+
+    {
+      "defaults": {"radius": 48, "mass": 1.0, "health": 100},
+      "fighters": {
+        "creeper": {"sprite": "creeper.jpg", "ability": "creeper",
+                    "params": {"damage": 4, "self_damage": 2, "push": 4}},
+        "zombie": {"sprite": "zombie.jpeg"}
+      }
+    }
+
+Fields left out of a fighter come from "defaults", parameters left out come
+from the ability class. Loading validates the whole file and compiles it
+into a Roster: one tuple per stat indexed by fighter id, fighters in name
+order. Balls get their numbers from these columns when they are created,
+so adding a fighter is an edit to the file, not to the code.
+"""
+import json
+import os
+
+from abilities import ABILITIES, Ability
+from config import BALL_RADIUS, IMAGES_DIR, ROSTER_FILE
+
+STATS = {'radius': int, 'mass': float, 'health': int}
+DEFAULTS = {'radius': BALL_RADIUS, 'mass': 1.0, 'health': 100}
+FIGHTER_KEYS = {'sprite', 'ability', 'params'} | set(STATS)
+
+_default = None
+
+
+def _is_number(value, kind):
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, int) if kind is int else isinstance(value, (int, float))
+
+
+class Roster:
+    """Validated fighter table, every column indexed by fighter id"""
+
+    def __init__(self, data, source='<roster>', images_dir=IMAGES_DIR):
+        if not isinstance(data, dict) or not isinstance(data.get('fighters'), dict) or not data['fighters']:
+            raise ValueError(f"{source}: expected an object with a non-empty \"fighters\" object")
+        unknown = set(data) - {'defaults', 'fighters'}
+        if unknown:
+            raise ValueError(f"{source}: unknown top-level keys {sorted(unknown)}")
+        defaults = dict(DEFAULTS)
+        defaults.update(self._check_stats(data.get('defaults', {}), source, 'defaults'))
+
+        self.names = tuple(sorted(data['fighters']))
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        sprites, abilities, params = [], [], []
+        columns = {stat: [] for stat in STATS}
+        for name in self.names:
+            where = f"fighter {name!r}"
+            entry = data['fighters'][name]
+            if not isinstance(entry, dict):
+                raise ValueError(f"{source}: {where} must be an object")
+            unknown = set(entry) - FIGHTER_KEYS
+            if unknown:
+                raise ValueError(f"{source}: {where} has unknown keys {sorted(unknown)}")
+
+            sprite = entry.get('sprite')
+            if not isinstance(sprite, str) or not os.path.isfile(os.path.join(images_dir, sprite)):
+                raise ValueError(f"{source}: {where} needs a sprite file in {images_dir}, got {sprite!r}")
+            stats = dict(defaults)
+            stats.update(self._check_stats(entry, source, where))
+
+            ability = entry.get('ability')
+            if ability is not None and ability not in ABILITIES:
+                raise ValueError(f"{source}: {where} has unknown ability {ability!r}, "
+                                 f"expected one of {sorted(ABILITIES)}")
+            cls = ABILITIES.get(ability, Ability)
+            values = entry.get('params', {})
+            if not isinstance(values, dict):
+                raise ValueError(f"{source}: {where} params must be an object")
+            unknown = set(values) - set(cls.params)
+            if unknown:
+                raise ValueError(f"{source}: {where} has unknown {ability or 'plain'} ability params "
+                                 f"{sorted(unknown)}, expected some of {sorted(cls.params)}")
+            resolved = dict(cls.params)
+            for key, value in values.items():
+                kind = type(cls.params[key])
+                if not _is_number(value, kind) or value < 0:
+                    raise ValueError(f"{source}: {where} param {key!r} must be a non-negative "
+                                     f"{'whole ' if kind is int else ''}number, got {value!r}")
+                resolved[key] = value
+
+            sprites.append(sprite)
+            abilities.append(ability)
+            params.append(resolved)
+            for stat in STATS:
+                columns[stat].append(stats[stat])
+
+        self.sprites = tuple(sprites)
+        self.abilities = tuple(abilities)  # ability name, None for the plain collision fighter
+        self.params = tuple(params)  # resolved ability parameters
+        self.radius = tuple(columns['radius'])
+        self.mass = tuple(float(m) for m in columns['mass'])
+        self.health = tuple(columns['health'])
+
+    @staticmethod
+    def _check_stats(entry, source, where):
+        if not isinstance(entry, dict):
+            raise ValueError(f"{source}: {where} must be an object")
+        stats = {}
+        for stat, kind in STATS.items():
+            if stat in entry:
+                value = entry[stat]
+                if not _is_number(value, kind) or value <= 0:
+                    raise ValueError(f"{source}: {where} {stat} must be a positive "
+                                     f"{'whole ' if kind is int else ''}number, got {value!r}")
+                stats[stat] = value
+        return stats
+
+    @classmethod
+    def load(cls, path=ROSTER_FILE, images_dir=IMAGES_DIR):
+        with open(path) as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}: {e}") from None
+        return cls(data, path, images_dir)
+
+    def __len__(self):
+        return len(self.names)
+
+    def id_of(self, name):
+        fighter = self.ids.get(name)
+        if fighter is None:
+            raise ValueError(f"unknown fighter {name!r}, expected one of {list(self.names)}")
+        return fighter
+
+    def make_ability(self, fighter):
+        return ABILITIES.get(self.abilities[fighter], Ability)(**self.params[fighter])
+
+    def sprite_files(self):
+        """fighter name -> sprite file"""
+        return dict(zip(self.names, self.sprites))
+
+
+def default_roster():
+    """The roster in ROSTER_FILE, loaded on first use"""
+    global _default
+    if _default is None:
+        _default = Roster.load()
+    return _default
@@ -0,0 +1,810 @@
+"""Headless fight simulation for the balls arena.
+
+Nothing in here imports pygame: the game loop in balls_game.py only draws
+the state held by a Simulation, so fights can also be stepped without a
+display as fast as the CPU allows.
+"""
+import collections
+import heapq
+import math
+import random
+
+import numpy as np
+
+from ball_store import FIELDS, VECTOR_FIELDS, BallStore
+from abilities import bind_ability
+from broadphase import SpatialHash
+from pool import Pool
+from roster import default_roster
+from timers import TimerWheel
+from config import (
+    ARENA_SIZE, ARENA_HEIGHT, BALL_MIN_SPEED, BALL_MAX_SPEED,
+    FRAME_RATE, TICK_DT, BLAZEBALL_RADIUS, SWEPT_COLLISIONS, CONTACT_ITERATIONS, CONTACT_SLOP,
+)
+
+# Pool capacities. Effects past capacity replace the oldest one still on
+# screen; blazeballs only live for well under a second, so a blazeball pool
+# never fills up in practice.
+BLAZEBALL_POOL_SIZE = 256
+EXPLOSION_POOL_SIZE = 32
+HIT_EFFECT_POOL_SIZE = 64
+# Seconds between two poison or fire ticks
+STATUS_INTERVAL = 1
+# Slack when turning a time into the step it falls on, so float rounding can't push it to the next one
+STEP_EPSILON = 1e-6
+
+
+# --- Ball Class ---
+def _store_field(name):
+    """Property that reads and writes one slot of a BallStore array"""
+    def get(self):
+        return getattr(self._store, name).item(self._index)
+
+    def set(self, value):
+        getattr(self._store, name)[self._index] = value
+    return property(get, set)
+
+
+class Ball:
+    """View onto one ball's slot in a BallStore"""
+    __slots__ = ('_store', '_index', 'color', 'type', 'fighter', 'damage_taken',
+                 'ability', 'collide_priority', 'on_collide', 'on_tick', 'next_tick', 'on_hit_by_projectile')
+
+    def __init__(self, x, y, vx, vy, radius, color, health=20, type=None, store=None, mass=1.0,
+                 fighter=None, ability=None):
+        if store is None:
+            store = BallStore(capacity=1)
+        self._store = store
+        self._index = store.add(x, y, vx, vy, radius, health, mass)
+        self.color = color
+        self.type = type  # e.g. 'blaze', 'zombie', etc.
+        self.fighter = fighter  # roster id of the type
+        self.damage_taken = {}  # cause -> total damage, for stats
+        bind_ability(self, ability)
+
+    @property
+    def index(self):
+        return self._index
+
+    def take_damage(self, amount, cause, source=None):
+        """Lose health; source is the ball the damage came from (this one if self-inflicted)"""
+        self.health -= amount
+        self.damage_taken[cause] = self.damage_taken.get(cause, 0) + amount
+        events = self._store.events
+        if events is not None:
+            events.append(('damage', self._index, amount, cause, -1 if source is None else source.index))
+
+    def move(self, frames=1.0):
+        """Advance the ball by the given number of 60 FPS frames"""
+        self.x += self.vx * frames
+        self.y += self.vy * frames
+
+        # Bounce off arena walls (white square)
+        if self.x - self.radius < 0:
+            self.x = self.radius
+            self.vx *= -1
+        if self.x + self.radius > ARENA_SIZE:
+            self.x = ARENA_SIZE - self.radius
+            self.vx *= -1
+        if self.y - self.radius < 0:
+            self.y = self.radius
+            self.vy *= -1
+        if self.y + self.radius > ARENA_HEIGHT:
+            self.y = ARENA_HEIGHT - self.radius
+            self.vy *= -1
+
+        # Herobrine: if not visible, remove all effects
+        if not self.visible:
+            self.poisoned = False
+            self.on_fire = False
+
+    def update_poison(self, sim):
+        if self.poisoned:
+            # Poison ticks every STATUS_INTERVAL seconds
+            if sim.due(self.last_poison_tick + STATUS_INTERVAL):
+                self.take_damage(1, 'poison', sim.by_index[self.poison_source])
+                self.last_poison_tick = sim.time
+                self.poison_time -= 1
+                if self.poison_time <= 0:
+                    self.poisoned = False
+
+    def update_fire(self, sim):
+        if self.on_fire:
+            if sim.due(self.last_fire_tick + STATUS_INTERVAL):
+                self.take_damage(1, 'fire', sim.by_index[self.fire_source])
+                self.last_fire_tick = sim.time
+                self.fire_time -= 1
+                if self.fire_time <= 0:
+                    self.on_fire = False
+
+    def next_status_tick(self):
+        """Time of the next poison or fire tick, None if neither is on"""
+        times = []
+        if self.on_fire:
+            times.append(self.last_fire_tick + STATUS_INTERVAL)
+        if self.poisoned:
+            times.append(self.last_poison_tick + STATUS_INTERVAL)
+        return min(times) if times else None
+
+
+for _name in VECTOR_FIELDS + tuple(FIELDS):
+    setattr(Ball, _name, _store_field(_name))
+
+
+class Blazeball:
+    __slots__ = ('x', 'y', 'vx', 'vy', 'radius', 'owner', 'active')
+
+    def __init__(self, x, y, vx, vy, owner):
+        self.reset(x, y, vx, vy, owner)
+
+    def reset(self, x, y, vx, vy, owner):
+        self.x = x
+        self.y = y
+        self.vx = vx
+        self.vy = vy
+        self.radius = BLAZEBALL_RADIUS
+        self.owner = owner  # the ball that shot it
+        self.active = True
+
+    def move(self, frames=1.0):
+        self.x += self.vx * frames
+        self.y += self.vy * frames
+        # Deactivate if out of arena bounds
+        if not (0 <= self.x <= ARENA_SIZE and 0 <= self.y <= ARENA_HEIGHT):
+            self.active = False
+
+
+class Explosion:
+    __slots__ = ('x', 'y', 'start_time', 'active')
+    duration = 0.5  # seconds
+    max_radius = 120
+
+    def __init__(self, x, y, start_time):
+        self.reset(x, y, start_time)
+
+    def reset(self, x, y, start_time):
+        self.x = x
+        self.y = y
+        self.start_time = start_time
+        self.active = True
+
+    def update(self, current_time):
+        if current_time - self.start_time > self.duration:
+            self.active = False
+
+
+class HitEffect:
+    __slots__ = ('x', 'y', 'start_time', 'active')
+    duration = 0.15  # seconds
+    max_radius = 32
+
+    def __init__(self, x, y, start_time):
+        self.reset(x, y, start_time)
+
+    def reset(self, x, y, start_time):
+        self.x = x
+        self.y = y
+        self.start_time = start_time
+        self.active = True
+
+    def update(self, current_time):
+        if current_time - self.start_time > self.duration:
+            self.active = False
+
+
+def balls_collide(ball1, ball2):
+    dx = ball1.x - ball2.x
+    dy = ball1.y - ball2.y
+    distance = math.hypot(dx, dy)
+    return distance < ball1.radius + ball2.radius
+
+
+def time_of_impact(px, py, dx, dy, radius, limit=1.0):
+    """First fraction t of a step at which two moving circles touch.
+
+    (px, py) is their relative position at the start of the step, (dx, dy)
+    their relative displacement over the step and radius the sum of their
+    radii. Returns 0.0 if they already overlap, None if they don't touch
+    before t reaches limit (the end of the step).
+    """
+    c = px * px + py * py - radius * radius
+    if c <= 0:
+        return 0.0
+    b = px * dx + py * dy
+    if b >= 0:
+        return None  # Not closing in
+    a = dx * dx + dy * dy
+    disc = b * b - a * c
+    if disc < 0:
+        return None  # Closest approach is still apart
+    t = (-b - math.sqrt(disc)) / a
+    return t if t <= limit else None
+
+
+def resolve_collision(ball1, ball2):
+    """Elastic bounce of two touching balls, then push them apart.
+
+    Both the velocity change and the separation are split by mass, the
+    lighter ball taking the larger share (equal masses split evenly).
+    """
+    # Calculate the normal vector
+    dx = ball1.x - ball2.x
+    dy = ball1.y - ball2.y
+    distance = math.hypot(dx, dy)
+    if distance == 0:
+        # Prevent division by zero
+        distance = 0.1
+    nx = dx / distance
+    ny = dy / distance
+
+    # Relative velocity
+    dvx = ball1.vx - ball2.vx
+    dvy = ball1.vy - ball2.vy
+    # Velocity along the normal
+    vn = dvx * nx + dvy * ny
+    if vn > 0:
+        return  # Balls are moving away
+
+    # Elastic collision, each ball's share of the exchange is the other's share of the mass
+    m1, m2 = ball1.mass, ball2.mass
+    share1 = m2 / (m1 + m2)
+    share2 = m1 / (m1 + m2)
+    ball1.vx -= vn * (2 * share1) * nx
+    ball1.vy -= vn * (2 * share1) * ny
+    ball2.vx += vn * (2 * share2) * nx
+    ball2.vy += vn * (2 * share2) * ny
+
+    # Separate balls so they don't stick, the heavier one moving less
+    overlap = (ball1.radius + ball2.radius) - distance
+    ball1.x += nx * (overlap * share1)
+    ball1.y += ny * (overlap * share1)
+    ball2.x -= nx * (overlap * share2)
+    ball2.y -= ny * (overlap * share2)
+
+
+def crowd_radius(count):
+    """Largest ball radius for count fighters, so that crowded free-for-alls
+    never cover more than about a quarter of the arena"""
+    return int(math.sqrt(0.25 * ARENA_SIZE * ARENA_HEIGHT / (count * math.pi)))
+
+
+def create_balls(types, rng=random, store=None, roster=None):
+    """Place one ball per fighter slot (one per entry of types) at a random, non-overlapping spot"""
+    if store is None:
+        store = BallStore()
+    if roster is None:
+        roster = default_roster()
+    balls = []
+    colors = [(100, 200, 100), (60, 120, 60)]  # Placeholder colors
+    largest = crowd_radius(len(types))
+    for i, ball_type in enumerate(types):
+        fighter = roster.id_of(ball_type)
+        radius = min(roster.radius[fighter], largest)
+        for _ in range(10000):
+            x = rng.randint(radius, ARENA_SIZE - radius)
+            y = rng.randint(radius, ARENA_HEIGHT - radius)
+            vx = rng.choice([-1, 1]) * rng.uniform(BALL_MIN_SPEED, BALL_MAX_SPEED)
+            vy = rng.choice([-1, 1]) * rng.uniform(BALL_MIN_SPEED, BALL_MAX_SPEED)
+            color = colors[i % 2]
+            if all(math.hypot(x - b.x, y - b.y) >= radius + b.radius for b in balls):
+                balls.append(Ball(x, y, vx, vy, radius, color, health=roster.health[fighter], type=ball_type,
+                                  store=store, mass=roster.mass[fighter], fighter=fighter,
+                                  ability=roster.make_ability(fighter)))
+                break
+        else:
+            raise ValueError(f"no room left in the arena for fighter {i + 1} of {len(types)}")
+    return balls
+
+
+# --- Simulation ---
+class Simulation:
+    """One fight, advanced in fixed steps of simulated time.
+
+    All randomness comes from self.rng, seeded with `seed` (a fresh random
+    seed is picked and kept in self.seed if none is given), and all timing
+    from the step counter, so the same types and seed replay the same fight.
+
+    With `swept` collisions are found by time of impact along each body's
+    path through the step instead of by overlap at the end of it, so nothing
+    passes through anything however large dt is; see _tick_swept().
+
+    types are fighter names from `roster` (by default the roster file, see
+    roster.py), one ball per entry.
+
+    Ability timers and poison/fire ticks are kept on TimerWheels keyed on
+    the step they come due (see timers.py), so a step only visits the
+    balls that have something due. Whatever changes when a ball next needs
+    its ability ticked calls wake(), setting a ball on fire or poisoning it
+    goes through ignite()/poison().
+    """
+
+    def __init__(self, types, dt=TICK_DT, seed=None, swept=SWEPT_COLLISIONS, roster=None):
+        self.dt = dt
+        self.swept = swept
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.time = 0.0  # Simulated seconds since the fight started
+        self.steps = 0
+        self._accumulator = 0.0
+        self.store = BallStore()
+        self.roster = default_roster() if roster is None else roster
+        self.balls = create_balls(types, self.rng, self.store, self.roster)
+        self.by_index = list(self.balls)  # store index -> Ball
+        # Grid cells as wide as the largest contact distance, see broadphase.py
+        self.max_radius = max(ball.radius for ball in self.balls)
+        cell_size = 2 * self.max_radius
+        if swept:
+            # Room for balls travelling at full speed, the grid grows if they go faster
+            cell_size += 2 * BALL_MAX_SPEED * dt * FRAME_RATE
+        self.grid = SpatialHash(cell_size)
+        self.contact_iterations = CONTACT_ITERATIONS
+        self.ability_timers = TimerWheel()  # ball index -> step its on_tick is due
+        self.status_timers = TimerWheel()  # ball index -> step of its next poison/fire tick
+        # Pooled records, the lists below are the pools' live lists and are updated in place
+        self.blazeball_pool = Pool(Blazeball, BLAZEBALL_POOL_SIZE)
+        self.explosion_pool = Pool(Explosion, EXPLOSION_POOL_SIZE)
+        self.hit_effect_pool = Pool(HitEffect, HIT_EFFECT_POOL_SIZE)
+        self.blazeballs = self.blazeball_pool.live
+        self.explosions = self.explosion_pool.live
+        self.hit_effects = self.hit_effect_pool.live
+        self.winner = None
+        self.finished = False
+        self.events = None  # This step's events, see enable_events()
+        self.step_listeners = []  # Called with the simulation after every step
+        self.profiler = None  # FrameProfiler the phases of every step are lapped on, see profiler.py
+        for ball in self.balls:
+            self.wake(ball)
+
+    def enable_events(self):
+        """Start collecting per-step events in self.events.
+
+        Events are tuples starting with their kind: ('blazeball', owner),
+        ('explosion', x, y), ('hit', a, b, x, y), ('projectile_hit', target),
+        ('damage', ball, amount, cause, source) and ('death', ball), where balls are
+        given by store index. The list is cleared at the start of every step.
+        """
+        if self.events is None:
+            self.events = []
+            self.store.events = self.events
+
+    def step(self, dt):
+        """Advance the fight by dt seconds, returns the number of fixed steps run"""
+        self._accumulator += dt
+        steps = 0
+        # Small epsilon so float drift doesn't drop a step when dt == self.dt
+        while self._accumulator >= self.dt - 1e-9 and not self.finished:
+            self._accumulator -= self.dt
+            self._tick()
+            steps += 1
+        return steps
+
+    def run(self, max_time=None):
+        """Step until the fight is over (or max_time simulated seconds pass)"""
+        while not self.finished:
+            if max_time is not None and self.time >= max_time:
+                break
+            self.step(self.dt)
+        return self.winner
+
+    def _tick(self):
+        frames = self.dt * FRAME_RATE
+        self.steps += 1
+        # Derived from the step count so the clock never drifts
+        self.time = self.steps * self.dt
+        if self.events is not None:
+            self.events.clear()
+
+        if self.swept:
+            self._tick_swept(frames)
+        else:
+            self._tick_discrete(frames)
+
+        self._run_status()
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.lap('status')
+        self._remove_dead()
+        self._update_effects()
+        self._check_winner()
+
+        for listener in self.step_listeners:
+            listener(self)
+        if profiler is not None:
+            profiler.lap('cleanup')
+
+    def _remove_dead(self):
+        balls = self.balls
+        self.store.kill_dead()
+        self.balls = [ball for ball in balls if ball.alive]
+        if len(self.balls) != len(balls):
+            for ball in balls:
+                if not ball.alive:
+                    self.grid.remove(ball.index)
+                    self.ability_timers.cancel(ball.index)
+                    self.status_timers.cancel(ball.index)
+                    if self.events is not None:
+                        self.events.append(('death', ball.index))
+
+    # --- Timers ---
+    def step_at(self, time):
+        """The first step whose time is at or after `time`"""
+        return math.ceil(time / self.dt - STEP_EPSILON)
+
+    def due(self, time):
+        """Whether `time` has come. Compared in whole steps, so timers fire on the exact step."""
+        return self.step_at(time) <= self.steps
+
+    def _schedule(self, wheel, ball, time):
+        if time is None:
+            wheel.cancel(ball.index)
+        else:
+            # Never in the past, a step only pops its own slot once
+            wheel.schedule(ball.index, max(self.step_at(time), self.steps + 1))
+
+    def wake(self, ball):
+        """Ask ball's ability again when it next needs on_tick, after anything changed that"""
+        if ball.on_tick:
+            self._schedule(self.ability_timers, ball, ball.next_tick(self, ball))
+
+    def _status_changed(self, ball):
+        self._schedule(self.status_timers, ball, ball.next_status_tick())
+
+    def ignite(self, ball, seconds, source):
+        """Set ball on fire for `seconds` fire ticks, restarting the clock if it already burns.
+        The ticks count as damage by source."""
+        ball.on_fire = True
+        ball.fire_source = source.index
+        ball.fire_time = seconds
+        ball.last_fire_tick = self.time
+        self._status_changed(ball)
+
+    def poison(self, ball, seconds, source):
+        """Poison ball for `seconds` poison ticks, restarting the clock if it already is.
+        The ticks count as damage by source."""
+        ball.poisoned = True
+        ball.poison_source = source.index
+        ball.poison_time = seconds
+        ball.last_poison_tick = self.time
+        self._status_changed(ball)
+
+    def _run_abilities(self):
+        """on_tick of every ball whose ability timer is due this step"""
+        by_index = self.by_index
+        for i in self.ability_timers.pop(self.steps):
+            ball = by_index[i]
+            ball.on_tick(self, ball)
+            self.wake(ball)
+
+    def _run_status(self):
+        """Poison/fire ticks of every ball that has one due this step"""
+        by_index = self.by_index
+        for i in self.status_timers.pop(self.steps):
+            ball = by_index[i]
+            ball.update_poison(self)
+            ball.update_fire(self)
+            self._status_changed(ball)
+
+    def _update_effects(self):
+        """Drop explosions and hit effects that have finished playing.
+
+        Effects of one kind all last as long and are spawned in time order,
+        so the finished ones are always the oldest: only they are looked at.
+        """
+        time = self.time
+        for pool in (self.explosion_pool, self.hit_effect_pool):
+            live = pool.live
+            duration = pool.cls.duration
+            done = 0
+            while done < len(live) and time - live[done].start_time > duration:
+                done += 1
+            if done:
+                pool.expire(done)
+
+    def _check_winner(self):
+        if len(self.balls) == 1:
+            self.winner = self.balls[0]
+            self.finished = True
+        elif len(self.balls) == 0:
+            self.finished = True
+
+    def _tick_discrete(self, frames):
+        """Move everything a whole step, then collide whatever touched, see _collide_pairs()"""
+        events = self.events
+        profiler = self.profiler
+        # Move balls, one vectorized pass over the whole store
+        start = self.store.pos[:self.store.count].tolist()
+        self.store.move(frames, 0, 0, ARENA_SIZE, ARENA_HEIGHT)
+        self._sync_grid()
+        if profiler is not None:
+            profiler.lap('move')
+
+        # Per-tick abilities (blaze shooting, herobrine fading out)
+        self._run_abilities()
+        if profiler is not None:
+            profiler.lap('abilities')
+
+        # Move blazeballs
+        for b in self.blazeballs:
+            b.move(frames)
+        self.blazeball_pool.compact()
+
+        # Handle blazeball collisions, only against balls in nearby grid cells
+        for b in self.blazeballs:
+            for key in sorted(self.grid.query(b.x, b.y, b.radius + self.max_radius)):
+                ball = self.by_index[key]
+                if ball is not b.owner and b.active:
+                    dx = ball.x - b.x
+                    dy = ball.y - b.y
+                    dist = math.hypot(dx, dy)
+                    if dist < ball.radius + b.radius:
+                        ball.on_hit_by_projectile(self, ball, b)
+                        b.active = False
+                        if events is not None:
+                            events.append(('projectile_hit', ball.index))
+        if profiler is not None:
+            profiler.lap('projectiles')
+
+        # Handle collisions and effects, the grid only hands out neighbouring pairs
+        pairs = list(self.grid.pairs())
+        self._collide_pairs(pairs, start, frames)
+        self._separate(pairs)
+        if profiler is not None:
+            profiler.lap('collisions')
+
+    def _collide_pairs(self, pairs, start, frames):
+        """Collide the pairs that touched during the step.
+
+        A pair whose straight paths from `start` (positions by ball index)
+        came into contact during the step is rewound to that moment,
+        collided there and moved on with its new velocities for the rest of
+        the step, so fast balls neither collide late nor slip past each
+        other. Pairs that overlapped when the step began, and balls already
+        collided this step, are collided where they are if they overlap.
+        """
+        by_index = self.by_index
+        store = self.store
+        end = store.pos[:store.count].tolist()
+        radius = store.radius[:store.count].tolist()
+        touched = set()  # balls no longer at their end of the step in `end`
+        for i, j in pairs:
+            if i in touched or j in touched:
+                a, b = by_index[i], by_index[j]
+                if balls_collide(a, b):
+                    self._collide(a, b)
+                    touched.update((i, j))
+                continue
+            (ax, ay), (bx, by) = start[i], start[j]
+            (aex, aey), (bex, bey) = end[i], end[j]
+            adx, ady, bdx, bdy = aex - ax, aey - ay, bex - bx, bey - by
+            reach = radius[i] + radius[j]
+            t = time_of_impact(ax - bx, ay - by, adx - bdx, ady - bdy, reach)
+            if t:
+                a, b = by_index[i], by_index[j]
+                a.x, a.y = ax + adx * t, ay + ady * t
+                b.x, b.y = bx + bdx * t, by + bdy * t
+                self._collide(a, b)
+                a.move(frames * (1 - t))
+                b.move(frames * (1 - t))
+            elif math.hypot(aex - bex, aey - bey) < reach:
+                self._collide(by_index[i], by_index[j])
+            else:
+                continue
+            touched.update((i, j))
+
+    def _tick_swept(self, frames):
+        """Move everything a whole step, colliding at the exact time of impact.
+
+        Every body is taken to move in a straight line from where it was to
+        where it ended up. Contacts are handled earliest first: a pair whose
+        paths touch is rewound to the moment of contact, collided there, and
+        moved on with its new velocities for the rest of the step, see
+        _swept_contacts().
+        """
+        store = self.store
+        profiler = self.profiler
+        n = store.count
+        start = store.pos[:n].copy()
+        store.move(frames, 0, 0, ARENA_SIZE, ARENA_HEIGHT)
+        disp = store.pos[:n] - start
+        alive = store.alive[:n]
+        reach = float(np.sqrt((disp[alive] ** 2).sum(axis=1)).max()) if alive.any() else 0.0
+        # Two bodies whose paths touch end up at most this far apart, they must share or neighbour a cell
+        if 2 * (self.max_radius + reach) > self.grid.cell_size:
+            self.grid = SpatialHash(2 * (self.max_radius + reach) * 1.5)
+        self._sync_grid()
+        positions, moves = start.tolist(), disp.tolist()
+        if profiler is not None:
+            profiler.lap('move')
+
+        self._run_abilities()
+        if profiler is not None:
+            profiler.lap('abilities')
+
+        # Blazeballs hit the first ball their path touches, then leave the arena
+        events = self.events
+        by_index = self.by_index
+        grid = self.grid
+        for b in self.blazeballs:
+            bx, by = b.x, b.y
+            bdx, bdy = b.vx * frames, b.vy * frames
+            b.x += bdx
+            b.y += bdy
+            first = None
+            search = math.hypot(bdx, bdy) + b.radius + self.max_radius + reach
+            for key in sorted(grid.query(b.x, b.y, search)):
+                ball = by_index[key]
+                if ball is b.owner:
+                    continue
+                (sx, sy), (dx, dy) = positions[key], moves[key]
+                t = time_of_impact(bx - sx, by - sy, bdx - dx, bdy - dy, ball.radius + b.radius)
+                if t is not None and (first is None or t < first[0]):
+                    first = (t, ball)
+            if first is not None:
+                t, ball = first
+                b.x, b.y = bx + bdx * t, by + bdy * t
+                ball.on_hit_by_projectile(self, ball, b)
+                b.active = False
+                if events is not None:
+                    events.append(('projectile_hit', ball.index))
+            elif not (0 <= b.x <= ARENA_SIZE and 0 <= b.y <= ARENA_HEIGHT):
+                b.active = False
+        self.blazeball_pool.compact()
+        if profiler is not None:
+            profiler.lap('projectiles')
+
+        pairs = list(grid.pairs())
+        self._swept_contacts(pairs, start, disp, frames)
+        self._separate(pairs)
+        if profiler is not None:
+            profiler.lap('collisions')
+
+    def _swept_contacts(self, pairs, start, disp, frames):
+        """Collide the pairs whose paths touch during the step, earliest contact first.
+
+        A ball's path is where it is at some fraction of the step and its
+        displacement over a whole step; it starts as its straight move from
+        `start` by `disp` (arrays by ball index). A ball that collides gets a
+        new path from the contact point with its new velocity, and its other
+        pairs are predicted again from there. Each pair is handled at most
+        once per step.
+        """
+        if not pairs:
+            return
+        by_index = self.by_index
+        radius = self.store.radius[:len(start)].tolist()
+        # Per ball index: (fraction, x, y, dx, dy)
+        paths = [(0.0, x, y, dx, dy) for (x, y), (dx, dy) in zip(start.tolist(), disp.tolist())]
+        version = [0] * len(paths)
+        involved = None  # ball index -> indices into pairs, built on the first contact
+        done = set()
+        queue = []
+
+        def predict(k):
+            i, j = pairs[k]
+            ti, ax, ay, adx, ady = paths[i]
+            tj, bx, by, bdx, bdy = paths[j]
+            # Both balls where they are once the later of the two paths has begun
+            t0 = max(ti, tj)
+            ax, ay = ax + adx * (t0 - ti), ay + ady * (t0 - ti)
+            bx, by = bx + bdx * (t0 - tj), by + bdy * (t0 - tj)
+            t = time_of_impact(ax - bx, ay - by, adx - bdx, ady - bdy, radius[i] + radius[j], 1.0 - t0)
+            if t is not None:
+                push(t0 + t, k, t)
+
+        def push(time, k, t):
+            # Ties go in pair order, abilities depend on it
+            i, j = pairs[k]
+            _, ax, ay, adx, ady = paths[i]
+            _, bx, by, bdx, bdy = paths[j]
+            heapq.heappush(queue, (time, k, t == 0, ax + adx * (time - paths[i][0]),
+                                   ay + ady * (time - paths[i][0]), bx + bdx * (time - paths[j][0]),
+                                   by + bdy * (time - paths[j][0]), version[i], version[j]))
+
+        # Every pair's first prediction in one pass, the same arithmetic as time_of_impact()
+        first, second = np.array(pairs).T
+        p = start[first] - start[second]
+        d = disp[first] - disp[second]
+        r = self.store.radius[first] + self.store.radius[second]
+        c = p[:, 0] * p[:, 0] + p[:, 1] * p[:, 1] - r * r
+        b = p[:, 0] * d[:, 0] + p[:, 1] * d[:, 1]
+        a = d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1]
+        disc = b * b - a * c
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = (-b - np.sqrt(disc)) / a
+        t[c <= 0] = 0.0
+        hit = (c <= 0) | ((b < 0) & (disc >= 0) & (t <= 1.0))
+        for k, t_k in zip(np.flatnonzero(hit).tolist(), t[hit].tolist()):
+            push(t_k, k, t_k)
+
+        while queue:
+            time, k, touching, ax, ay, bx, by, version_i, version_j = heapq.heappop(queue)
+            i, j = pairs[k]
+            if k in done or version[i] != version_i or version[j] != version_j:
+                continue
+            done.add(k)
+            a, b = by_index[i], by_index[j]
+            if touching:
+                # Already touching when the paths began, same as the discrete test: at the end of the step
+                if not balls_collide(a, b):
+                    continue
+                self._collide(a, b)
+                for ball in (a, b):
+                    paths[ball.index] = (1.0, ball.x, ball.y, 0.0, 0.0)
+            else:
+                a.x, a.y = ax, ay
+                b.x, b.y = bx, by
+                self._collide(a, b)
+                # Spend the rest of the step moving with the post-impact velocities
+                rest = 1.0 - time
+                for ball in (a, b):
+                    x, y = ball.x, ball.y
+                    ball.move(frames * rest)
+                    if rest > 0:
+                        paths[ball.index] = (time, x, y, (ball.x - x) / rest, (ball.y - y) / rest)
+                    else:
+                        paths[ball.index] = (1.0, x, y, 0.0, 0.0)
+            if involved is None:
+                involved = collections.defaultdict(list)
+                for other, pair in enumerate(pairs):
+                    for index in pair:
+                        involved[index].append(other)
+            for index in (i, j):
+                version[index] += 1
+            for index in (i, j):
+                for other in involved[index]:
+                    if other not in done:
+                        predict(other)
+
+    def _separate(self, pairs):
+        """Resolve the overlaps the pairwise collisions left behind, see BallStore.separate()"""
+        if pairs and self.contact_iterations:
+            self.store.separate(np.array(pairs), self.contact_iterations, 0, 0, ARENA_SIZE, ARENA_HEIGHT,
+                                CONTACT_SLOP)
+
+    def _sync_grid(self):
+        store = self.store
+        alive = np.flatnonzero(store.alive[:store.count])
+        self.grid.sync(alive.tolist(), store.x[alive], store.y[alive])
+
+    def nearest_enemy(self, ball):
+        """The closest other living ball (every other fighter is an enemy), None if there is none"""
+        x, y = ball.x, ball.y
+        store = self.store
+
+        def distance(key):
+            return math.hypot(store.x.item(key) - x, store.y.item(key) - y)
+        key = self.grid.nearest(x, y, distance, skip=ball.index)
+        return None if key is None else self.by_index[key]
+
+    def spawn_blazeball(self, owner, vx, vy):
+        self.blazeball_pool.acquire(owner.x, owner.y, vx, vy, owner)
+        if self.events is not None:
+            self.events.append(('blazeball', owner.index))
+
+    def spawn_explosion(self, x, y):
+        self.explosion_pool.acquire(x, y, self.time)
+        if self.events is not None:
+            self.events.append(('explosion', x, y))
+
+    def _collide(self, ball_a, ball_b):
+        resolve_collision(ball_a, ball_b)
+        # Add a small hit effect at the collision point
+        hx, hy = (ball_a.x + ball_b.x) / 2, (ball_a.y + ball_b.y) / 2
+        self.hit_effect_pool.acquire(hx, hy, self.time)
+        if self.events is not None:
+            self.events.append(('hit', ball_a.index, ball_b.index, hx, hy))
+
+        # Abilities with the highest priority handle the hit (creeper > herobrine > steve)
+        top = max(ball_a.collide_priority, ball_b.collide_priority)
+        if top == 0:
+            # Regular collision damage if no special abilities triggered
+            ball_a.take_damage(1, 'collision', ball_b)
+            ball_b.take_damage(1, 'collision', ball_a)
+            return
+        for ball, other in ((ball_a, ball_b), (ball_b, ball_a)):
+            if ball.collide_priority == top:
+                ball.on_collide(self, ball, other)
+                if ball.ability.exclusive:
+                    break
@@ -0,0 +1,79 @@
+"""Pre-rendered sprites for transient effects.
+
+Explosions and hit effects are baked at startup into one sheet per
+animation, one frame per progress bucket, so drawing an effect is a single
+blit from the sheet instead of allocating an SRCALPHA surface and drawing
+circles into it every frame. The see-through Herobrine is baked once per
+(fighter, radius, color) the same way. Sizes are in pixels: the sheets
+are baked for one layout scale (pixels per world unit).
+"""
+import pygame
+
+from simulation import Explosion, HitEffect
+
+EFFECT_BUCKETS = 32  # frames per baked animation
+
+
+def paint_explosion(surf, radius, progress):
+    alpha = int(255 * (1 - progress))
+    # Simplified red explosion for creeper
+    pygame.draw.circle(surf, (255, 80, 80, alpha), (radius, radius), radius)
+    pygame.draw.circle(surf, (255, 150, 100, alpha), (radius, radius), int(radius * 0.6))
+
+
+def paint_hit_effect(surf, radius, progress):
+    alpha = int(180 * (1 - progress))
+    pygame.draw.circle(surf, (255, 255, 255, alpha), (radius, radius), radius)
+
+
+class EffectAtlas:
+    """An expanding-circle animation baked into a single sheet, frames side by side"""
+
+    def __init__(self, max_radius, duration, paint, buckets=EFFECT_BUCKETS):
+        self.duration = duration
+        self.buckets = buckets
+        radii = [int(max_radius * k / buckets) for k in range(buckets)]
+        width = max(1, sum(2 * r for r in radii))
+        self.sheet = pygame.Surface((width, 2 * max_radius), pygame.SRCALPHA)
+        self.frames = []  # (radius, area of the sheet)
+        x = 0
+        for k, r in enumerate(radii):
+            area = pygame.Rect(x, 0, 2 * r, 2 * r)
+            if r > 0:
+                paint(self.sheet.subsurface(area), r, k / buckets)
+            self.frames.append((r, area))
+            x += 2 * r
+        if pygame.display.get_surface() is not None:
+            self.sheet = self.sheet.convert_alpha()
+
+    def draw(self, screen, x, y, elapsed):
+        """Blit the frame for elapsed seconds, returns the rect drawn (None if nothing was)"""
+        if elapsed < 0 or elapsed > self.duration:
+            return None
+        k = min(int(elapsed / self.duration * self.buckets), self.buckets - 1)
+        r, area = self.frames[k]
+        if r > 0:
+            return screen.blit(self.sheet, (x - r, y - r), area)
+        return None
+
+
+class EffectSprites:
+    def __init__(self, scale=1.0, buckets=EFFECT_BUCKETS):
+        self.explosion = EffectAtlas(max(1, round(Explosion.max_radius * scale)), Explosion.duration,
+                                     paint_explosion, buckets)
+        self.hit_effect = EffectAtlas(max(1, round(HitEffect.max_radius * scale)), HitEffect.duration,
+                                      paint_hit_effect, buckets)
+        self.ghosts = {}  # (fighter type, radius, color) -> surface
+
+    def ghost(self, fighter_type, color, face_img, radius):
+        """80% transparent ball with its face, for an invisible Herobrine"""
+        key = (fighter_type, radius, color)
+        surf = self.ghosts.get(key)
+        if surf is None:
+            surf = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+            pygame.draw.circle(surf, color + (51,), (radius, radius), radius)
+            if face_img:
+                # face_img is already scaled to the ball's diameter
+                surf.blit(face_img, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+            self.ghosts[key] = surf
+        return surf
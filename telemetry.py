@@ -0,0 +1,339 @@
+"""Fight telemetry: every hit, damage and status tick of a fight as compact records.
+
+A FightRecorder turns a simulation's events (see Simulation.enable_events)
+into fixed-width records, collected as plain tuples and converted to
+NumPy rows a batch at a time into a TelemetryRing, a preallocated buffer.
+A full ring is handed on as one block, to a TelemetryWriter whose thread
+writes it to disk, or to anything else that takes blocks (the tournament
+workers send theirs to the parent process). The simulation loop itself
+only appends tuples to a list.
+
+Record kinds:
+    spawn      ball, other = roster fighter id, amount = max health
+    hit        ball and other touched
+    <cause>    damage to ball by other (-1: nobody), amount; one kind per
+               damage cause: collision, explosion, counter, knockback,
+               blazeball, fire, poison
+    death      ball was knocked out
+    result     ball won (-1: draw or cut off), amount = steps fought
+
+Files start with a JSON header line naming the layout, record kinds and
+fighters, then hold either one JSON object per record ('jsonl') or blocks
+of columns ('columnar': u32 row count, then every column's raw bytes).
+
+    python telemetry.py results/fights.telemetry   # per-fighter totals
+"""
+import argparse
+import json
+import queue
+import struct
+import threading
+
+import numpy as np
+
+from simulation import STATUS_INTERVAL
+
+KINDS = ('spawn', 'hit', 'collision', 'explosion', 'counter', 'knockback', 'blazeball', 'fire', 'poison',
+         'death', 'result')
+KIND_IDS = {kind: i for i, kind in enumerate(KINDS)}
+DAMAGE_KINDS = KINDS[2:9]
+HIT, DEATH = KIND_IDS['hit'], KIND_IDS['death']
+RECORD = np.dtype([
+    ('fight', '<u4'),
+    ('step', '<u4'),
+    ('kind', 'u1'),
+    ('ball', '<i4'),
+    ('other', '<i4'),
+    ('amount', '<i4'),
+])
+LAYOUTS = ('columnar', 'jsonl')
+FORMAT = 'balls-telemetry'
+VERSION = 1
+
+RING_SIZE = 8192  # records per block
+BATCH_SIZE = 1024  # records a FightRecorder collects before converting them at once
+QUEUED_BLOCKS = 8  # blocks waiting for the writer thread before record() blocks
+
+_COUNT = struct.Struct('<I')
+_JSONL_LINE = '{"fight": %d, "step": %d, "kind": "%s", "ball": %d, "other": %d, "amount": %d}\n'
+_KIND_NAMES = np.array(KINDS, dtype=object)
+
+
+class TelemetryRing:
+    """Preallocated record buffer; every full block is passed to sink(block), a copy the ring won't reuse"""
+
+    def __init__(self, sink, capacity=RING_SIZE):
+        self.sink = sink
+        self.rows = np.zeros(capacity, dtype=RECORD)
+        self.size = 0
+
+    def extend(self, block):
+        """Append a block of records at once"""
+        rows = self.rows
+        while len(block):
+            take = min(len(block), len(rows) - self.size)
+            rows[self.size:self.size + take] = block[:take]
+            self.size += take
+            block = block[take:]
+            if self.size == len(rows):
+                self.flush()
+
+    def flush(self):
+        """Pass on whatever is buffered"""
+        if self.size:
+            self.sink(self.rows[:self.size].copy())
+            self.size = 0
+
+
+class FightRecorder:
+    """Records one simulation's events into a ring, as fight number `fight`.
+
+        recorder = FightRecorder(sim, ring, fight=3)
+        sim.run()
+        recorder.close()  # the result record, and whatever is still batched
+
+    Records are kept as tuples and go to the ring BATCH_SIZE at a time, one
+    NumPy conversion per batch instead of a call per event.
+    """
+
+    def __init__(self, sim, ring, fight=0):
+        self.sim = sim
+        self.ring = ring
+        self.fight = fight
+        self.closed = False
+        self.pending = [(fight, 0, KIND_IDS['spawn'], ball.index, ball.fighter, ball.max_health)
+                        for ball in sim.balls]
+        sim.enable_events()
+        sim.step_listeners.append(self._on_step)
+
+    def _on_step(self, sim):
+        events = sim.events
+        if events:
+            pending = self.pending
+            fight = self.fight
+            step = sim.steps
+            for event in events:
+                kind = event[0]
+                if kind == 'damage':
+                    pending.append((fight, step, KIND_IDS[event[3]], event[1], event[4], event[2]))
+                elif kind == 'hit':
+                    pending.append((fight, step, HIT, event[1], event[2], 0))
+                elif kind == 'death':
+                    pending.append((fight, step, DEATH, event[1], -1, 0))
+            if len(pending) >= BATCH_SIZE:
+                self.flush()
+        if sim.finished:
+            self.close()
+
+    def flush(self):
+        """Convert the batched records and pass them to the ring"""
+        if self.pending:
+            self.ring.extend(np.array(self.pending, dtype=RECORD))
+            self.pending = []
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        sim = self.sim
+        if self._on_step in sim.step_listeners:
+            sim.step_listeners.remove(self._on_step)
+        winner = -1 if sim.winner is None else sim.winner.index
+        self.pending.append((self.fight, sim.steps, KIND_IDS['result'], winner, -1, sim.steps))
+        self.flush()
+
+
+def header(fighters, layout):
+    return {
+        'format': FORMAT,
+        'version': VERSION,
+        'layout': layout,
+        'kinds': list(KINDS),
+        'fighters': list(fighters),
+        'columns': [[name, RECORD[name].str] for name in RECORD.names],
+    }
+
+
+class TelemetryWriter:
+    """Appends record blocks to a file from a background thread.
+
+    write() only queues the block; when QUEUED_BLOCKS are already waiting
+    it blocks until the thread catches up, so memory stays bounded. The
+    layout follows the file name: .jsonl gives JSON lines, anything else
+    columnar blocks. Either is encoded on the thread as blocks arrive.
+    """
+
+    def __init__(self, path, fighters, layout=None, queued=QUEUED_BLOCKS):
+        if layout is None:
+            layout = 'jsonl' if path.endswith('.jsonl') else 'columnar'
+        if layout not in LAYOUTS:
+            raise ValueError(f"unknown telemetry layout {layout!r}, expected one of {LAYOUTS}")
+        self.layout = layout
+        self.file = open(path, 'wb')
+        self.file.write(json.dumps(header(fighters, layout)).encode() + b'\n')
+        self.queue = queue.Queue(maxsize=queued)
+        self.error = None
+        self.records = 0
+        self.thread = threading.Thread(target=self._run, name='telemetry', daemon=True)
+        self.thread.start()
+
+    def write(self, block):
+        if self.error is not None:
+            raise RuntimeError("telemetry writer failed") from self.error
+        self.queue.put(block)
+
+    def _run(self):
+        try:
+            while True:
+                block = self.queue.get()
+                if block is None:
+                    break
+                if self.layout == 'jsonl':
+                    self.file.write(_jsonl(block))
+                else:
+                    _write_columns(self.file, block)
+                self.records += len(block)
+        except BaseException as e:
+            self.error = e
+            # Keep write() and close() from waiting on a dead thread
+            while self.queue.get() is not None:
+                pass
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.file.close()
+        if self.error is not None:
+            raise RuntimeError("telemetry writer failed") from self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _write_columns(f, block):
+    parts = [_COUNT.pack(len(block))]
+    parts.extend(np.ascontiguousarray(block[name]).tobytes() for name in RECORD.names)
+    f.write(b''.join(parts))
+
+
+def _read_blocks(f):
+    """The columnar blocks of a file, read one at a time"""
+    while True:
+        count = f.read(_COUNT.size)
+        if not count:
+            return
+        (count,) = _COUNT.unpack(count)
+        block = np.zeros(count, dtype=RECORD)
+        for name in RECORD.names:
+            block[name] = np.frombuffer(f.read(count * RECORD[name].itemsize), dtype=RECORD[name])
+        yield block
+
+
+def _jsonl(block):
+    # Same text json.dumps gives for the record's dict, without building one per record
+    columns = [block[name].tolist() for name in RECORD.names]
+    columns[2] = _KIND_NAMES[block['kind']].tolist()
+    return ''.join([_JSONL_LINE % record for record in zip(*columns)]).encode()
+
+
+def read(path):
+    """(header, records) of a telemetry file, records as one RECORD array"""
+    with open(path, 'rb') as f:
+        head = json.loads(f.readline())
+        if head.get('format') != FORMAT or head.get('version') != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} {FORMAT} file")
+        kinds = {kind: KIND_IDS[kind] for kind in head['kinds']}
+        if head['layout'] == 'jsonl':
+            rows = []
+            for line in f:
+                r = json.loads(line)
+                rows.append((r['fight'], r['step'], kinds[r['kind']], r['ball'], r['other'], r['amount']))
+            return head, np.array(rows, dtype=RECORD)
+        blocks = list(_read_blocks(f))
+    return head, np.concatenate(blocks) if blocks else np.zeros(0, dtype=RECORD)
+
+
+def aggregate(paths):
+    """Per-fighter totals over every fight in the files.
+
+    fighter -> fights, wins, damage dealt (to others) and taken, self
+    damage, hits (contacts), blazeball hits landed, damage taken by cause
+    and seconds on fire (fire ticks taken times the tick interval).
+    Computed with whole-column NumPy operations, one pass per file.
+    """
+    totals = {}
+    for path in paths:
+        head, rows = read(path)
+        names = head['fighters']
+        kind = rows['kind']
+        # Ball indexes are per fight: look fighters up by fight * width + ball
+        spawns = rows[kind == KIND_IDS['spawn']]
+        width = int(spawns['ball'].max()) + 1 if len(spawns) else 1
+        fights = int(rows['fight'].max()) + 1 if len(rows) else 1
+        fighter_of = np.full(fights * width, -1, dtype=np.int64)
+        fighter_of[spawns['fight'].astype(np.int64) * width + spawns['ball']] = spawns['other']
+
+        def fighter(column):
+            index = rows['fight'].astype(np.int64) * width + np.clip(rows[column], 0, width - 1)
+            return np.where(rows[column] >= 0, fighter_of[index], -1)
+        ball, other, amount = fighter('ball'), fighter('other'), rows['amount'].astype(np.int64)
+
+        def count(mask, who, weights=None):
+            who = who[mask]
+            keep = who >= 0
+            w = None if weights is None else weights[mask][keep]
+            return np.bincount(who[keep], weights=w, minlength=len(names))
+
+        damage = np.isin(kind, [KIND_IDS[k] for k in DAMAGE_KINDS])
+        self_inflicted = rows['ball'] == rows['other']
+        hit = kind == KIND_IDS['hit']
+        columns = {
+            'fights': count(kind == KIND_IDS['spawn'], ball),
+            'wins': count(kind == KIND_IDS['result'], ball),
+            'damage_dealt': count(damage & ~self_inflicted, other, amount),
+            'damage_taken': count(damage, ball, amount),
+            'self_damage': count(damage & self_inflicted, ball, amount),
+            'hits': count(hit, ball) + count(hit, other),
+            'blazeball_hits': count(kind == KIND_IDS['blazeball'], other),
+            'time_on_fire': count(kind == KIND_IDS['fire'], ball) * STATUS_INTERVAL,
+        }
+        by_cause = {cause: count(kind == KIND_IDS[cause], ball, amount) for cause in DAMAGE_KINDS}
+        for i, name in enumerate(names):
+            if not columns['fights'][i]:
+                continue
+            entry = totals.setdefault(name, {key: 0 for key in columns})
+            for key, values in columns.items():
+                entry[key] += values[i].item()
+            causes = entry.setdefault('damage_taken_by_cause', {})
+            for cause, values in by_cause.items():
+                if values[i]:
+                    causes[cause] = causes.get(cause, 0) + int(values[i])
+    for entry in totals.values():
+        for key in ('damage_dealt', 'damage_taken', 'self_damage'):
+            entry[key] = int(entry[key])
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-fighter totals of telemetry files")
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--json', action='store_true', help="print the totals as JSON")
+    args = parser.parse_args()
+    stats = aggregate(args.paths)
+    if args.json:
+        print(json.dumps(stats, indent=2, sort_keys=True))
+        return
+    print(f"{'fighter':>10} {'fights':>7} {'wins':>6} {'dealt':>8} {'taken':>8} {'self':>6} {'hits':>7} "
+          f"{'blaze hits':>10} {'on fire s':>9}")
+    for name, s in sorted(stats.items()):
+        print(f"{name:>10} {s['fights']:>7} {s['wins']:>6} {s['damage_dealt']:>8} {s['damage_taken']:>8} "
+              f"{s['self_damage']:>6} {s['hits']:>7} {s['blazeball_hits']:>10} {s['time_on_fire']:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
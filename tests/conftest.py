@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pytest_addoption(parser):
+    parser.addoption('--slow', action='store_true', help="also run the slow statistical tests")
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', "slow: statistical test over many fights, only run with --slow")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--slow'):
+        return
+    skip = pytest.mark.skip(reason="needs --slow")
+    for item in items:
+        if 'slow' in item.keywords:
+            item.add_marker(skip)
@@ -0,0 +1,63 @@
+import math
+import statistics
+
+import pytest
+
+from event_engine import EventSimulation
+from simulation import Simulation
+from tournament import MAX_FIGHT_TIME, new_simulation
+
+FIGHTS = 50
+# Allowed difference between the engines, in standard errors of the
+# difference. Seeded fights take different courses on the two engines, so
+# only the rates can agree. Colliding balls where they overlapped at the
+# end of a step made steve and creeper fights about 12% longer on the
+# fixed-step engine, which is 3 standard errors at 50 fights. About 30 s,
+# so only run with --slow; tests/test_fixed_step.py covers the contacts.
+TOLERANCE = 3
+# Fast balls (steve's knockback, creeper explosions), blazeball hits and
+# fire, and herobrine's timers with win rates near even
+MATCHUPS = (('blaze', 'steve'), ('creeper', 'herobrine'), ('herobrine', 'skeleton'))
+
+
+def outcomes(cls, types):
+    """Whether ball 0 won, and the fight length, of each of FIGHTS seeded fights"""
+    wins, lengths = [], []
+    for seed in range(FIGHTS):
+        sim = cls(list(types), seed=f"test:{seed}")
+        winner = sim.run(max_time=MAX_FIGHT_TIME)
+        wins.append(winner is not None and winner is sim.by_index[0])
+        lengths.append(sim.time)
+    return wins, lengths
+
+
+def win_rate_gap(wins_a, wins_b):
+    """Difference of the win rates in standard errors, with the pooled rate"""
+    rate = (sum(wins_a) + sum(wins_b)) / (len(wins_a) + len(wins_b))
+    error = math.sqrt(rate * (1 - rate) * (1 / len(wins_a) + 1 / len(wins_b)))
+    diff = abs(sum(wins_a) / len(wins_a) - sum(wins_b) / len(wins_b))
+    return diff / error if error else 0.0 if diff == 0 else math.inf
+
+
+def length_gap(lengths_a, lengths_b):
+    """Difference of the mean fight lengths in standard errors"""
+    error = math.sqrt(statistics.variance(lengths_a) / len(lengths_a)
+                      + statistics.variance(lengths_b) / len(lengths_b))
+    return abs(statistics.mean(lengths_a) - statistics.mean(lengths_b)) / error
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('types', MATCHUPS, ids='-'.join)
+def test_event_engine_agrees_with_fixed_steps(types):
+    step_wins, step_lengths = outcomes(Simulation, types)
+    event_wins, event_lengths = outcomes(EventSimulation, types)
+    assert win_rate_gap(step_wins, event_wins) < TOLERANCE
+    assert length_gap(step_lengths, event_lengths) < TOLERANCE
+
+
+def test_event_engine_rejects_step_options():
+    with pytest.raises(ValueError):
+        new_simulation(['blaze', 'steve'], 1, 1 / 15, False, 'event')
+    with pytest.raises(ValueError):
+        new_simulation(['blaze', 'steve'], 1, 1 / 60, True, 'event')
+    assert isinstance(new_simulation(['blaze', 'steve'], 1, 1 / 60, False, 'event'), EventSimulation)
@@ -0,0 +1,30 @@
+import pytest
+
+from simulation import Simulation
+
+# Fighters without abilities, so a contact is a plain elastic bounce
+PLAIN = ('zombie', 'skeleton')
+
+
+def one_step(bodies):
+    """A duel after one fixed step from balls placed at (x, y) moving (vx, vy) per frame"""
+    sim = Simulation(list(PLAIN), seed=1)
+    for ball, (x, y, vx, vy) in zip(sim.balls, bodies):
+        ball.x, ball.y, ball.vx, ball.vy = x, y, vx, vy
+    sim.step(sim.dt)
+    return sim.balls
+
+
+def test_contact_within_a_step_is_collided_at_its_moment():
+    # a reaches b 5 units into a 60 unit step, then stops and b carries on
+    a, b = one_step([(100, 300, 60, 0), (201, 300, 0, 0)])
+    assert (a.x, a.vx) == (pytest.approx(105), 0)
+    assert (b.x, b.vx) == (pytest.approx(256), 60)
+
+
+def test_balls_touching_only_mid_step_still_collide():
+    # a's path grazes b and has left it behind by the end of the step
+    a, b = one_step([(100, 300, 200, 0), (200, 380, 0, 0)])
+    assert a.health == a.max_health - 1
+    assert b.health == b.max_health - 1
+    assert b.vy > 0
@@ -0,0 +1,95 @@
+import itertools
+import tracemalloc
+
+import simulation
+from pool import Pool
+from simulation import Simulation
+
+FIGHTERS = ('blaze', 'creeper', 'herobrine', 'steve')
+WARMUP_STEPS = 1200
+STEPS = 1000
+# Share of spawns after warm-up that may still need a new record (about 2%:
+# a pool's high-water mark creeps up now and then); without pools it's all
+NEW_RECORD_SHARE = 0.05
+# Traced memory the fights may gain per fight step once warmed up. About 1.5
+# bytes is the broadphase grid and timer wheels meeting new cells and steps;
+# keeping every spawned record alive would add 5 more.
+BYTES_PER_STEP = 4
+
+
+class CountingPool(Pool):
+    def __init__(self, cls, capacity):
+        super().__init__(cls, capacity)
+        self.acquired = 0
+
+    def acquire(self, *args):
+        self.acquired += 1
+        return super().acquire(*args)
+
+
+class Record:
+    __slots__ = ('n', 'active')
+
+    def reset(self, n):
+        self.n = n
+        self.active = True
+
+
+def busy_fights():
+    """Every matchup with health topped up each step, so shots, hits and explosions never stop"""
+    return [Simulation(list(types), seed=1) for types in itertools.combinations_with_replacement(FIGHTERS, 2)]
+
+
+def busy_step(sims):
+    for sim in sims:
+        for ball in sim.balls:
+            ball.health = ball.max_health
+        sim.step(sim.dt)
+
+
+def pools_of(sims):
+    return [p for sim in sims for p in (sim.blazeball_pool, sim.explosion_pool, sim.hit_effect_pool)]
+
+
+def test_pool_reuses_records_and_recycles_the_oldest_when_full():
+    pool = Pool(Record, 4)
+    for n in range(10):
+        pool.acquire(n)
+    assert pool.allocated == 4
+    assert pool.recycled == 6
+    assert [r.n for r in pool.live] == [6, 7, 8, 9]
+    pool.live[1].active = False
+    pool.compact()
+    assert [r.n for r in pool.live] == [6, 8, 9]
+    pool.expire(2)
+    assert [r.n for r in pool.live] == [9]
+    assert len(pool.free) == 3
+    pool.acquire(10)
+    assert pool.allocated == 4
+
+
+def test_steady_state_fights_reuse_records_and_keep_memory_bounded(monkeypatch):
+    monkeypatch.setattr(simulation, 'Pool', CountingPool)
+    sims = busy_fights()
+    pools = pools_of(sims)
+    for _ in range(WARMUP_STEPS):
+        busy_step(sims)
+    allocated = sum(p.allocated for p in pools)
+    acquired = sum(p.acquired for p in pools)
+
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        for _ in range(STEPS):
+            busy_step(sims)
+        end, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    spawns = sum(p.acquired for p in pools) - acquired
+    assert spawns > STEPS // 2  # the fights really are busy
+    assert sum(p.allocated for p in pools) - allocated <= NEW_RECORD_SHARE * spawns
+    for p in pools:
+        assert p.allocated <= p.capacity
+        assert len(p.live) + len(p.free) == p.allocated
+    assert (end - start) / (STEPS * len(sims)) < BYTES_PER_STEP
@@ -0,0 +1,27 @@
+from replay import ReplayReader, ReplayWriter
+from simulation import Simulation
+
+
+def effects(frame):
+    return ([(e.x, e.y, e.start_time) for e in frame.explosions],
+            [(e.x, e.y, e.start_time) for e in frame.hit_effects])
+
+
+def test_replay_keeps_large_health_and_effects(tmp_path):
+    path = tmp_path / 'fight.replay'
+    sim = Simulation(['creeper', 'steve', 'blaze'], seed=3)
+    for ball in sim.balls[1:]:
+        ball.health = ball.max_health = 40000
+    with ReplayWriter(path, sim):
+        sim.run(max_time=20)
+
+    replay = ReplayReader(path)
+    assert replay.frame(0).balls[1].max_health == 40000
+    assert [ball.health for ball in replay.frame(len(replay) - 1).balls] == [ball.health for ball in sim.balls]
+    # Effects carried on from frame to frame match the ones read afresh for a single frame
+    shown = 0
+    for i in list(range(len(replay))) + [300, 300, 120]:
+        carried = effects(replay.frame(i))
+        assert carried == effects(ReplayReader(path).frame(i))
+        shown += any(carried)
+    assert shown
@@ -0,0 +1,32 @@
+import pytest
+
+from simulation import Simulation
+
+# Fighters without abilities, so a contact is a plain elastic bounce
+PLAIN = ('zombie', 'skeleton', 'wither')
+
+
+def arranged(bodies):
+    """A swept fight with its balls placed at (x, y) moving (vx, vy) per frame"""
+    sim = Simulation(list(PLAIN[:len(bodies)]), seed=1, swept=True)
+    for ball, (x, y, vx, vy) in zip(sim.balls, bodies):
+        ball.x, ball.y, ball.vx, ball.vy = x, y, vx, vy
+    sim.step(sim.dt)
+    return sim.balls
+
+
+def test_ball_stopped_by_a_hit_stays_off_its_old_path():
+    # a stops against b; its old path would have grazed c, which must not be hit
+    a, b, c = arranged([(100, 300, 60, 0), (201, 300, 0, 0), (160, 392, 0, 0)])
+    assert (a.x, a.y, a.vx) == (pytest.approx(105), 300, 0)
+    assert (b.x, b.vx) == (pytest.approx(256), 60)
+    assert (c.x, c.y, c.vx, c.vy, c.health) == (160, 392, 0, 0, c.max_health)
+
+
+def test_contacts_are_handled_in_time_order():
+    # Newton's cradle: a hits b, then b (on its new path) hits c later in the same step
+    a, b, c = arranged([(100, 300, 60, 0), (201, 300, 0, 0), (320, 300, 0, 0)])
+    assert (a.x, a.vx) == (pytest.approx(105), 0)
+    assert (b.x, b.vx) == (pytest.approx(224), 0)
+    assert (c.x, c.vx) == (pytest.approx(352), 60)
+    assert [ball.health for ball in (a, b, c)] == [a.max_health - 1, b.max_health - 2, c.max_health - 1]
@@ -0,0 +1,59 @@
+"""Timer wheel keyed on integer simulation steps.
+
+The fixed-step Simulation keeps ability timers (Blaze's cooldown,
+Herobrine fading out) and status ticks (poison, fire) here instead of
+asking every ball on every step whether something is due. A timer due at
+step s sits in slot s % slots, so scheduling is O(1) and a step only looks
+at its own slot; timers more than `slots` steps out wait in theirs for a
+later round.
+"""
+
+TIMER_SLOTS = 256
+
+
+class TimerWheel:
+    """At most one timer per key, each due at a whole step.
+
+    Rescheduling or cancelling a key leaves its old entry in the wheel; the
+    entry is dropped when its slot comes up and the key is no longer due
+    at that step.
+    """
+
+    def __init__(self, slots=TIMER_SLOTS):
+        self.slots = [[] for _ in range(slots)]
+        self.due = {}  # key -> step its timer is due
+
+    def __len__(self):
+        return len(self.due)
+
+    def schedule(self, key, step):
+        """Make key due at step, replacing its earlier timer"""
+        if self.due.get(key) == step:
+            return
+        self.due[key] = step
+        self.slots[step % len(self.slots)].append((step, key))
+
+    def cancel(self, key):
+        self.due.pop(key, None)
+
+    def pop(self, step):
+        """Keys due at step, in key order; their timers are removed"""
+        index = step % len(self.slots)
+        slot = self.slots[index]
+        if not slot:
+            return []
+        due = self.due
+        fired = []
+        later = []
+        for entry in slot:
+            at, key = entry
+            if due.get(key) != at:
+                continue  # rescheduled or cancelled since
+            if at == step:
+                del due[key]
+                fired.append(key)
+            else:
+                later.append(entry)
+        self.slots[index] = later
+        fired.sort()
+        return fired
@@ -0,0 +1,231 @@
+"""Round-robin tournament: seeded headless fights for every pair of fighters.
+
+Usage:
+    python tournament.py --fights 200 --out results/tournament
+    python tournament.py --fights 200 --tick-rate 15 --swept   # faster, hits found by time of impact
+    python tournament.py --fights 200 --engine event   # jump between predicted events, fastest
+
+Writes <out>.csv (win-rate matrix, row fighter vs column fighter) and
+<out>.json (per-matchup wins, draws, average fight length and damage
+breakdown by cause). With --telemetry every fight's hits, damage and
+status ticks also go to <out>.telemetry, see telemetry.py.
+"""
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from config import FRAME_RATE, SWEPT_COLLISIONS, TICK_DT
+from event_engine import EventSimulation
+from roster import default_roster
+from simulation import Simulation
+from telemetry import FightRecorder, TelemetryRing, TelemetryWriter
+
+MAX_FIGHT_TIME = 300  # simulated seconds before a fight is called a draw
+
+
+def fighter_types():
+    return list(default_roster().names)
+
+
+def fight_seed(base_seed, type_a, type_b, fight_idx):
+    # String seeds are hashed with SHA-512 by random.Random, so they are stable across processes
+    return f"{base_seed}:{type_a}:{type_b}:{fight_idx}"
+
+
+def new_simulation(types, seed, dt, swept, engine, roster=None):
+    """A headless fight on the fixed-step ('step') or event-driven ('event') engine.
+
+    dt and swept only apply to the step engine, ValueError if they are
+    changed from their defaults for the event engine.
+    """
+    if engine == 'event':
+        if step_options_set(dt, swept):
+            raise ValueError("tick rate and swept collisions only apply to the step engine")
+        return EventSimulation(types, seed=seed, roster=roster)
+    return Simulation(types, dt=dt, seed=seed, swept=swept, roster=roster)
+
+
+def step_options_set(dt, swept):
+    """Whether dt or swept differ from the defaults, which the event engine would ignore"""
+    return dt != TICK_DT or swept != SWEPT_COLLISIONS
+
+
+def run_fight(job):
+    """Run one headless fight, returns a small picklable summary"""
+    type_a, type_b, seed, max_time, dt, swept, engine, telemetry = job
+    sim = new_simulation([type_a, type_b], seed, dt, swept, engine)
+    # Keep a handle on both balls, dead ones are dropped from sim.balls
+    fighters = list(sim.balls)
+    if telemetry:
+        blocks = []
+        ring = TelemetryRing(blocks.append)
+        recorder = FightRecorder(sim, ring)
+    winner = sim.run(max_time=max_time)
+    result = {
+        'a': type_a,
+        'b': type_b,
+        'winner': winner.type if winner else None,
+        'time': sim.time,
+        'damage_taken': {ball.type: dict(ball.damage_taken) for ball in fighters},
+    }
+    if telemetry:
+        recorder.close()
+        ring.flush()
+        # Records of the fight, numbered by the parent with the job's index
+        result['telemetry'] = np.concatenate(blocks)
+    return result
+
+
+def make_jobs(types, fights, base_seed, max_time, dt, swept, engine, telemetry=False):
+    for type_a, type_b in itertools.combinations(types, 2):
+        for i in range(fights):
+            yield type_a, type_b, fight_seed(base_seed, type_a, type_b, i), max_time, dt, swept, engine, telemetry
+
+
+def new_matchup(type_a, type_b):
+    return {
+        'a': type_a,
+        'b': type_b,
+        'fights': 0,
+        'wins': {type_a: 0, type_b: 0},
+        'draws': 0,
+        'total_time': 0.0,
+        'damage_taken': {type_a: {}, type_b: {}},
+    }
+
+
+def add_result(matchup, result):
+    matchup['fights'] += 1
+    matchup['total_time'] += result['time']
+    if result['winner'] is None:
+        matchup['draws'] += 1
+    else:
+        matchup['wins'][result['winner']] += 1
+    for fighter, causes in result['damage_taken'].items():
+        totals = matchup['damage_taken'][fighter]
+        for cause, amount in causes.items():
+            totals[cause] = totals.get(cause, 0) + amount
+
+
+def summarize(matchups):
+    """Turn the running totals into averages for the JSON report"""
+    report = []
+    for m in matchups.values():
+        n = max(m['fights'], 1)
+        report.append({
+            'a': m['a'],
+            'b': m['b'],
+            'fights': m['fights'],
+            'wins': m['wins'],
+            'draws': m['draws'],
+            'win_rate': {t: w / n for t, w in m['wins'].items()},
+            'avg_fight_time': m['total_time'] / n,
+            'avg_damage_taken': {
+                fighter: {cause: amount / n for cause, amount in sorted(causes.items())}
+                for fighter, causes in m['damage_taken'].items()
+            },
+        })
+    return report
+
+
+def win_rate_matrix(types, matchups):
+    """matrix[a][b] is the fraction of a-vs-b fights that a won"""
+    matrix = {a: {b: None for b in types} for a in types}
+    for m in matchups.values():
+        n = m['fights']
+        if n:
+            matrix[m['a']][m['b']] = m['wins'][m['a']] / n
+            matrix[m['b']][m['a']] = m['wins'][m['b']] / n
+    return matrix
+
+
+def write_csv(path, types, matrix):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([''] + types)
+        for a in types:
+            writer.writerow([a] + ['' if matrix[a][b] is None else f"{matrix[a][b]:.4f}" for b in types])
+
+
+def run_tournament(types, fights, base_seed=0, processes=None, max_time=MAX_FIGHT_TIME,
+                   tick_rate=FRAME_RATE, swept=SWEPT_COLLISIONS, engine='step', telemetry=None):
+    """Play every matchup; fight records go to telemetry (a TelemetryWriter) if given"""
+    matchups = {(a, b): new_matchup(a, b) for a, b in itertools.combinations(types, 2)}
+    jobs = list(make_jobs(types, fights, base_seed, max_time, 1.0 / tick_rate, swept, engine,
+                          telemetry is not None))
+    ring = TelemetryRing(telemetry.write) if telemetry is not None else None
+    # Fights are short, so hand them out in chunks to keep IPC overhead down
+    chunksize = max(1, len(jobs) // ((processes or os.cpu_count() or 1) * 8))
+    with multiprocessing.Pool(processes) as pool:
+        # Results come back in job order, so fight numbers (and the telemetry file) don't depend on scheduling
+        for fight, result in enumerate(pool.imap(run_fight, jobs, chunksize=chunksize)):
+            add_result(matchups[(result['a'], result['b'])], result)
+            if ring is not None:
+                records = result['telemetry']
+                records['fight'] = fight
+                ring.extend(records)
+    if ring is not None:
+        ring.flush()
+    return matchups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate every fighter matchup headlessly")
+    parser.add_argument('--fights', type=int, default=100, help="fights per matchup")
+    parser.add_argument('--seed', type=int, default=0, help="base seed, same seed gives the same results")
+    parser.add_argument('--processes', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--max-time', type=float, default=MAX_FIGHT_TIME,
+                        help="simulated seconds before a fight counts as a draw")
+    parser.add_argument('--tick-rate', type=float, default=FRAME_RATE,
+                        help="simulation steps per simulated second, fewer is faster but less accurate")
+    parser.add_argument('--swept', action='store_true', default=SWEPT_COLLISIONS,
+                        help="swept collision detection, keeps low tick rates from missing hits")
+    parser.add_argument('--engine', choices=('step', 'event'), default='step',
+                        help="fixed-step simulation, or the event-driven engine (much faster, same rules)")
+    parser.add_argument('--out', default='tournament', help="output path prefix for .csv and .json")
+    parser.add_argument('--telemetry', action='store_true',
+                        help="also record every fight's hits, damage and status ticks to <out>.telemetry")
+    args = parser.parse_args()
+    if args.engine == 'event' and step_options_set(1.0 / args.tick_rate, args.swept):
+        parser.error("--tick-rate and --swept only apply to --engine step")
+
+    types = fighter_types()
+    out_dir = os.path.dirname(args.out)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    telemetry = TelemetryWriter(args.out + '.telemetry', default_roster().names) if args.telemetry else None
+    start = time.perf_counter()
+    try:
+        matchups = run_tournament(types, args.fights, args.seed, args.processes, args.max_time,
+                                  args.tick_rate, args.swept, args.engine, telemetry)
+    finally:
+        if telemetry is not None:
+            telemetry.close()
+    elapsed = time.perf_counter() - start
+
+    matrix = win_rate_matrix(types, matchups)
+    write_csv(args.out + '.csv', types, matrix)
+    total = sum(m['fights'] for m in matchups.values())
+    with open(args.out + '.json', 'w') as f:
+        json.dump({
+            'fighters': types,
+            'fights_per_matchup': args.fights,
+            'seed': args.seed,
+            'max_time': args.max_time,
+            'tick_rate': args.tick_rate,
+            'swept': args.swept,
+            'engine': args.engine,
+            'win_rate': matrix,
+            'matchups': summarize(matchups),
+        }, f, indent=2)
+    print(f"{total} fights in {elapsed:.1f}s ({total / elapsed * 60:.0f} fights/min)")
+
+
+if __name__ == "__main__":
+    main()